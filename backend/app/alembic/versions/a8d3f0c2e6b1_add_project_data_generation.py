@@ -0,0 +1,27 @@
+"""add project data generation
+
+Revision ID: a8d3f0c2e6b1
+Revises: f3a9c6e1b7d2
+Create Date: 2026-10-17 21:12:46.538210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a8d3f0c2e6b1"
+down_revision = "f3a9c6e1b7d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "project",
+        sa.Column("data_generation", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("project", "data_generation")
@@ -0,0 +1,86 @@
+"""add data query indexes
+
+Revision ID: e7b2d54a1c90
+Revises: c4e1a7d92b3f
+Create Date: 2026-10-17 15:42:08.917364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e7b2d54a1c90"
+down_revision = "c4e1a7d92b3f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_data_project_stage",
+        "data",
+        ["project_id", "processing_stage", "data_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_data_execution_stage",
+        "data",
+        ["workflow_execution_id", "processing_stage", "data_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_data_node_execution_id", "data", ["node_execution_id"], unique=False
+    )
+    op.create_index(
+        "ix_data_path_project_stage",
+        "data",
+        ["path", "project_id", "processing_stage"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_processed_data_original_data_id",
+        "processed_data",
+        ["original_data_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_processed_data_node_execution_id",
+        "processed_data",
+        ["node_execution_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_annotation_data_stage",
+        "annotation",
+        ["data_id", "processing_stage"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_workflow_node_execution_lookup",
+        "workflow_node_execution",
+        ["execution_id", "node_id", "status"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_workflow_job_queued",
+        "workflow_job",
+        ["job_id"],
+        unique=False,
+        postgresql_where=sa.text("status = 'queued'"),
+        sqlite_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_workflow_job_queued", table_name="workflow_job")
+    op.drop_index(
+        "ix_workflow_node_execution_lookup", table_name="workflow_node_execution"
+    )
+    op.drop_index("ix_annotation_data_stage", table_name="annotation")
+    op.drop_index("ix_processed_data_node_execution_id", table_name="processed_data")
+    op.drop_index("ix_processed_data_original_data_id", table_name="processed_data")
+    op.drop_index("ix_data_path_project_stage", table_name="data")
+    op.drop_index("ix_data_node_execution_id", table_name="data")
+    op.drop_index("ix_data_execution_stage", table_name="data")
+    op.drop_index("ix_data_project_stage", table_name="data")
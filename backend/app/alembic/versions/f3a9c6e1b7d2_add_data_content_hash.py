@@ -0,0 +1,37 @@
+"""add data content hash
+
+Revision ID: f3a9c6e1b7d2
+Revises: e7b2d54a1c90
+Create Date: 2026-10-17 18:05:31.204519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "f3a9c6e1b7d2"
+down_revision = "e7b2d54a1c90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "data",
+        sa.Column(
+            "content_hash", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True
+        ),
+    )
+    op.create_index(
+        "ix_data_project_content_hash",
+        "data",
+        ["project_id", "content_hash"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_data_project_content_hash", table_name="data")
+    op.drop_column("data", "content_hash")
@@ -1,15 +1,43 @@
 from typing import Any, List, Dict, Optional
 from fastapi import APIRouter, Body, HTTPException, Query
-from sqlmodel import select
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from app.api.deps import SessionDep
 from app.models.annotation import Annotation, AnnotationCreate, AnnotationOut
 from app.models.data import Data
 from app.models.workflow import WorkflowNodeExecution
+from app.utils.batch_utils import group_by_key
 
 router = APIRouter()
 
 
+def get_data_with_annotations(session: Session, query: SelectOfScalar) -> List[Dict]:
+    """获取查询结果中的数据及其标注, 标注用一次子查询取出, 查询次数与数据量无关"""
+    data_list = session.exec(query).all()
+    annotations = group_by_key(
+        session.exec(
+            select(Annotation)
+            .where(Annotation.data_id.in_(query.with_only_columns(Data.data_id)))
+            .order_by(Annotation.annotation_id)
+        ).all(),
+        lambda ann: ann.data_id,
+    )
+
+    return [
+        {
+            "data_id": data.data_id,
+            "path": data.path,
+            "category": data.category,
+            "processing_stage": data.processing_stage,
+            "annotations": [
+                ann.model_dump() for ann in annotations.get(data.data_id, [])
+            ],
+        }
+        for data in data_list
+    ]
+
+
 @router.get("/data/{data_id}", response_model=List[AnnotationOut])
 def read_annotations_by_data(
     data_id: int,
@@ -106,23 +134,7 @@ def get_annotations_by_workflow_node(
         query = query.where(Data.category == category)
 
     # 获取数据及其标注
-    results = []
-    for data in session.exec(query).all():
-        annotations = session.exec(
-            select(Annotation).where(Annotation.data_id == data.data_id)
-        ).all()
-
-        results.append(
-            {
-                "data_id": data.data_id,
-                "path": data.path,
-                "category": data.category,
-                "processing_stage": data.processing_stage,
-                "annotations": [ann.model_dump() for ann in annotations],
-            }
-        )
-
-    return results
+    return get_data_with_annotations(session, query)
 
 
 @router.get("/project/{project_id}/stage/{stage}")
@@ -143,23 +155,7 @@ def get_annotations_by_stage(
     if category:
         query = query.where(Data.category == category)
 
-    results = []
-    for data in session.exec(query).all():
-        annotations = session.exec(
-            select(Annotation).where(Annotation.data_id == data.data_id)
-        ).all()
-
-        results.append(
-            {
-                "data_id": data.data_id,
-                "path": data.path,
-                "category": data.category,
-                "processing_stage": data.processing_stage,
-                "annotations": [ann.model_dump() for ann in annotations],
-            }
-        )
-
-    return results
+    return get_data_with_annotations(session, query)
 
 
 @router.delete("/data/{data_id}")
@@ -2,55 +2,179 @@ import mimetypes
 import os
 import logging
 import traceback
-from typing import List, Dict, Optional
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse
-from sqlmodel import select
+from typing import List, Dict, Optional, Tuple
+import cv2
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlmodel import Session, select
 
 from app.api.deps import SessionDep
 from app.models.data import Data
-from app.models.project import Project
 from app.models.workflow import ProcessedData, WorkflowNodeExecution, WorkflowExecution
+from app.core.cache import (
+    FileLocation,
+    cache_stats,
+    get_data_location,
+    get_processed_location,
+    get_project_data_dir,
+    path_cache,
+)
 from app.core.config import settings
+from app.core.workflow.mask_store import MaskStore, find_mask_refs, rle_encode
+from app.core.workflow.thumbnail_store import (
+    PYRAMID_LEVELS,
+    get_pyramid_level,
+    get_thumbnail_cache,
+    thumbnail_key,
+)
+from app.utils.batch_utils import group_by_key
+from app.utils.file_response import file_response, is_not_modified
+from app.utils.pagination import PageDep, fetch_page
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def locate_file(session: Session, kind: str, item_id: int) -> Tuple[FileLocation, str]:
+    """通过缓存解析数据 ("data") 或处理结果 ("processed") 的完整路径
+
+    文件不存在时清除缓存重新查询一次 (缓存的路径可能已过期)。
+    """
+    resolve = get_data_location if kind == "data" else get_processed_location
+    location = resolve(session, item_id)
+    if location is not None and not os.path.exists(
+        os.path.join(location.data_dir, "data", location.path)
+    ):
+        path_cache.invalidate((kind, item_id))
+        location = resolve(session, item_id)
+    if location is None:
+        detail = "Data not found" if kind == "data" else "Processed data not found"
+        raise HTTPException(status_code=404, detail=detail)
+    return location, os.path.join(location.data_dir, "data", location.path)
+
+
+async def thumbnail_response(
+    request: Request, data_dir: str, relative_path: str, size: int
+) -> Response:
+    """返回源图像的缩略图, ETag 由源文件和金字塔级别决定, 命中时不读取缓存"""
+    source_path = os.path.join(data_dir, "data", relative_path)
+    try:
+        stat_result = os.stat(source_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file not found")
+
+    etag = f'"{thumbnail_key(source_path, stat_result, get_pyramid_level(size))}"'
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache = get_thumbnail_cache(data_dir)
+    try:
+        thumbnail_path, _ = await cache.get(source_path, size)
+    except OSError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return file_response(
+        request,
+        str(thumbnail_path),
+        media_type="image/jpeg",
+        etag=etag,
+        last_modified=stat_result.st_mtime,
+        cache_control="no-cache",
+    )
+
+
+@router.get("/cache/stats")
+def read_cache_stats() -> List[Dict]:
+    """进程内实体缓存的命中统计"""
+    return cache_stats()
+
+
 @router.get("/{data_id}/image", response_class=FileResponse)
 async def read_original_image(
     data_id: int,
+    request: Request,
     session: SessionDep,
-) -> FileResponse:
+) -> Response:
     """获取原始图像"""
-    data = session.get(Data, data_id)
-    if not data:
-        raise HTTPException(status_code=404, detail="Data not found")
-
-    project = session.get(Project, data.project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    file_path = os.path.join(project.data_dir, "data", data.path)
+    location, file_path = locate_file(session, "data", data_id)
     if not os.path.exists(file_path):
         raise HTTPException(
-            status_code=404, detail=f"Image file not found: {data.path}"
+            status_code=404, detail=f"Image file not found: {location.path}"
         )
 
     try:
         mime_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-        return FileResponse(
-            path=file_path, filename=os.path.basename(file_path), media_type=mime_type
+        return file_response(
+            request, file_path, media_type=mime_type, filename=os.path.basename(file_path)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error accessing file: {str(e)}")
 
 
+@router.get("/{data_id}/thumbnail")
+async def read_data_thumbnail(
+    data_id: int,
+    request: Request,
+    session: SessionDep,
+    size: int = Query(256, ge=1, le=PYRAMID_LEVELS[-1], description="缩略图长边像素"),
+) -> Response:
+    """获取数据图像的缩略图, 尺寸按金字塔级别生成并缓存在项目目录下"""
+    location, _ = locate_file(session, "data", data_id)
+    return await thumbnail_response(request, location.data_dir, location.path, size)
+
+
+@router.get("/{data_id}/mask")
+async def read_data_mask(
+    data_id: int,
+    request: Request,
+    session: SessionDep,
+    index: int = Query(0, ge=0, description="掩码序号, 实例分割时为实例下标"),
+    format: str = Query("png", pattern="^(png|rle)$", description="返回格式"),
+):
+    """按需解码数据的分割掩码, png 返回掩码图片, rle 返回游程编码"""
+    data = session.get(Data, data_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="Data not found")
+
+    data_dir = get_project_data_dir(session, data.project_id)
+    if not data_dir:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    mask_store = MaskStore(data_dir)
+    refs = find_mask_refs(data.metadata_)
+    if format == "png" and index < len(refs) and refs[index]["format"] == "png":
+        # 已经是 PNG 文件, 直接返回
+        mask_path = mask_store.full_path(refs[index]["mask_path"])
+        if not mask_path.exists():
+            raise HTTPException(status_code=404, detail="Mask file not found")
+        return file_response(request, str(mask_path), media_type="image/png")
+
+    try:
+        mask = await run_in_threadpool(
+            mask_store.load_from_metadata, data.metadata_, index
+        )
+    except OSError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if mask is None:
+        raise HTTPException(status_code=404, detail="Mask not found")
+
+    if format == "rle":
+        return {"data_id": data_id, "index": index, "rle": rle_encode(mask)}
+
+    success, buffer = cv2.imencode(".png", mask)
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to encode mask")
+    return Response(content=buffer.tobytes(), media_type="image/png")
+
+
 @router.get("/preprocessed/{data_id}/image", response_class=FileResponse)
 async def read_processed_image(
     data_id: int,
+    request: Request,
     session: SessionDep,
-) -> FileResponse:
+) -> Response:
     """获取处理后的图像"""
     try:
         logger.info(f"Reading processed image for data_id: {data_id}")
@@ -77,11 +201,14 @@ async def read_processed_image(
             )
 
         mime_type = mimetypes.guess_type(abs_file_path)[0] or "application/octet-stream"
-        return FileResponse(
-            path=abs_file_path,
-            filename=os.path.basename(abs_file_path),
+        return file_response(
+            request,
+            abs_file_path,
             media_type=mime_type,
+            filename=os.path.basename(abs_file_path),
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in read_processed_image: {str(e)}")
         logger.error(traceback.format_exc())
@@ -116,16 +243,25 @@ async def get_processed_data_by_stage(
             query = query.where(Data.node_execution_id == node_execution.id)
 
     data = session.exec(query).all()
+
+    # 用子查询一次取出所有数据的处理记录, 查询次数与数据量无关
+    processed_data = group_by_key(
+        session.exec(
+            select(ProcessedData)
+            .where(
+                ProcessedData.original_data_id.in_(
+                    query.with_only_columns(Data.data_id)
+                )
+            )
+            .order_by(ProcessedData.id)
+        ).all(),
+        lambda p: p.original_data_id,
+    )
     return [
         {
             **d.model_dump(),
             "processed_data": [
-                p.model_dump()
-                for p in session.exec(
-                    select(ProcessedData).where(
-                        ProcessedData.original_data_id == d.data_id
-                    )
-                ).all()
+                p.model_dump() for p in processed_data.get(d.data_id, [])
             ],
         }
         for d in data
@@ -165,11 +301,13 @@ async def get_project_stage_data(
     project_id: int,
     stage: str,
     session: SessionDep,
+    response: Response,
+    page: PageDep,
     category: Optional[str] = None,
     workflow_execution_id: Optional[int] = None,
     node_type: Optional[str] = None,
 ) -> List[Dict]:
-    """获取项目特定处理阶段的数据"""
+    """获取项目特定处理阶段的数据 (按 data_id 游标分页)"""
     # 首先获取最新的工作流执行记录
     latest_execution = None
     if node_type:
@@ -189,27 +327,17 @@ async def get_project_stage_data(
         ).first()
 
     # 构建查询
-    if stage == "original":
-        query = select(Data).where(
-            Data.project_id == project_id, Data.processing_stage == stage
-        )
-    else:
-        query = select(Data).where(
-            Data.project_id == project_id,
-            Data.processing_stage == stage,
-        )
-
-    data = session.exec(query).all()
-
-    return [
-        {
-            "data_id": d.data_id,
-            "path": d.path,
-            "metadata_": d.metadata_,
-            "original_data_id": d.original_data_id,
-        }
-        for d in data
-    ]
+    filters = [Data.project_id == project_id, Data.processing_stage == stage]
+
+    return fetch_page(
+        session,
+        Data,
+        Data.data_id,
+        filters,
+        page,
+        response,
+        default_fields=["data_id", "path", "metadata_", "original_data_id"],
+    )
 
 
 @router.get("/preprocessed/{data_id}/metadata")
@@ -221,24 +349,28 @@ def read_processed_metadata(data_id: int, session: SessionDep):
     return processed_data.metadata_
 
 
-@router.get("/preprocessed/{data_id}/image", response_class=FileResponse)
-def read_processed_image(data_id: int, session: SessionDep):
-    """获取处理后的图片"""
-    processed_data = session.get(ProcessedData, data_id)
-    if not processed_data:
-        raise HTTPException(status_code=404, detail="Processed data not found")
+@router.get("/preprocessed/{data_id}/thumbnail")
+async def read_processed_thumbnail(
+    data_id: int,
+    request: Request,
+    session: SessionDep,
+    size: int = Query(256, ge=1, le=PYRAMID_LEVELS[-1], description="缩略图长边像素"),
+) -> Response:
+    """获取处理后图像的缩略图"""
+    location, _ = locate_file(session, "processed", data_id)
+    return await thumbnail_response(request, location.data_dir, location.path, size)
 
-    project = session.get(Project, processed_data.project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
 
-    file_path = os.path.join(project.data_dir, "data", processed_data.file_path)
+@router.get("/preprocessed/{data_id}/image", response_class=FileResponse)
+def read_processed_image(data_id: int, request: Request, session: SessionDep) -> Response:
+    """获取处理后的图片"""
+    location, file_path = locate_file(session, "processed", data_id)
     if not os.path.exists(file_path):
         raise HTTPException(
-            status_code=404, detail=f"Image file not found: {processed_data.file_path}"
+            status_code=404, detail=f"Image file not found: {location.path}"
         )
 
     # 返回处理后的图片
-    return FileResponse(
-        file_path, media_type="image/jpeg", filename=processed_data.filename
+    return file_response(
+        request, file_path, media_type="image/jpeg", filename=os.path.basename(file_path)
     )
@@ -4,6 +4,7 @@ from sqlmodel import Session, select
 import numpy as np
 
 from app.api.deps import SessionDep
+from app.core.cache import get_project_data_dir, get_project_labels, invalidate_labels
 from app.models.annotation import Annotation
 from app.models.label import Label, LabelCreate, LabelOut, LabelUpdate
 from app.models.project import Project
@@ -93,6 +94,7 @@ def create_label(
         label = Label.model_validate(label_in)
         session.add(label)
         session.commit()
+        invalidate_labels(label.project_id)
         session.refresh(label)
         return label
     except Exception as e:
@@ -144,6 +146,7 @@ def update_label(
             
         session.add(label)
         session.commit()
+        invalidate_labels(label.project_id)
         session.refresh(label)
         return label
     except Exception as e:
@@ -184,6 +187,7 @@ def delete_label(*, session: SessionDep, label_id: int) -> Any:
 
         session.delete(label)
         session.commit()
+        invalidate_labels(label.project_id)
         return label
     except Exception as e:
         session.rollback()
@@ -192,13 +196,11 @@ def delete_label(*, session: SessionDep, label_id: int) -> Any:
 
 @router.get("/project/{project_id}", response_model=List[LabelOut])
 def read_labels_by_project(project_id: int, session: SessionDep) -> Any:
-    """获取项目的所有标签"""
-    project = session.get(Project, project_id)
-    if not project:
+    """获取项目的所有标签 (使用进程内缓存, 标签修改时失效)"""
+    if not get_project_data_dir(session, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-        
-    labels = session.exec(select(Label).where(Label.project_id == project_id)).all()
-    return labels
+
+    return get_project_labels(session, project_id)
 
 
 @router.delete("/project/{project_id}")
@@ -226,6 +228,7 @@ def delete_project_labels(project_id: int, session: SessionDep) -> Dict:
             session.delete(label)
             
         session.commit()
+        invalidate_labels(project_id)
         return {"message": "Labels deleted successfully"}
     except Exception as e:
         session.rollback()
@@ -271,6 +274,7 @@ def batch_create_project_labels(
             created_labels.append(label)
             
         session.commit()
+        invalidate_labels(project_id)
         return created_labels
     except Exception as e:
         session.rollback()
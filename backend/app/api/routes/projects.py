@@ -1,27 +1,47 @@
 import os
-import os.path as osp
 import platform
 import re
 from datetime import datetime, timezone
 from pathlib import Path
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.models.workflow import ProcessedData, Workflow
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlmodel import Session, select
 import logging
 from app.api.deps import CurrentSuperUser, SessionDep
+from app.core.cache import bump_data_generation, invalidate_project
 from app.core.config import settings
+from app.core.workflow.file_gc import schedule_project_sweep
 from app.models.data import Data
 from app.models.project import Project, ProjectCreate, ProjectOut, ProjectUpdate
 from app.models.task import Task
+from app.utils.batch_utils import SQL_IN_CHUNK_SIZE, chunked
 from app.utils.label_utils import parse_order_by
+from app.utils.pagination import PageDep, fetch_page
+from app.utils.upload import (
+    IMAGE_EXTENSIONS,
+    UPLOAD_TMP_DIR,
+    ChunkedUpload,
+    cleanup_stale_uploads,
+    extract_archive,
+    is_archive_file,
+    is_image_file,
+    link_duplicate,
+    save_image_uploads,
+    save_upload_to_temp,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# 批量导入时每条 INSERT 的行数
+IMPORT_CHUNK_SIZE = 1000
+
 
 def validate_directory_path(path: str) -> tuple[bool, str]:
     """
@@ -126,18 +146,77 @@ def _validate_unix_path(path: str) -> tuple[bool, str]:
     return True, ""
 
 
-def import_dataset(session: Session, project: Project):
-    """导入数据集"""
-    print(f"Importing data for project: {project.name}")
-    original_dir = os.path.join(project.data_dir, "data", "original")
-
-    # 获取所有图片文件
+def scan_image_files(original_dir: str) -> List[str]:
+    """扫描 original 目录下的所有图片, 返回相对于 data/ 的路径"""
     image_files = []
     for root, _, files in os.walk(original_dir):
         for file in files:
-            if any(file.lower().endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".gif", ".bmp"]):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
                 rel_path = os.path.relpath(os.path.join(root, file), original_dir)
                 image_files.append(os.path.join("original", rel_path))
+    return image_files
+
+
+def get_existing_paths(session: Session, task_id: int, image_files: List[str]) -> set:
+    """查询任务中已导入的路径"""
+    if len(image_files) > SQL_IN_CHUNK_SIZE:
+        # 全量导入: 一次查询出任务的所有路径
+        return set(session.exec(select(Data.path).where(Data.task_id == task_id)).all())
+
+    return set(
+        session.exec(
+            select(Data.path).where(
+                Data.task_id == task_id, Data.path.in_(image_files)
+            )
+        ).all()
+    )
+
+
+def find_content_duplicates(
+    session: Session, project_id: int, content_hashes: Dict[str, str]
+) -> Dict[str, str]:
+    """按内容哈希查找重复文件, 返回 {路径: 内容相同的已有路径}
+
+    项目中已导入的文件和同一批中更早出现的文件视为已有文件。
+    """
+    canonical: Dict[str, str] = {}
+    for chunk in chunked(list(set(content_hashes.values()))):
+        for content_hash, path in session.exec(
+            select(Data.content_hash, Data.path)
+            .where(
+                Data.project_id == project_id,
+                Data.processing_stage == "original",
+                Data.content_hash.in_(chunk),
+            )
+            .order_by(Data.data_id)
+        ).all():
+            canonical.setdefault(content_hash, path)
+
+    duplicates = {}
+    for path, content_hash in content_hashes.items():
+        canonical_path = canonical.setdefault(content_hash, path)
+        if canonical_path != path:
+            duplicates[path] = canonical_path
+    return duplicates
+
+
+def import_dataset(
+    session: Session,
+    project: Project,
+    image_files: Optional[List[str]] = None,
+    content_hashes: Optional[Dict[str, str]] = None,
+) -> int:
+    """导入数据集, 返回新增的数据数量
+
+    image_files 为 None 时扫描整个 original 目录, 否则只导入给定的文件 (上传后增量导入)。
+    已存在的路径一次查询到集合中比对, 新记录分块批量插入。
+    content_hashes 中没有的文件 (扫描目录导入) 内容哈希为空, 不在请求中逐个读取文件,
+    由图像源节点运行时在共享执行器中并行补算。
+    """
+    print(f"Importing data for project: {project.name}")
+    if image_files is None:
+        original_dir = os.path.join(project.data_dir, "data", "original")
+        image_files = scan_image_files(original_dir)
 
     print(f"Found {len(image_files)} image files")
 
@@ -148,36 +227,53 @@ def import_dataset(session: Session, project: Project):
         session.add(task)
         session.commit()
 
+    existing_paths = get_existing_paths(session, task.task_id, image_files)
+    new_files = list(dict.fromkeys(p for p in image_files if p not in existing_paths))
+
+    content_hashes = content_hashes or {}
+
     # 创建数据记录
-    for image_path in image_files:
-        existing_data = session.exec(
-            select(Data).where(
-                Data.path == image_path,
-                Data.task_id == task.task_id
-            )
-        ).first()
-
-        if not existing_data:
-            data = Data(
-                path=image_path,
-                task_id=task.task_id,
-                project_id=project.project_id,
-                processing_stage="original",
-                metadata_={
-                    "import_time": datetime.now(timezone.utc).isoformat(),
-                    "original_path": image_path
-                }
-            )
-            session.add(data)
+    import_time = datetime.now(timezone.utc).isoformat()
+    try:
+        for chunk in chunked(new_files, IMPORT_CHUNK_SIZE):
+            rows = [
+                Data(
+                    path=image_path,
+                    task_id=task.task_id,
+                    project_id=project.project_id,
+                    processing_stage="original",
+                    content_hash=content_hashes.get(image_path),
+                    metadata_={
+                        "import_time": import_time,
+                        "original_path": image_path,
+                    },
+                ).model_dump(exclude={"data_id"})
+                for image_path in chunk
+            ]
+            session.execute(insert(Data), rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
 
-    session.commit()
-    print("Data import completed")
+    print(f"Data import completed: {len(new_files)} new, {len(existing_paths)} existing")
+    return len(new_files)
 
 
 class UploadResponse(BaseModel):
     """Upload response schema"""
     message: str
     uploaded_files: List[str]
+    # 上传文件的 sha256, 键为相对于 data/ 的路径
+    content_hashes: Dict[str, str] = {}
+    # 与已有文件内容相同、以硬链接保存的文件: {路径: 已有文件路径}
+    duplicate_files: Dict[str, str] = {}
+
+
+class ChunkedUploadCreate(BaseModel):
+    """分块上传参数"""
+    filename: str
+    size: Optional[int] = None
 
 
 @router.get("/", response_model=List[ProjectOut])
@@ -338,7 +434,11 @@ def update_project(
 
     project.modified = datetime.now(timezone.utc)
     session.add(project)
+    if "data_dir" in update_data:
+        # 数据目录变化, 其他进程缓存的文件路径随之失效
+        bump_data_generation(session, project_id)
     session.commit()
+    invalidate_project(project_id)
     session.refresh(project)
     return ProjectOut.model_validate(project)
 
@@ -372,6 +472,7 @@ def delete_project(
         # 删除数据库记录
         session.delete(project)
         session.commit()
+        invalidate_project(project_id)
         return {"message": "Project deleted successfully"}
 
     except Exception as e:
@@ -379,13 +480,62 @@ def delete_project(
         raise HTTPException(status_code=500, detail=f"Failed to delete project: {str(e)}")
 
 
+@router.post("/{project_id}/gc")
+def collect_project_garbage(
+    *,
+    session: SessionDep,
+    project_id: int,
+) -> Dict:
+    """在后台清理项目输出目录中不再被任何数据引用的文件"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    schedule_project_sweep(project.project_id, project.data_dir)
+    return {"message": "File garbage collection scheduled"}
+
+
+def import_uploaded_files(
+    session: Session, project: Project, saved: List[Tuple[str, str]]
+) -> UploadResponse:
+    """导入已写入 original 目录的上传文件
+
+    内容与项目中已有文件 (或同批更早的文件) 相同的上传文件被替换为指向已有文件的硬链接,
+    图像源只输出每种内容一次, 因此重复图片不会被重复处理。
+    """
+    if not saved:
+        raise HTTPException(status_code=400, detail="No valid image files were uploaded")
+
+    content_hashes = {
+        os.path.join("original", filename): content_hash
+        for filename, content_hash in saved
+    }
+    duplicate_files = find_content_duplicates(session, project.project_id, content_hashes)
+    data_root = os.path.join(project.data_dir, "data")
+    for path, canonical_path in duplicate_files.items():
+        link_duplicate(os.path.join(data_root, canonical_path), os.path.join(data_root, path))
+
+    # 只导入本次上传的文件
+    uploaded_files = list(content_hashes)
+    import_dataset(session, project, uploaded_files, content_hashes)
+    return UploadResponse(
+        message="Files uploaded successfully",
+        uploaded_files=uploaded_files,
+        content_hashes=content_hashes,
+        duplicate_files=duplicate_files,
+    )
+
+
 @router.post("/{project_id}/upload")
 async def upload_project_files(
     project_id: int,
     session: SessionDep,
     files: List[UploadFile] = File(...),
 ) -> UploadResponse:
-    """上传项目文件"""
+    """上传项目文件 (图片或 zip/tar 压缩包)
+
+    文件分块流式写入磁盘, 写入时计算内容哈希; 多个文件并行写入, 压缩包在线程池中解压。
+    """
     project = session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -394,64 +544,131 @@ async def upload_project_files(
         original_dir = os.path.join(project.data_dir, "data", "original")
         os.makedirs(original_dir, exist_ok=True)
 
-        uploaded_files = []
-        for file in files:
-            if not file.content_type.startswith("image/"):
+        saved, others = await save_image_uploads(files, original_dir)
+        tmp_dir = os.path.join(project.data_dir, UPLOAD_TMP_DIR)
+        for file in others:
+            if not is_archive_file(file.filename or ""):
                 continue
+            archive_path = await save_upload_to_temp(file, tmp_dir)
+            try:
+                saved.extend(
+                    await run_in_threadpool(extract_archive, archive_path, original_dir)
+                )
+            finally:
+                os.remove(archive_path)
 
-            filename = handle_duplicate_filename(original_dir, file.filename)
-            file_path = os.path.join(original_dir, filename)
+        return import_uploaded_files(session, project, saved)
 
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-            relative_path = os.path.join("original", filename)
-            uploaded_files.append(relative_path)
 
-        if uploaded_files:
-            import_dataset(session, project)
-            return UploadResponse(
-                message="Files uploaded successfully",
-                uploaded_files=uploaded_files
-            )
+@router.post("/{project_id}/uploads")
+def create_chunked_upload(
+    project_id: int,
+    session: SessionDep,
+    upload_in: ChunkedUploadCreate,
+) -> Dict:
+    """创建可续传的分块上传, 返回 upload_id"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not (is_image_file(upload_in.filename) or is_archive_file(upload_in.filename)):
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    # 顺带清理该项目中已放弃的上传
+    cleanup_stale_uploads(project.data_dir)
+    return ChunkedUpload.create(project.data_dir, upload_in.filename, upload_in.size).status()
+
+
+@router.get("/{project_id}/uploads/{upload_id}")
+def get_chunked_upload(project_id: int, upload_id: str, session: SessionDep) -> Dict:
+    """查询分块上传的进度, 中断后从返回的 offset 继续上传"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return ChunkedUpload(project.data_dir, upload_id).status()
+
+
+@router.put("/{project_id}/uploads/{upload_id}")
+async def upload_chunk(
+    project_id: int,
+    upload_id: str,
+    request: Request,
+    session: SessionDep,
+    offset: int = Query(..., ge=0, description="本分块在文件中的起始位置"),
+) -> Dict:
+    """上传一个分块, 请求体为原始字节, 流式追加到临时文件"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    upload = ChunkedUpload(project.data_dir, upload_id)
+    new_offset = await upload.append(request.stream(), offset)
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@router.post("/{project_id}/uploads/{upload_id}/complete")
+async def complete_chunked_upload(
+    project_id: int, upload_id: str, session: SessionDep
+) -> UploadResponse:
+    """完成分块上传: 图片移动到 original 目录, 压缩包在线程池中解压, 然后导入"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    upload = ChunkedUpload(project.data_dir, upload_id)
+    original_dir = os.path.join(project.data_dir, "data", "original")
+    os.makedirs(original_dir, exist_ok=True)
+
+    # 持有追加锁, 完成过程中不会有分块继续写入
+    async with upload.lock():
+        upload.check_complete()
+        if is_archive_file(upload.meta["filename"]):
+            try:
+                saved = await run_in_threadpool(
+                    extract_archive, upload.part_path, original_dir
+                )
+            finally:
+                upload.discard()
         else:
-            raise HTTPException(status_code=400, detail="No valid image files were uploaded")
+            saved = [await run_in_threadpool(upload.move_to, original_dir)]
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    return import_uploaded_files(session, project, saved)
+
+
+@router.delete("/{project_id}/uploads/{upload_id}")
+def abort_chunked_upload(project_id: int, upload_id: str, session: SessionDep) -> Dict:
+    """取消分块上传并删除已接收的数据"""
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    ChunkedUpload(project.data_dir, upload_id).discard()
+    return {"message": "Upload aborted"}
 
 
 @router.get("/{project_id}/data")
 async def get_project_data(
     project_id: int,
     session: SessionDep,
+    response: Response,
+    page: PageDep,
     stage: Optional[str] = None,
     category: Optional[str] = None,
 ) -> List[Dict]:
-    """获取项目数据"""
+    """获取项目数据 (按 data_id 游标分页)"""
     project = session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    query = select(Data).where(Data.project_id == project_id)
+    filters = [Data.project_id == project_id]
     if stage:
-        query = query.where(Data.processing_stage == stage)
+        filters.append(Data.processing_stage == stage)
     if category:
-        query = query.where(Data.category == category)
-
-    data = session.exec(query).all()
-    return [d.model_dump() for d in data]
-
-
-def handle_duplicate_filename(base_path: str, filename: str) -> str:
-    """处理重复文件名，通过添加数字后缀的方式"""
-    name, ext = osp.splitext(filename)
-    counter = 1
-    new_filename = filename
-
-    while osp.exists(osp.join(base_path, new_filename)):
-        new_filename = f"{name}_{counter}{ext}"
-        counter += 1
+        filters.append(Data.category == category)
 
-    return new_filename
+    return fetch_page(session, Data, Data.data_id, filters, page, response)
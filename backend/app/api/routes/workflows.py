@@ -1,7 +1,8 @@
 # backend/app/api/routes/workflows.py
 
-from typing import List, Any, Optional, Dict
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from typing import List, Any, Literal, Optional, Dict
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from app.api.deps import SessionDep, CurrentSuperUser
 from app.models.workflow import (
@@ -15,14 +16,20 @@ from app.models.workflow import (
     NodeStatus,
 )
 from app.models.data import Data
-from app.core.workflow.build_workflow import (
-    validate_workflow_config,
-    create_langgraph_workflow,
-)
+from app.core.workflow.build_workflow import validate_workflow_config
 from app.core.workflow.data_manager import WorkflowDataManager
+from app.core.workflow.job_queue import (
+    enqueue_execution,
+    get_active_job,
+    request_cancel,
+)
+from app.core.workflow.scheduler import (
+    build_graph,
+    compute_critical_path,
+    topological_order,
+)
 from datetime import datetime, timezone
 from app.core.workflow.node_processors import NODE_PROCESSORS
-from app.core.workflow.tqx_state import WorkflowState
 from app.core.workflow.node_processors.image_source_processor import (
     ImageSourceNodeProcessor,
 )
@@ -41,7 +48,12 @@ from app.core.workflow.node_processors.semantic_segmentation_processor import (
 from app.core.workflow.node_processors.classification_processor import (
     ClassificationNodeProcessor,
 )
+from app.core.workflow.node_processors.thumbnail_processor import (
+    ThumbnailNodeProcessor,
+)
 from app.core.workflow.node_processors.base_processor import BaseNodeProcessor
+from app.utils.export import stream_query
+from app.utils.pagination import PageDep, fetch_page, resolve_fields
 import os
 
 router = APIRouter()
@@ -54,6 +66,7 @@ NODE_PROCESSORS = {
     "instance_segmentation": InstanceSegmentationNodeProcessor,
     "semantic_segmentation": SemanticSegmentationNodeProcessor,
     "classification": ClassificationNodeProcessor,
+    "thumbnail": ThumbnailNodeProcessor,
 }
 
 
@@ -121,35 +134,6 @@ async def process_node(
         session.commit()
 
 
-async def execute_workflow_async(execution_id: int, session: Session) -> None:
-    """异步执行工作流"""
-    execution = session.get(WorkflowExecution, execution_id)
-    if not execution or not execution.config.get("nodes"):
-        return
-
-    try:
-        data_manager = WorkflowDataManager(execution.project_id, execution_id, session)
-        
-        # 检查是否是单节点执行
-        if len(execution.config["nodes"]) == 1:
-            # 单节点执行，直接返回
-            return
-            
-        # 多节点执行的逻辑...
-
-        execution.status = "completed"
-        execution.completed_at = datetime.now(timezone.utc)
-
-    except Exception as e:
-        print(f"Workflow execution error: {str(e)}")
-        execution.status = "failed"
-        execution.error_message = str(e)
-        execution.completed_at = datetime.now(timezone.utc)
-    finally:
-        session.add(execution)
-        session.commit()
-
-
 @router.post("/", response_model=WorkflowOut)
 def create_workflow(
     *,
@@ -180,7 +164,6 @@ def get_workflow(workflow_id: int, session: SessionDep) -> Any:
 async def execute_workflow(
     workflow_id: int,
     session: SessionDep,
-    background_tasks: BackgroundTasks,
 ) -> Dict:
     workflow = session.get(Workflow, workflow_id)
     if not workflow:
@@ -196,12 +179,13 @@ async def execute_workflow(
     session.commit()
     session.refresh(execution)
 
-    # 启动异步执行
-    background_tasks.add_task(execute_workflow_async, execution.execution_id, session)
+    # 加入任务队列, 由 worker 进程执行
+    job = enqueue_execution(session, execution)
 
     return {
         "message": "Workflow execution started",
         "execution_id": execution.execution_id,
+        "job_id": job.job_id,
     }
 
 
@@ -216,6 +200,7 @@ async def get_execution_status(
 
     # 获取所有节点的状态
     node_statuses = {}
+    durations = {}
     for node in execution.node_executions:
         node_statuses[node.node_id] = {
             "status": node.status,
@@ -223,14 +208,32 @@ async def get_execution_status(
             "completed_at": node.completed_at,
             "error_message": node.error_message,
         }
+        if node.started_at and node.completed_at:
+            durations[node.node_id] = (
+                node.completed_at - node.started_at
+            ).total_seconds()
+
+    # 根据节点耗时计算关键路径
+    critical_path: List[str] = []
+    critical_path_time = 0.0
+    try:
+        _, upstream = build_graph(execution.config or {})
+        critical_path, critical_path_time = compute_critical_path(upstream, durations)
+    except (KeyError, ValueError):
+        pass
+
+    job = get_active_job(session, execution_id)
 
     return {
         "execution_id": execution_id,
         "status": execution.status,
+        "job": job.model_dump() if job else None,
         "started_at": execution.started_at,
         "completed_at": execution.completed_at,
         "error_message": execution.error_message,
         "nodes": node_statuses,
+        "critical_path": critical_path,
+        "critical_path_time": critical_path_time,
     }
 
 
@@ -239,35 +242,68 @@ async def get_execution_stage_data(
     execution_id: int,
     stage: str,
     session: SessionDep,
+    response: Response,
+    page: PageDep,
     category: Optional[str] = None,
 ) -> List[Dict]:
-    """获取工作流执行特定阶段的数据"""
-    query = select(Data).where(
-        Data.workflow_execution_id == execution_id, Data.processing_stage == stage
-    )
+    """获取工作流执行特定阶段的数据 (按 data_id 游标分页)"""
+    filters = [
+        Data.workflow_execution_id == execution_id,
+        Data.processing_stage == stage,
+    ]
 
+    if category:
+        filters.append(Data.category == category)
+
+    return fetch_page(session, Data, Data.data_id, filters, page, response)
+
+
+@router.get("/execution/{execution_id}/data/{stage}/export")
+async def export_execution_stage_data(
+    execution_id: int,
+    stage: str,
+    format: Literal["ndjson", "arrow"] = "ndjson",
+    category: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> StreamingResponse:
+    """流式导出工作流执行特定阶段的数据 (NDJSON 或 Arrow IPC)"""
+    field_names = resolve_fields(Data, fields)
+    query = (
+        select(*[getattr(Data, name) for name in field_names])
+        .where(
+            Data.workflow_execution_id == execution_id,
+            Data.processing_stage == stage,
+        )
+        .order_by(Data.data_id)
+    )
     if category:
         query = query.where(Data.category == category)
 
-    data = session.exec(query).all()
-    return [d.model_dump() for d in data]
+    return stream_query(
+        query, field_names, format, f"execution_{execution_id}_{stage}"
+    )
 
 
 @router.get("/node/{node_execution_id}/data")
 async def get_node_data(
     node_execution_id: int,
     session: SessionDep,
+    response: Response,
+    page: PageDep,
 ) -> List[Dict]:
-    """获取节点处理的数据"""
+    """获取节点处理的数据 (按 data_id 游标分页)"""
     node_execution = session.get(WorkflowNodeExecution, node_execution_id)
     if not node_execution:
         raise HTTPException(status_code=404, detail="Node execution not found")
 
-    data = session.exec(
-        select(Data).where(Data.node_execution_id == node_execution_id)
-    ).all()
-
-    return [d.model_dump() for d in data]
+    return fetch_page(
+        session,
+        Data,
+        Data.data_id,
+        [Data.node_execution_id == node_execution_id],
+        page,
+        response,
+    )
 
 
 @router.post("/{workflow_id}/execute_node")
@@ -275,9 +311,8 @@ async def execute_single_node(
     workflow_id: int,
     node_id: str,
     session: SessionDep,
-    background_tasks: BackgroundTasks,
 ) -> Dict:
-    """执行单个节点"""
+    """执行单个节点: 在请求中确定输入数据, 节点由 worker 进程执行"""
     print(f"\n{'='*50}")
     print(f"Starting execution of node: {node_id}")
     print(f"{'='*50}")
@@ -293,33 +328,23 @@ async def execute_single_node(
     if not node_config:
         raise HTTPException(status_code=404, detail=f"Node {node_id} not found")
 
-    print(f"\nNode configuration:")
+    print("\nNode configuration:")
     print(f"- ID: {node_config['id']}")
     print(f"- Type: {node_config['type']}")
     print(f"- Parameters: {node_config.get('params', {})}")
 
-    # 创建执行记录，只包含当前节点的配置
-    current_edges = [
-        edge for edge in workflow.config["edges"] if edge["target"] == node_id
-    ]
-
-    execution_config = {"nodes": [node_config], "edges": current_edges}
-
-    print("\nExecution configuration:")
-    print(f"- Nodes: {len(execution_config['nodes'])}")
-    print(f"- Edges: {len(execution_config['edges'])}")
-
+    # 只包含当前节点, 输入来自上游节点以前的执行结果, 不在本次执行中重新运行上游
     execution = WorkflowExecution(
         workflow_id=workflow_id,
         project_id=workflow.project_id,
         status="pending",
-        config=execution_config,
+        config={"nodes": [node_config], "edges": []},
     )
     session.add(execution)
     session.commit()
     print(f"\nCreated execution record: {execution.execution_id}")
 
-    # 创建节点执行记录
+    # 创建待执行的节点记录, 调度器执行时沿用它和它的输入数据
     node_execution = WorkflowNodeExecution(
         execution_id=execution.execution_id,
         node_id=node_id,
@@ -346,36 +371,14 @@ async def execute_single_node(
         else:
             print("No input data found")
 
-    # 启动节点处理
-    print("\nStarting node processing...")
-    data_manager = WorkflowDataManager(
-        workflow.project_id, execution.execution_id, session
-    )
-
-    # 只处理当前节点
-    processor_class = get_node_processor(node_config["type"])
-    processor = processor_class(node_execution, session, data_manager)
-    output_data_ids = await processor.process()
-
-    # 更新节点状态
-    node_execution.status = NodeStatus.COMPLETED
-    node_execution.output_data_ids = output_data_ids
-    node_execution.completed_at = datetime.now(timezone.utc)
-    session.add(node_execution)
-
-    # 更新执行状态
-    execution.status = NodeStatus.COMPLETED
-    execution.completed_at = datetime.now(timezone.utc)
-    session.add(execution)
-
-    session.commit()
-    print(f"\nNode {node_id} execution completed with {len(output_data_ids)} outputs")
+    # 加入任务队列, 与完整工作流一样在 worker 进程中执行, 不占用 Web 进程
+    job = enqueue_execution(session, execution)
 
     return {
-        "message": f"Node {node_id} execution completed",
+        "message": f"Node {node_id} execution started",
         "execution_id": execution.execution_id,
         "node_execution_id": node_execution.id,
-        "output_data_ids": output_data_ids,
+        "job_id": job.job_id,
     }
 
 
@@ -409,7 +412,7 @@ async def get_input_data_ids(
                 )
             else:
                 data_ids = await handle_normal_node_input(
-                    source_node, node_execution, session
+                    source_node, workflow, node_execution, session
                 )
 
             input_data_ids.extend(data_ids)
@@ -420,45 +423,46 @@ async def get_input_data_ids(
 @router.post("/{workflow_id}/execute_graph")
 async def execute_workflow_graph(
     workflow_id: int,
-    background_tasks: BackgroundTasks,
     session: SessionDep,
+    streaming: Optional[bool] = None,
 ) -> Dict:
-    """使用 langgraph 执行工作流（支持并行执行）"""
+    """把工作流加入任务队列, 由 worker 进程按 DAG 调度执行, 无依赖的分支并发执行
+
+    streaming 为 true 时节点之间流水线执行, 不传时使用工作流配置中的 streaming
+    """
     workflow = session.get(Workflow, workflow_id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
+    try:
+        # 校验 DAG (节点引用和环)
+        _, upstream = build_graph(workflow.config)
+        topological_order(upstream)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid workflow graph: {e}")
+
     try:
         # 创建执行记录
         execution = WorkflowExecution(
             workflow_id=workflow_id,
             project_id=workflow.project_id,
             status="pending",
-            config=workflow.config,
+            config=(
+                workflow.config
+                if streaming is None
+                else {**workflow.config, "streaming": streaming}
+            ),
         )
         session.add(execution)
         session.commit()
 
-        # 创建工作流图
-        graph = create_langgraph_workflow(
-            config=workflow.config, session=session, execution=execution, use_async=True
-        )
-
-        # 创建初始状态
-        initial_state = WorkflowState(data={})
-
-        # 异步执行工作流
-        background_tasks.add_task(
-            execute_graph_workflow,
-            graph=graph,
-            initial_state=initial_state,
-            execution_id=execution.execution_id,
-            session=session,
-        )
+        # 加入任务队列, 由 worker 进程中的 DAG 调度器执行, 独立分支并发运行
+        job = enqueue_execution(session, execution)
 
         return {
             "message": "Graph workflow execution started",
             "execution_id": execution.execution_id,
+            "job_id": job.job_id,
         }
 
     except Exception as e:
@@ -498,16 +502,16 @@ async def get_node_execution_status(
 async def retry_workflow_execution(
     execution_id: int,
     session: SessionDep,
-    background_tasks: BackgroundTasks,
 ) -> Dict:
-    """重试失败的工作流执行"""
+    """重试失败或已取消的工作流执行"""
     execution = session.get(WorkflowExecution, execution_id)
     if not execution:
         raise HTTPException(status_code=404, detail="Execution not found")
 
-    if execution.status != "failed":
+    if execution.status not in ("failed", "cancelled"):
         raise HTTPException(
-            status_code=400, detail="Only failed executions can be retried"
+            status_code=400,
+            detail="Only failed or cancelled executions can be retried",
         )
 
     # 重置执行状态
@@ -527,43 +531,38 @@ async def retry_workflow_execution(
     session.add(execution)
     session.commit()
 
-    # 重新启动执行
-    background_tasks.add_task(execute_workflow_async, execution.execution_id, session)
+    # 重新加入任务队列
+    job = enqueue_execution(session, execution)
 
-    return {"message": "Workflow execution retry started", "execution_id": execution_id}
+    return {
+        "message": "Workflow execution retry started",
+        "execution_id": execution_id,
+        "job_id": job.job_id,
+    }
 
 
-async def execute_graph_workflow(
-    graph: Any,
-    initial_state: WorkflowState,
+@router.post("/execution/{execution_id}/cancel")
+async def cancel_workflow_execution(
     execution_id: int,
-    session: Session,
-) -> None:
-    """异步执行 langgraph 工作流"""
-    try:
-        execution = session.get(WorkflowExecution, execution_id)
-        if not execution:
-            raise ValueError(f"Execution {execution_id} not found")
-
-        # 执行工作流图
-        final_state = await graph.ainvoke(initial_state)
-
-        # 更新执行状态
-        execution.status = "completed"
-        execution.completed_at = datetime.now(timezone.utc)
-        session.add(execution)
-        session.commit()
+    session: SessionDep,
+) -> Dict:
+    """取消工作流执行: 排队中的立即取消, 运行中的由 worker 中断"""
+    execution = session.get(WorkflowExecution, execution_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail="Execution not found")
 
-        print(f"Graph workflow execution completed: {final_state}")
+    job = request_cancel(session, execution_id)
+    if not job:
+        raise HTTPException(
+            status_code=400, detail="Execution is not queued or running"
+        )
 
-    except Exception as e:
-        print(f"Error executing graph workflow: {str(e)}")
-        if execution:
-            execution.status = "failed"
-            execution.error_message = str(e)
-            execution.completed_at = datetime.now(timezone.utc)
-            session.add(execution)
-            session.commit()
+    return {
+        "message": "Workflow execution cancel requested",
+        "execution_id": execution_id,
+        "job_id": job.job_id,
+        "status": job.status,
+    }
 
 
 @router.get("/project/{project_id}", response_model=WorkflowOut)
@@ -653,16 +652,18 @@ async def handle_image_source_input(
 
 async def handle_normal_node_input(
     source_node: Dict, 
+    workflow: Workflow,
     node_execution: WorkflowNodeExecution, 
     session: Session
 ) -> List[int]:
     """处理普通节点的输入数据"""
     print(f"Handling input from node: {source_node['id']}")
 
-    # 直接从 Data 表查询上一个节点的最新数据
+    # 直接从 Data 表查询上一个节点的最新数据 (限定项目, 走 ix_data_project_stage 索引)
     query = (
         select(Data)
         .where(
+            Data.project_id == workflow.project_id,
             Data.processing_stage == source_node["id"],  # 使用节点ID作为processing_stage
             Data.workflow_execution_id != node_execution.execution_id  # 排除当前执行的数据
         )
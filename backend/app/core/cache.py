@@ -0,0 +1,259 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from sqlalchemy import update
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.data import Data
+from app.models.label import Label
+from app.models.project import Project
+from app.models.task import Task
+from app.models.workflow import ProcessedData
+
+_MISSING = object()
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """进程内 LRU 缓存, 条目超过 ttl 秒或数量超过 maxsize 时淘汰
+
+    只缓存普通值 (不缓存 ORM 对象, 它们绑定在创建它们的会话上)。
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], T]) -> T:
+        """缓存未命中时调用 loader, 结果为 None 时不缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return cast(T, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """删除满足 predicate(key, value) 的条目, 返回删除数量"""
+        with self._lock:
+            keys = [
+                key for key, (value, _) in self._data.items() if predicate(key, value)
+            ]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class FileLocation(NamedTuple):
+    """数据文件的位置, 完整路径为 {data_dir}/data/{path}"""
+
+    project_id: int
+    data_dir: str
+    path: str
+
+
+def _make_cache(name: str) -> TTLCache:
+    return TTLCache(name, settings.ENTITY_CACHE_MAX_SIZE, settings.ENTITY_CACHE_TTL)
+
+
+# project_id -> data_dir
+project_cache = _make_cache("project")
+# project_id -> 默认任务 task_id
+task_cache = _make_cache("task")
+# project_id -> 标签列表 (字典)
+label_cache = _make_cache("label")
+# ("data" | "processed", id) -> (FileLocation, 读取时项目的数据代数)
+path_cache = _make_cache("path")
+# project_id -> 数据代数 (Project.data_generation), 只缓存很短时间
+generation_cache = TTLCache(
+    "generation", settings.ENTITY_CACHE_MAX_SIZE, settings.DATA_GENERATION_TTL
+)
+
+CACHES = (project_cache, task_cache, label_cache, path_cache, generation_cache)
+
+
+def get_project_data_dir(session: Session, project_id: int) -> Optional[str]:
+    return project_cache.get_or_load(
+        project_id,
+        lambda: session.exec(
+            select(Project.data_dir).where(Project.project_id == project_id)
+        ).first(),
+    )
+
+
+def get_default_task_id(session: Session, project_id: int) -> Optional[int]:
+    """项目的默认任务 (第一个任务) ID"""
+    return task_cache.get_or_load(
+        project_id,
+        lambda: session.exec(
+            select(Task.task_id).where(Task.project_id == project_id)
+        ).first(),
+    )
+
+
+def get_project_labels(session: Session, project_id: int) -> List[Dict[str, Any]]:
+    def load() -> List[Dict[str, Any]]:
+        labels = session.exec(select(Label).where(Label.project_id == project_id)).all()
+        return [label.model_dump() for label in labels]
+
+    return label_cache.get_or_load(project_id, load)
+
+
+def get_data_generation(session: Session, project_id: int) -> Optional[int]:
+    """项目当前的数据代数, 项目不存在时返回 None"""
+    return generation_cache.get_or_load(
+        project_id,
+        lambda: session.exec(
+            select(Project.data_generation).where(Project.project_id == project_id)
+        ).first(),
+    )
+
+
+def bump_data_generation(session: Session, project_id: int) -> None:
+    """在删除数据的事务中递增项目的数据代数, 提交后其他进程的路径缓存随之失效"""
+    session.execute(
+        update(Project)
+        .where(col(Project.project_id) == project_id)
+        .values(data_generation=Project.data_generation + 1)
+    )
+
+
+def _get_location(
+    session: Session, key: Hashable, query: Any
+) -> Optional[FileLocation]:
+    """通过路径缓存解析文件位置
+
+    路径缓存是进程内的, 数据可能被其他进程 (workflow worker) 删除。命中时比较缓存条目
+    与项目当前的数据代数, 不一致时重新查询; 代数本身缓存 DATA_GENERATION_TTL 秒,
+    因此其他进程删除数据后, 本进程最多在这段时间内仍返回被删除数据的路径。
+    本进程的删除通过 invalidate_paths 立即生效。
+    """
+    cached: Optional[Tuple[FileLocation, int]] = path_cache.get(key)
+    if cached is not None:
+        location, generation = cached
+        if get_data_generation(session, location.project_id) == generation:
+            return location
+        path_cache.invalidate(key)
+
+    row = session.exec(query.add_columns(Project.data_generation)).first()
+    if row is None:
+        return None
+    *fields, generation = row
+    location = FileLocation(*fields)
+    path_cache.set(key, (location, generation))
+    generation_cache.set(location.project_id, generation)
+    return location
+
+
+def get_data_location(session: Session, data_id: int) -> Optional[FileLocation]:
+    """一次查询 (命中缓存时最多查询项目的数据代数) 解析 Data 的文件位置"""
+    return _get_location(
+        session,
+        ("data", data_id),
+        select(Data.project_id, Project.data_dir, Data.path)
+        .join(Project, col(Project.project_id) == Data.project_id)
+        .where(Data.data_id == data_id),
+    )
+
+
+def get_processed_location(
+    session: Session, processed_id: int
+) -> Optional[FileLocation]:
+    """解析 ProcessedData 的文件位置, 项目由其原始数据确定"""
+    return _get_location(
+        session,
+        ("processed", processed_id),
+        select(Data.project_id, Project.data_dir, ProcessedData.file_path)
+        .join(Data, col(Data.data_id) == ProcessedData.original_data_id)
+        .join(Project, col(Project.project_id) == Data.project_id)
+        .where(ProcessedData.id == processed_id),
+    )
+
+
+def invalidate_project(project_id: int) -> None:
+    """项目更新或删除后清除它的所有缓存"""
+    project_cache.invalidate(project_id)
+    task_cache.invalidate(project_id)
+    label_cache.invalidate(project_id)
+    invalidate_paths(project_id)
+
+
+def invalidate_labels(project_id: int) -> None:
+    label_cache.invalidate(project_id)
+
+
+def invalidate_paths(project_id: int) -> None:
+    """数据被删除后清除本进程中项目的路径缓存 (数据库可能复用被删除的 ID)
+
+    其他进程通过数据代数发现变化, 删除数据的事务需要调用 bump_data_generation。
+    """
+    generation_cache.invalidate(project_id)
+    path_cache.invalidate_where(lambda _, entry: entry[0].project_id == project_id)
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    return [cache.stats() for cache in CACHES]
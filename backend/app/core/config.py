@@ -179,6 +179,38 @@ class Settings(BaseSettings):
     # LANGCHAIN_API_KEY: str | None = None
     # LANGCHAIN_PROJECT: str | None = None
 
+    # 工作流图像编解码执行器 (所有节点共享)
+    WORKFLOW_IO_EXECUTOR: Literal["thread", "process"] = "thread"
+    WORKFLOW_IO_WORKERS: int | None = None  # 默认使用 CPU 核数
+
+    # 工作流执行进程池的进程数
+    WORKFLOW_WORKERS: int = 2
+    # 是否在 Web 应用启动时启动进程池; Web 服务运行多个 worker 进程时应关闭,
+    # 改为单独运行 python -m app.core.workflow.worker_pool
+    WORKFLOW_WORKER_POOL_IN_APP: bool = True
+    WORKFLOW_PROJECT_CONCURRENCY: int = 1  # 每个项目同时运行的执行数
+    WORKFLOW_JOB_POLL_INTERVAL: float = 1.0  # 秒, 领取任务和检查取消的间隔
+    WORKFLOW_JOB_STALE_SECONDS: int = 300  # 心跳超时后任务重新排队
+    # 节点处理器通过异步会话访问数据库 (PostgreSQL 使用 asyncpg, SQLite 需要 aiosqlite)
+    WORKFLOW_ASYNC_DB: bool = False
+    # 节点间共享的解码图像缓存的内存上限 (0 表示禁用)
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # 执行器为进程池时, 子进程直接解码到共享内存, 避免通过管道传输像素
+    IMAGE_CACHE_SHARED_MEMORY: bool = False
+    # 执行器为进程池时, 节点内加载/编码进程通过共享内存帧环传递图像 (0 表示禁用)
+    # 帧环在节点开始时一次性分配, 大于单个槽位的图像按普通方式传递
+    WORKFLOW_FRAME_RING_BYTES: int = 128 * 1024 * 1024
+    WORKFLOW_FRAME_SLOT_BYTES: int = 8 * 1024 * 1024
+
+    # 每个项目缩略图磁盘缓存 ({data_dir}/.cache/thumbnails) 的大小上限
+    THUMBNAIL_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # 进程内实体缓存 (项目/任务/标签/文件路径) 的条目上限和过期时间 (秒)
+    ENTITY_CACHE_MAX_SIZE: int = 10000
+    ENTITY_CACHE_TTL: float = 60.0
+    # 项目数据代数的缓存时间 (秒), 即其他进程删除数据后路径缓存最长的过期时间
+    DATA_GENERATION_TTL: float = 1.0
+
     # 添加数据根目录配置
     DATA_ROOT_PATH: str | None = None
     DATA_ROOT_PATH="/Users/envys/aidata"
@@ -1,7 +1,10 @@
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app.core.config import settings
@@ -11,7 +14,7 @@ from app.models.user import User, UserCreate
 logger = logging.getLogger(__name__)
 
 
-def get_url():
+def get_url() -> str:
     database_type = os.getenv("DATABASE_TYPE", "postgres")
     if database_type == "sqlite":
         sqlite_db = os.getenv("SQLITE_DB", "sqlite.db")
@@ -36,7 +39,7 @@ def get_url():
 
 
 # 创建引擎时添加适当的连接参数
-def create_db_engine():
+def create_db_engine() -> Engine:
     database_type = os.getenv("DATABASE_TYPE", "postgres")
     logger.info(f"Initializing database connection for type: {database_type}")
 
@@ -60,6 +63,34 @@ def create_db_engine():
 
 engine = create_db_engine()
 
+# 异步引擎按需创建, 只有启用 WORKFLOW_ASYNC_DB 的进程才会建立异步连接池
+_async_engine: Optional[AsyncEngine] = None
+_async_engine_error: Optional[str] = None
+
+
+def get_async_url() -> str:
+    """与同步引擎相同的数据库, 使用异步驱动 (PostgreSQL: asyncpg, SQLite: aiosqlite)"""
+    url = make_url(get_url())
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    else:
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    """返回异步引擎, 驱动未安装时返回 None (调用方退回同步会话)"""
+    global _async_engine, _async_engine_error
+    if _async_engine is None and _async_engine_error is None:
+        try:
+            _async_engine = create_async_engine(get_async_url(), pool_pre_ping=True)
+            logger.info("Async database engine created")
+        except ImportError as e:
+            _async_engine_error = str(e)
+            logger.warning(f"Async database driver not available: {e}")
+            print(f"Async database driver not available, using sync session: {e}")
+    return _async_engine
+
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
@@ -1,5 +1,4 @@
 from typing import Any, Dict, List
-from langgraph.graph import END, StateGraph
 from pydantic import BaseModel
 from sqlmodel import Session
 from app.core.workflow.adapters.processor_adapters import (
@@ -10,7 +9,6 @@ from app.core.workflow.adapters.processor_adapters import (
     InstanceSegmentationNodeAdapter,
 )
 from app.models.workflow import WorkflowExecution
-from app.core.workflow.tqx_state import WorkflowState
 
 
 class Edge(BaseModel):
@@ -21,6 +19,8 @@ class Edge(BaseModel):
 class WorkflowConfigModel(BaseModel):
     nodes: List[Dict[str, Any]]
     edges: List[Edge]
+    # 节点之间是否流水线执行
+    streaming: bool = False
 
 
 class WorkflowConfig(BaseModel):
@@ -60,34 +60,3 @@ def create_node(
             execution=execution,
         )
     raise ValueError(f"Unknown node type: {node_config['type']}")
-
-
-def create_langgraph_workflow(
-    config: Dict[str, Any],
-    session: Session,
-    execution: WorkflowExecution,
-    use_async: bool = True,
-    save_graph: bool = False,
-) -> StateGraph:
-    validated_config = validate_workflow_config(config)
-    workflow = StateGraph(WorkflowState)
-
-    # 添加节点
-    for node_config in validated_config.config.nodes:
-        node = create_node(node_config, validated_config, session, execution)
-        if use_async:
-            workflow.add_node(node_config["name"], node.work_async)
-        else:
-            workflow.add_node(node_config["name"], node.work)
-
-    # 设置入口节点
-    workflow.set_entry_point(validated_config.config.nodes[0]["name"])
-
-    # 添加边
-    for edge in validated_config.config.edges:
-        workflow.add_edge(edge.source, edge.target)
-
-    # 编译图
-    graph = workflow.compile()
-
-    return graph
@@ -1,24 +1,39 @@
 # backend/app/core/workflow/data_manager.py
 
+import asyncio
 from pathlib import Path
-from typing import Optional, Dict, Union, List
+from typing import Any, Callable, Optional, Dict, TypeVar, Union, List
 from app.api.deps import SessionDep
+from app.core.workflow.db_session import run_db
+from app.core.workflow.image_cache import load_cached_image
 from app.models.project import Project
-import cv2
 from datetime import datetime, timezone
 from app.core.config import settings
 from app.models.workflow import ProcessedData
 from app.models.data import Data
 from app.models.task import Task
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import os
+import numpy as np
+
+T = TypeVar("T")
 
 
 class WorkflowDataManager:
-    def __init__(self, project_id: int, execution_id: int, session: SessionDep):
+    def __init__(
+        self,
+        project_id: int,
+        execution_id: int,
+        session: SessionDep,
+        async_session: Optional[AsyncSession] = None,
+    ):
         self.project_id = project_id
         self.execution_id = execution_id
         self.session = session
+        # 异步会话存在时, session 是它的 sync_session, 数据库操作需通过 run_db 执行
+        self.async_session = async_session
+        self._db_lock = asyncio.Lock()
         # 获取项目信息
         self.project = session.get(Project, project_id)
         if not self.project:
@@ -26,6 +41,29 @@ class WorkflowDataManager:
         # 使用项目的实际路径
         self.base_path = Path(self.project.data_dir)
 
+    @classmethod
+    async def create(
+        cls,
+        project_id: int,
+        execution_id: int,
+        session: SessionDep,
+        async_session: Optional[AsyncSession] = None,
+    ) -> "WorkflowDataManager":
+        """创建数据管理器, 异步会话下项目查询不阻塞事件循环"""
+        return await run_db(
+            async_session, cls, project_id, execution_id, session, async_session
+        )
+
+    async def run_db(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在节点会话上执行同步数据库操作
+
+        异步会话不允许并发操作, 同一节点的输入读取和结果写入在这里串行执行。
+        """
+        if self.async_session is None:
+            return fn(*args, **kwargs)
+        async with self._db_lock:
+            return await run_db(self.async_session, fn, *args, **kwargs)
+
     def get_node_data_path(self, node_id: str, node_type: str) -> Path:
         """获取节点数据存储路径 - 不包含 data/ 前缀"""
         if node_type == "image_source":
@@ -44,20 +82,25 @@ class WorkflowDataManager:
         self,
         node_execution_id: int,
         original_data_id: int,
-        data: bytes,
         filename: str,
         file_path: str,
         node_type: str,
         node_id: str,
         metadata_: Dict = None,
+        file_info: Optional[Dict] = None,
     ) -> ProcessedData:
-        """保存处理后的数据"""
+        """保存处理后的数据
+
+        file_info 为写文件时由编码缓冲区得到的信息 (file_size, sha256), 不会再次编码图像。
+        """
         processed_data = ProcessedData(
             node_execution_id=node_execution_id,
             original_data_id=original_data_id,
             file_path=file_path,
+            format=Path(file_path).suffix.lstrip(".").lower() or "jpg",
             metadata_={
                 **(metadata_ or {}),
+                **(file_info or {}),
                 "node_id": node_id,
                 "node_type": node_type
             }
@@ -66,14 +109,14 @@ class WorkflowDataManager:
 
     def get_processed_data(
         self, file_path: Union[str, Path], as_array: bool = False
-    ) -> Union[bytes, str, None]:
-        """获取处理后的数据"""
+    ) -> Union[bytes, np.ndarray, None]:
+        """获取处理后的数据, as_array 时返回解码缓存中的只读数组"""
         full_path = self.base_path / "data" / file_path  # 添加 data/ 到物理路径
         if not full_path.exists():
             return None
 
         if as_array and full_path.suffix.lower() in [".jpg", ".jpeg", ".png", ".bmp"]:
-            return cv2.imread(str(full_path))
+            return load_cached_image(str(full_path))
 
         return full_path.read_bytes()
 
@@ -0,0 +1,83 @@
+# backend/app/core/workflow/db_session.py
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional, Tuple, TypeVar
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import engine, get_async_engine
+
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def open_workflow_session(
+    async_db: Optional[bool] = None,
+) -> AsyncIterator[Tuple[Session, Optional[AsyncSession]]]:
+    """打开节点使用的数据库会话, 返回 (同步会话, 异步会话)
+
+    启用异步数据库时, 同步会话是 AsyncSession.sync_session, 只能在 run_db 中使用;
+    提交后不过期对象, 处理器在 run_db 之外读取已加载的属性不会触发查询。
+    """
+    async_engine = (
+        get_async_engine()
+        if (settings.WORKFLOW_ASYNC_DB if async_db is None else async_db)
+        else None
+    )
+    if async_engine is None:
+        with Session(engine) as session:
+            yield session, None
+        return
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+        yield async_session.sync_session, async_session
+
+
+async def run_db(
+    async_session: Optional[AsyncSession],
+    fn: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """执行使用同步会话的数据库操作
+
+    有异步会话时通过 AsyncSession.run_sync 执行, 等待数据库期间事件循环可以继续处理图像 I/O;
+    否则直接调用。
+    """
+    if async_session is None:
+        return fn(*args, **kwargs)
+    return await async_session.run_sync(lambda _: fn(*args, **kwargs))
+
+
+async def run_db_uninterrupted(
+    async_session: Optional[AsyncSession],
+    fn: Callable[..., T],
+    *args: Any,
+    redeliver_cancel: bool = True,
+    **kwargs: Any,
+) -> T:
+    """执行必须完整完成的数据库操作 (如记录节点状态), 不会被任务取消打断
+
+    期间收到的取消在操作完成后重新发给当前任务, 在下一个 await 处生效;
+    redeliver_cancel 为 False 时丢弃 (调用方随后会抛出异常时使用)。
+    """
+    if async_session is None:
+        return fn(*args, **kwargs)
+
+    task = asyncio.ensure_future(run_db(async_session, fn, *args, **kwargs))
+    cancelled = False
+    while True:
+        try:
+            result = await asyncio.shield(task)
+            break
+        except asyncio.CancelledError:
+            if task.done():
+                raise
+            cancelled = True
+    current = asyncio.current_task()
+    if cancelled and redeliver_cancel and current is not None:
+        current.cancel()
+    return result
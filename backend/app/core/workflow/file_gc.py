@@ -0,0 +1,232 @@
+# backend/app/core/workflow/file_gc.py
+
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import String, cast
+from sqlmodel import Session, col, select
+
+from app.core.db import engine
+from app.core.workflow.mask_store import MASK_ROOT, find_mask_refs
+from app.core.workflow.packed_dataset import PACKED_DIR, find_packed_refs
+from app.models.data import Data
+from app.models.workflow import ProcessedData, WorkflowExecution, WorkflowNodeExecution
+from app.utils.batch_utils import chunked
+
+# 节点输出目录 (相对于 data/), 全量回收时只扫描这些目录, 不会触及 original/
+OUTPUT_DIRS = ("preprocessed", "results", MASK_ROOT)
+
+_gc_executor: Optional[ThreadPoolExecutor] = None
+_gc_lock = threading.Lock()
+
+
+def is_output_path(path: str) -> bool:
+    """路径是否位于节点输出目录中"""
+    parts = Path(path).parts
+    return len(parts) > 1 and parts[0] in OUTPUT_DIRS and ".." not in parts
+
+
+def get_gc_executor() -> ThreadPoolExecutor:
+    """文件回收使用单个后台线程, 不占用图像编解码执行器"""
+    global _gc_executor
+    with _gc_lock:
+        if _gc_executor is None:
+            _gc_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="file-gc"
+            )
+        return _gc_executor
+
+
+def shutdown_file_gc(wait: bool = True) -> None:
+    """等待已提交的回收任务完成并关闭线程"""
+    global _gc_executor
+    with _gc_lock:
+        executor, _gc_executor = _gc_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def find_references(
+    session: Session, project_id: int, paths: List[str]
+) -> Tuple[Set[str], Set[str]]:
+    """查询仍被项目数据引用的文件路径, 以及这些数据元数据中引用的掩码路径"""
+    referenced: Set[str] = set()
+    referenced_masks: Set[str] = set()
+    for chunk in chunked(paths):
+        for path, metadata in session.exec(
+            select(Data.path, Data.metadata_).where(
+                Data.project_id == project_id, col(Data.path).in_(chunk)
+            )
+        ).all():
+            referenced.add(path)
+            referenced_masks.update(
+                ref["mask_path"] for ref in find_mask_refs(metadata)
+            )
+        referenced.update(
+            session.exec(
+                select(ProcessedData.file_path)
+                .join(
+                    WorkflowNodeExecution,
+                    col(WorkflowNodeExecution.id) == ProcessedData.node_execution_id,
+                )
+                .join(
+                    WorkflowExecution,
+                    col(WorkflowExecution.execution_id)
+                    == WorkflowNodeExecution.execution_id,
+                )
+                .where(
+                    WorkflowExecution.project_id == project_id,
+                    col(ProcessedData.file_path).in_(chunk),
+                )
+            ).all()
+        )
+    return referenced, referenced_masks
+
+
+def find_packed_references(
+    session: Session, project_id: int, packed_paths: Set[str]
+) -> Set[str]:
+    """查询仍被项目数据元数据引用的打包文件及其索引文件
+
+    一个打包文件被多条数据共享, 先用文本匹配缩小范围, 再解析元数据确认。
+    """
+    referenced: Set[str] = set()
+    for path in packed_paths:
+        if path in referenced:
+            continue
+        # 索引文件 {名称}.index.json 与打包文件 {名称}.npy 一起判断
+        name = Path(path).name.split(".")[0]
+        result = session.execute(
+            select(Data.metadata_)
+            .where(
+                Data.project_id == project_id,
+                cast(Data.metadata_, String).like(f"%{PACKED_DIR}/{name}.npy%"),
+            )
+            .execution_options(yield_per=1000)
+        )
+        for (metadata,) in result:
+            refs = find_packed_refs(metadata)
+            if path in refs:
+                referenced.update(refs)
+                break
+        result.close()
+    return referenced
+
+
+def remove_files(data_root: Path, paths: List[str], not_after: float) -> int:
+    """删除文件, 跳过 not_after 之后修改过的文件 (可能是正在运行的节点刚写入的)"""
+    removed = 0
+    for relative_path in paths:
+        full_path = data_root / relative_path
+        try:
+            if full_path.stat().st_mtime >= not_after:
+                continue
+            full_path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"Error removing {full_path}: {str(e)}")
+    return removed
+
+
+def remove_orphan_files(
+    project_id: int, data_dir: str, files: Dict[str, List[str]], not_after: float
+) -> int:
+    """删除已不被任何数据引用的结果文件及其掩码
+
+    Args:
+        files: 被删除数据的 {结果文件路径: [掩码和打包文件路径]}, 路径相对于 data/
+        not_after: 只删除在此时间戳之前修改的文件
+    """
+    packed_paths = {path for paths in files.values() for path in paths}
+    packed_paths = {
+        path for path in packed_paths if Path(path).parent.name == PACKED_DIR
+    }
+    with Session(engine) as session:
+        referenced, referenced_masks = find_references(session, project_id, list(files))
+        referenced_masks |= find_packed_references(session, project_id, packed_paths)
+
+    orphans = []
+    for path, mask_paths in files.items():
+        if path not in referenced:
+            orphans.append(path)
+        orphans.extend(mask for mask in mask_paths if mask not in referenced_masks)
+    # 只回收节点输出目录中的文件, 原始数据 (original/) 永远不会被删除
+    orphans = [path for path in orphans if is_output_path(path)]
+
+    removed = remove_files(Path(data_dir) / "data", orphans, not_after)
+    print(f"File GC removed {removed} orphan files for project {project_id}")
+    return removed
+
+
+def sweep_project_files(
+    project_id: int, data_dir: str, not_after: Optional[float] = None
+) -> int:
+    """全量回收: 扫描项目输出目录, 删除所有不被引用的文件 (用于清理历史遗留文件)"""
+    not_after = time.time() if not_after is None else not_after
+    data_root = Path(data_dir) / "data"
+    files: Dict[str, List[str]] = {}
+    for output_dir in OUTPUT_DIRS:
+        for root, _, names in os.walk(data_root / output_dir):
+            for name in names:
+                relative_path = Path(root, name).relative_to(data_root).as_posix()
+                files[relative_path] = []
+
+    with Session(engine) as session:
+        referenced, _ = find_references(session, project_id, list(files))
+        # 掩码和打包文件的引用只出现在元数据中, 分批扫描项目数据的元数据
+        referenced_masks: Set[str] = set()
+        result = session.execute(
+            select(Data.metadata_)
+            .where(Data.project_id == project_id)
+            .execution_options(yield_per=1000)
+        )
+        for (metadata,) in result:
+            referenced_masks.update(
+                ref["mask_path"] for ref in find_mask_refs(metadata)
+            )
+            referenced_masks.update(find_packed_refs(metadata))
+
+    orphans = [
+        path
+        for path in files
+        if path not in referenced and path not in referenced_masks
+    ]
+    removed = remove_files(data_root, orphans, not_after)
+    print(f"File sweep removed {removed} orphan files for project {project_id}")
+    return removed
+
+
+def _log_gc_error(future: "Future[int]") -> None:
+    error = future.exception()
+    if error is not None:
+        print(f"File GC error: {str(error)}")
+        traceback.print_exception(error)
+
+
+def schedule_file_cleanup(
+    project_id: int, data_dir: str, files: Dict[str, List[str]], not_after: float
+) -> Optional["Future[int]"]:
+    """在后台线程中回收被删除数据的文件"""
+    if not files:
+        return None
+    future = get_gc_executor().submit(
+        remove_orphan_files, project_id, data_dir, files, not_after
+    )
+    future.add_done_callback(_log_gc_error)
+    return future
+
+
+def schedule_project_sweep(project_id: int, data_dir: str) -> "Future[int]":
+    """在后台线程中全量回收项目的孤立文件"""
+    future = get_gc_executor().submit(
+        sweep_project_files, project_id, data_dir, time.time()
+    )
+    future.add_done_callback(_log_gc_error)
+    return future
@@ -0,0 +1,229 @@
+# backend/app/core/workflow/frame_ring.py
+
+import asyncio
+import os
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.workflow.image_io import (
+    decode_image,
+    encode_image_to_file,
+    get_image_executor,
+    write_image_async,
+)
+
+
+class FrameRef(NamedTuple):
+    """共享内存中一帧图像的位置, 只有几十字节, 代替图像本身在进程间传递"""
+
+    name: str
+    offset: int
+    capacity: int
+    shape: Tuple[int, ...] = ()
+    dtype: str = "|u1"
+
+
+def decode_into_frame(
+    img_path: str, ref: FrameRef
+) -> Union[None, np.ndarray, Tuple[Tuple[int, ...], str]]:
+    """在子进程中解码并直接写入帧槽位, 返回 (形状, dtype) (在执行器中运行)
+
+    图像超过槽位大小时返回图像本身, 由调用方按普通方式接收。
+    """
+    img = decode_image(img_path)
+    if img is None or img.nbytes > ref.capacity:
+        return img
+    shm = shared_memory.SharedMemory(name=ref.name)
+    try:
+        np.ndarray(img.shape, img.dtype, buffer=shm.buf, offset=ref.offset)[...] = img
+    finally:
+        shm.close()
+    return img.shape, img.dtype.str
+
+
+def encode_frame_to_file(
+    save_path: str, ref: FrameRef, ext: str, params: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """在子进程中直接从帧槽位编码并写入文件 (在执行器中运行)"""
+    shm = shared_memory.SharedMemory(name=ref.name)
+    try:
+        img = np.ndarray(
+            ref.shape, np.dtype(ref.dtype), buffer=shm.buf, offset=ref.offset
+        )
+        result = encode_image_to_file(save_path, img, ext, params)
+        del img
+    finally:
+        shm.close()
+    return result
+
+
+class FrameRing:
+    """一次节点运行内使用的共享内存帧环
+
+    一块共享内存按固定大小分为多个槽位, 加载进程把解码结果直接写入槽位, 编码进程
+    直接从槽位读取结果图像, 进程间只传递 FrameRef。每个槽位带引用计数, 归零后回到
+    空闲队列; 没有空闲槽位或图像超过槽位大小时退回普通传递方式, 不会阻塞。
+    只在事件循环线程中使用。
+    """
+
+    def __init__(self, slots: int, slot_bytes: int):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        try:
+            # 预先分配, /dev/shm 空间不足时在这里失败, 而不是写入时触发 SIGBUS
+            os.posix_fallocate(self.shm._fd, 0, slots * slot_bytes)  # type: ignore[attr-defined]
+        except OSError:
+            self.shm.close()
+            self.shm.unlink()
+            raise
+        base = np.ndarray((slots * slot_bytes,), np.uint8, buffer=self.shm.buf)
+        self._base: Optional[np.ndarray] = base
+        self._address: int = base.__array_interface__["data"][0]
+        # numpy 数组不持有缓冲区导出, 映射只在所有视图被回收后关闭
+        weakref.finalize(base, self.shm.close)
+        self._free = deque(range(slots))
+        self._refs = [0] * slots
+        self.closed = False
+        self.hits = 0
+        self.fallbacks = 0
+
+    def acquire(self) -> Optional[int]:
+        """取一个空闲槽位 (引用计数为 1), 没有空闲槽位时返回 None"""
+        if self.closed or not self._free:
+            self.fallbacks += 1
+            return None
+        slot = self._free.popleft()
+        self._refs[slot] = 1
+        self.hits += 1
+        return slot
+
+    def retain(self, slot: int) -> None:
+        self._refs[slot] += 1
+
+    def release(self, slot: int) -> None:
+        self._refs[slot] -= 1
+        if self._refs[slot] == 0:
+            self._free.append(slot)
+
+    def ref(
+        self, slot: int, shape: Tuple[int, ...] = (), dtype: str = "|u1"
+    ) -> FrameRef:
+        return FrameRef(
+            self.shm.name, slot * self.slot_bytes, self.slot_bytes, tuple(shape), dtype
+        )
+
+    def view(self, ref: FrameRef) -> np.ndarray:
+        dtype = np.dtype(ref.dtype)
+        size = int(np.prod(ref.shape)) * dtype.itemsize
+        if self._base is None:
+            raise ValueError("Frame ring is closed")
+        return self._base[ref.offset : ref.offset + size].view(dtype).reshape(ref.shape)
+
+    def slot_of(self, img: np.ndarray) -> Optional[int]:
+        """图像位于本帧环中时返回其槽位"""
+        if self.closed:
+            return None
+        offset: int = img.__array_interface__["data"][0] - self._address
+        if 0 <= offset < self.slots * self.slot_bytes:
+            return offset // self.slot_bytes
+        return None
+
+    def release_array(self, img: np.ndarray) -> None:
+        slot = self.slot_of(img)
+        if slot is not None:
+            self.release(slot)
+
+    def put(self, img: np.ndarray) -> Optional[FrameRef]:
+        """把图像复制到空闲槽位, 没有空闲槽位或图像过大时返回 None"""
+        if img.nbytes > self.slot_bytes:
+            self.fallbacks += 1
+            return None
+        slot = self.acquire()
+        if slot is None:
+            return None
+        ref = self.ref(slot, img.shape, img.dtype.str)
+        self.view(ref)[...] = img
+        return ref
+
+    async def decode(self, img_path: str) -> Optional[np.ndarray]:
+        """在共享执行器中解码到槽位, 返回槽位上的视图 (用完后调用 release_array)"""
+        loop = asyncio.get_running_loop()
+        executor = get_image_executor()
+        slot = self.acquire()
+        if slot is None:
+            return await loop.run_in_executor(executor, decode_image, img_path)
+
+        try:
+            result = await loop.run_in_executor(
+                executor, decode_into_frame, img_path, self.ref(slot)
+            )
+        except BaseException:
+            self.release(slot)
+            raise
+        if result is None or isinstance(result, np.ndarray):
+            self.release(slot)
+            return result
+        shape, dtype = result
+        return self.view(self.ref(slot, shape, dtype))
+
+    async def write_image(
+        self,
+        save_path: str,
+        img: np.ndarray,
+        ext: Optional[str] = None,
+        params: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """与 write_image_async 相同, 图像经槽位传给编码进程"""
+        ext = ext or os.path.splitext(save_path)[1] or ".jpg"
+        ref = self.put(img)
+        if ref is None:
+            return await write_image_async(save_path, img, ext, params)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                get_image_executor(), encode_frame_to_file, save_path, ref, ext, params
+            )
+        finally:
+            self.release(ref.offset // self.slot_bytes)
+
+    def close(self) -> None:
+        """删除共享内存 (节点结束或失败时调用), 仍在使用的视图在回收后释放映射"""
+        if self.closed:
+            return
+        self.closed = True
+        in_use = sum(1 for count in self._refs if count > 0)
+        print(
+            f"Frame ring closed: {self.hits} frames via shared memory, "
+            f"{self.fallbacks} fallbacks, {in_use} slots still referenced"
+        )
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._base = None
+
+
+def create_frame_ring(slots: int) -> Optional[FrameRing]:
+    """共享执行器为进程池时创建帧环, 线程池 (同一进程, 本来就不复制) 或禁用时返回 None"""
+    if settings.WORKFLOW_FRAME_RING_BYTES <= 0 or not isinstance(
+        get_image_executor(), ProcessPoolExecutor
+    ):
+        return None
+
+    slot_bytes = settings.WORKFLOW_FRAME_SLOT_BYTES
+    slots = min(slots, settings.WORKFLOW_FRAME_RING_BYTES // slot_bytes)
+    if slots <= 0:
+        return None
+    try:
+        return FrameRing(slots, slot_bytes)
+    except OSError as e:
+        print(f"Failed to create frame ring, falling back to pickling: {str(e)}")
+        return None
@@ -0,0 +1,242 @@
+# backend/app/core/workflow/image_cache.py
+
+import asyncio
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.workflow.image_io import decode_image, get_image_executor
+
+# (绝对路径, 修改时间, 文件大小), 文件被覆盖后键随之变化
+CacheKey = Tuple[str, int, int]
+
+
+def image_cache_key(img_path: str) -> Optional[CacheKey]:
+    try:
+        stat_result = os.stat(img_path)
+    except OSError:
+        return None
+    return (os.path.abspath(img_path), stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def decode_to_shared_memory(
+    img_path: str,
+) -> Optional[Tuple[str, Tuple[int, ...], str]]:
+    """解码图像并写入新建的共享内存块, 返回 (块名称, 形状, dtype) (在进程池中运行)
+
+    像素数据不经过 pickle 传回主进程; 共享内存块交给主进程的缓存管理和释放。
+    """
+    img = decode_image(img_path)
+    if img is None:
+        return None
+    shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+    np.ndarray(img.shape, img.dtype, buffer=shm.buf)[...] = img
+    # resource_tracker 以带前导 "/" 的 POSIX 名称登记共享内存块 (name 属性去掉了前导 "/")
+    resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+    shm.close()
+    return shm.name, img.shape, img.dtype.str
+
+
+def attach_shared_image(
+    descriptor: Tuple[str, Tuple[int, ...], str],
+) -> Tuple[np.ndarray, shared_memory.SharedMemory]:
+    """映射子进程写入的共享内存块, 返回 (数组, 共享内存块)
+
+    numpy 数组不持有缓冲区导出, 提前关闭映射会使数组指向无效内存,
+    因此映射只在数组 (及其视图) 被回收后关闭。
+    """
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    img = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+    weakref.finalize(img, shm.close)
+    return img, shm
+
+
+class CacheEntry(NamedTuple):
+    img: np.ndarray
+    shm: Optional[shared_memory.SharedMemory]
+
+
+class DecodedImageCache:
+    """所有节点共享的已解码图像 LRU 缓存, 按像素字节数限制内存
+
+    缓存的数组是只读的, 节点需要修改时应先复制 (批处理时的 np.stack 已经是复制)。
+    共享执行器为进程池且启用 use_shared_memory 时, 图像在子进程中直接解码到共享内存,
+    主进程映射同一块内存, 不再通过管道传输像素。
+    """
+
+    def __init__(self, max_bytes: int, use_shared_memory: bool = False):
+        self.max_bytes = max_bytes
+        self.use_shared_memory = use_shared_memory
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # 正在解码的图像, 多个节点同时请求同一文件时只解码一次
+        self._pending: Dict[CacheKey, "asyncio.Task[Optional[np.ndarray]]"] = {}
+        self.hits = 0
+        self.misses = 0
+        # 未命中但合并到正在进行的解码的次数
+        self.coalesced = 0
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.img
+
+    def put(
+        self,
+        key: CacheKey,
+        img: np.ndarray,
+        shm: Optional[shared_memory.SharedMemory] = None,
+    ) -> np.ndarray:
+        """加入缓存并返回只读数组; 单张图像超过内存上限时不缓存"""
+        if img.nbytes > self.max_bytes:
+            if shm is not None:
+                img = img.copy()
+                self._release(shm)
+            return img
+
+        img.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.img.nbytes
+                self._release(old.shm)
+            self._entries[key] = CacheEntry(img, shm)
+            self._bytes += img.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.img.nbytes
+                self._release(evicted.shm)
+        return img
+
+    def _release(self, shm: Optional[shared_memory.SharedMemory]) -> None:
+        """删除共享内存块的名称, 映射在数组被回收时才关闭 (见 attach_shared_image)"""
+        if shm is None:
+            return
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def load(self, img_path: str) -> Optional[np.ndarray]:
+        """同步读取图像, 优先使用缓存"""
+        key = image_cache_key(img_path)
+        if key is None:
+            return decode_image(img_path)
+        img = self.get(key)
+        if img is None:
+            img = decode_image(img_path)
+            if img is not None:
+                img = self.put(key, img)
+        return img
+
+    def submit(self, img_path: str) -> "asyncio.Future[Optional[np.ndarray]]":
+        """提交解码并返回 future, 命中缓存时 future 已完成"""
+        loop = asyncio.get_running_loop()
+        key = image_cache_key(img_path)
+        if key is None:
+            return loop.run_in_executor(get_image_executor(), decode_image, img_path)
+
+        img = self.get(key)
+        if img is not None:
+            future = loop.create_future()
+            future.set_result(img)
+            return future
+
+        task = self._pending.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._decode(key, img_path))
+            self._pending[key] = task
+        else:
+            self.coalesced += 1
+        # 调用方取消时不影响其他等待同一图像的节点
+        return asyncio.shield(task)
+
+    async def _decode(self, key: CacheKey, img_path: str) -> Optional[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        executor = get_image_executor()
+        try:
+            if self.use_shared_memory and isinstance(executor, ProcessPoolExecutor):
+                descriptor = await loop.run_in_executor(
+                    executor, decode_to_shared_memory, img_path
+                )
+                if descriptor is None:
+                    return None
+                return self.put(key, *attach_shared_image(descriptor))
+
+            img = await loop.run_in_executor(executor, decode_image, img_path)
+            return None if img is None else self.put(key, img)
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self._release(entry.shm)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "images": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "shared_memory": self.use_shared_memory,
+            }
+
+
+_cache: Optional[DecodedImageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> Optional[DecodedImageCache]:
+    """进程内共享的解码缓存, IMAGE_CACHE_MAX_BYTES 为 0 时禁用并返回 None"""
+    global _cache
+    if _cache is None and settings.IMAGE_CACHE_MAX_BYTES > 0:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DecodedImageCache(
+                    settings.IMAGE_CACHE_MAX_BYTES, settings.IMAGE_CACHE_SHARED_MEMORY
+                )
+    return _cache
+
+
+def submit_cached_decode(img_path: str) -> "asyncio.Future[Optional[np.ndarray]]":
+    """通过解码缓存提交解码任务, 缓存禁用时直接在共享执行器中解码"""
+    cache = get_image_cache()
+    if cache is None:
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(get_image_executor(), decode_image, img_path)
+    return cache.submit(img_path)
+
+
+def load_cached_image(img_path: str) -> Optional[np.ndarray]:
+    cache = get_image_cache()
+    return decode_image(img_path) if cache is None else cache.load(img_path)
+
+
+def shutdown_image_cache() -> None:
+    """清空缓存并删除共享内存块 (进程退出时调用)"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.clear()
+            _cache = None
@@ -0,0 +1,161 @@
+# backend/app/core/workflow/image_io.py
+
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+# 支持的输出格式 -> 文件扩展名
+IMAGE_FORMATS = {
+    "jpg": ".jpg",
+    "jpeg": ".jpg",
+    "png": ".png",
+    "webp": ".webp",
+    "bmp": ".bmp",
+}
+# 未指定 output_format 且输入格式不能编码 (如 .gif) 时使用的输出格式
+DEFAULT_IMAGE_FORMAT = "jpg"
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> Executor:
+    """获取所有节点共享的图像编解码执行器 (首次调用时按配置创建)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = settings.WORKFLOW_IO_WORKERS or os.cpu_count() or 4
+                if settings.WORKFLOW_IO_EXECUTOR == "process":
+                    # 先启动资源跟踪进程, 子进程继承同一个跟踪进程,
+                    # 共享内存由创建它的主进程统一登记和删除
+                    resource_tracker.ensure_running()
+                    _executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    # cv2 编解码会释放 GIL, 线程池即可占满所有核
+                    _executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="image-io"
+                    )
+                print(
+                    f"Created image IO executor: {settings.WORKFLOW_IO_EXECUTOR} x {workers}"
+                )
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    """关闭共享执行器 (应用退出时调用)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def decode_image(img_path: str) -> Optional[np.ndarray]:
+    """读取并解码单张图像, 失败时返回 None (在执行器中运行)"""
+    if not os.path.exists(img_path):
+        print(f"Image file not found: {img_path}")
+        return None
+
+    img = cv2.imread(img_path)
+    if img is None:
+        print(f"Failed to read image: {img_path}")
+    return img
+
+
+def hash_file(file_path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+    """分块计算文件内容的 sha256, 文件不存在时返回 None (在执行器中运行)"""
+    if not os.path.exists(file_path):
+        print(f"Image file not found: {file_path}")
+        return None
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_encode_options(
+    image_format: str, quality: Optional[int] = None, lossless: bool = False
+) -> Tuple[str, List[int]]:
+    """根据格式/质量/无损选项返回 (扩展名, cv2 编码参数)"""
+    ext = IMAGE_FORMATS.get(image_format.lower().lstrip("."))
+    if ext is None:
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+    if lossless and ext == ".jpg":
+        # JPEG 没有无损模式, 改用 PNG
+        ext = ".png"
+
+    params: List[int] = []
+    if ext == ".jpg" and quality is not None:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    elif ext == ".webp":
+        # WebP 质量大于 100 时为无损编码
+        params = [cv2.IMWRITE_WEBP_QUALITY, 101 if lossless else int(quality or 95)]
+    elif ext == ".png" and quality is not None:
+        # PNG 始终无损, quality 映射为压缩级别 0-9
+        params = [cv2.IMWRITE_PNG_COMPRESSION, min(max(int(quality), 0), 9)]
+    return ext, params
+
+
+def encode_image_to_file(
+    save_path: str, img: np.ndarray, ext: str, params: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """将图像编码一次后写入磁盘, 并复用同一缓冲区计算大小和哈希 (在执行器中运行)"""
+    success, buffer = cv2.imencode(ext, img, params or [])
+    if not success:
+        raise OSError(f"Failed to encode image: {save_path}")
+
+    with open(save_path, "wb") as f:
+        f.write(buffer.data)
+
+    return {
+        "file_size": int(buffer.nbytes),
+        "sha256": hashlib.sha256(buffer.data).hexdigest(),
+    }
+
+
+def submit_decode(img_path: str) -> "asyncio.Future[Optional[np.ndarray]]":
+    """提交解码任务并立即返回 future, 调用方按提交顺序 await 即可保持顺序"""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_image_executor(), decode_image, img_path)
+
+
+def submit_hash(file_path: str) -> "asyncio.Future[Optional[str]]":
+    """提交文件哈希任务并立即返回 future"""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_image_executor(), hash_file, file_path)
+
+
+async def read_image_async(img_path: str) -> Optional[np.ndarray]:
+    """在共享执行器中解码图像, 不阻塞事件循环"""
+    return await submit_decode(img_path)
+
+
+async def write_image_async(
+    save_path: str,
+    img: np.ndarray,
+    ext: Optional[str] = None,
+    params: Optional[List[int]] = None,
+) -> Dict[str, Any]:
+    """在共享执行器中编码并写入图像, 返回文件大小和 sha256"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_image_executor(),
+        encode_image_to_file,
+        save_path,
+        img,
+        ext or os.path.splitext(save_path)[1] or ".jpg",
+        params,
+    )
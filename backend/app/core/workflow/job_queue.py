@@ -0,0 +1,222 @@
+# backend/app/core/workflow/job_queue.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, cast
+
+from sqlalchemy import CursorResult, func, update
+from sqlmodel import Session, col, select
+
+from app.models.workflow import WorkflowExecution, WorkflowJob
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# 每次领取时检查的排队任务数量
+CLAIM_SCAN_LIMIT = 50
+
+
+def enqueue_execution(session: Session, execution: WorkflowExecution) -> WorkflowJob:
+    """为执行记录创建排队任务, 由 worker 进程领取执行"""
+    execution.status = "pending"
+    job = WorkflowJob(
+        execution_id=execution.execution_id,
+        project_id=execution.project_id,
+    )
+    session.add(execution)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    print(f"Enqueued execution {execution.execution_id} as job {job.job_id}")
+    return job
+
+
+def get_active_job(session: Session, execution_id: int) -> Optional[WorkflowJob]:
+    """获取执行记录当前排队或运行中的任务"""
+    return session.exec(
+        select(WorkflowJob)
+        .where(
+            WorkflowJob.execution_id == execution_id,
+            col(WorkflowJob.status).in_(ACTIVE_JOB_STATUSES),
+        )
+        .order_by(col(WorkflowJob.job_id).desc())
+    ).first()
+
+
+def count_running_before(session: Session, project_id: int, job_id: int) -> int:
+    """项目中编号更小的运行中任务数量"""
+    return session.exec(
+        select(func.count())
+        .select_from(WorkflowJob)
+        .where(
+            WorkflowJob.project_id == project_id,
+            WorkflowJob.status == JOB_RUNNING,
+            col(WorkflowJob.job_id) < job_id,
+        )
+    ).one()
+
+
+def claim_next_job(
+    session: Session, worker_id: str, project_concurrency: int
+) -> Optional[WorkflowJob]:
+    """按先进先出领取一个排队任务, 跳过已达到并发上限的项目
+
+    领取通过带状态条件的 UPDATE 完成, 多个 worker 同时领取同一任务时只有一个成功。
+    """
+    running_counts = dict(
+        session.exec(
+            select(WorkflowJob.project_id, func.count())
+            .where(WorkflowJob.status == JOB_RUNNING)
+            .group_by(col(WorkflowJob.project_id))
+        ).all()
+    )
+    candidates = session.exec(
+        select(WorkflowJob.job_id, WorkflowJob.project_id)
+        .where(WorkflowJob.status == JOB_QUEUED)
+        .order_by(col(WorkflowJob.job_id))
+        .limit(CLAIM_SCAN_LIMIT)
+    ).all()
+
+    for job_id, project_id in candidates:
+        if job_id is None:
+            continue
+        if (
+            project_id is not None
+            and running_counts.get(project_id, 0) >= project_concurrency
+        ):
+            continue
+
+        now = datetime.now(timezone.utc)
+        result = cast(
+            CursorResult[Any],
+            session.execute(
+                update(WorkflowJob)
+                .where(
+                    col(WorkflowJob.job_id) == job_id,
+                    col(WorkflowJob.status) == JOB_QUEUED,
+                )
+                .values(
+                    status=JOB_RUNNING,
+                    worker_id=worker_id,
+                    started_at=now,
+                    heartbeat_at=now,
+                    attempts=WorkflowJob.attempts + 1,
+                ),
+            ),
+        )
+        session.commit()
+        if result.rowcount != 1:
+            # 已被其他 worker 领取
+            continue
+
+        # 多个 worker 可能同时通过并发检查, 编号靠后的任务退回队列
+        if (
+            project_id is not None
+            and count_running_before(session, project_id, job_id) >= project_concurrency
+        ):
+            release_job(session, job_id)
+            running_counts[project_id] = project_concurrency
+            continue
+
+        return session.get(WorkflowJob, job_id)
+
+    return None
+
+
+def heartbeat(session: Session, job_id: int) -> bool:
+    """更新任务心跳, 返回是否请求了取消"""
+    session.execute(
+        update(WorkflowJob)
+        .where(col(WorkflowJob.job_id) == job_id)
+        .values(heartbeat_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+    return bool(
+        session.exec(
+            select(WorkflowJob.cancel_requested).where(WorkflowJob.job_id == job_id)
+        ).one()
+    )
+
+
+def finish_job(
+    session: Session, job_id: int, status: str, error_message: Optional[str] = None
+) -> None:
+    """记录任务结束状态"""
+    session.execute(
+        update(WorkflowJob)
+        .where(col(WorkflowJob.job_id) == job_id)
+        .values(
+            status=status,
+            error_message=error_message,
+            completed_at=datetime.now(timezone.utc),
+        )
+    )
+    session.commit()
+
+
+def release_job(session: Session, job_id: int, count_attempt: bool = False) -> None:
+    """把任务退回队列 (worker 退出或超出项目并发上限时)
+
+    未真正执行的领取不计入 attempts; count_attempt 为 True 时保留本次计数
+    (如 worker 异常退出导致心跳超时)。
+    """
+    job = session.get(WorkflowJob, job_id)
+    if job is None:
+        print(f"Job {job_id} not found, skip release")
+        return
+    if not count_attempt:
+        job.attempts = max(job.attempts - 1, 0)
+    job.status = JOB_QUEUED
+    job.worker_id = None
+    job.started_at = None
+    job.heartbeat_at = None
+    execution = session.get(WorkflowExecution, job.execution_id)
+    if execution:
+        execution.status = "pending"
+        execution.error_message = None
+        session.add(execution)
+    session.add(job)
+    session.commit()
+
+
+def request_cancel(session: Session, execution_id: int) -> Optional[WorkflowJob]:
+    """取消执行: 排队中的任务直接取消, 运行中的任务由 worker 在下次心跳时取消"""
+    job = get_active_job(session, execution_id)
+    if not job:
+        return None
+
+    if job.status == JOB_QUEUED:
+        job.status = JOB_CANCELLED
+        job.completed_at = datetime.now(timezone.utc)
+        execution = session.get(WorkflowExecution, execution_id)
+        if execution:
+            execution.status = "cancelled"
+            execution.completed_at = job.completed_at
+            session.add(execution)
+    job.cancel_requested = True
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def requeue_stale_jobs(session: Session, stale_seconds: int) -> int:
+    """心跳超时 (worker 已退出) 的运行中任务重新排队, 返回重新排队的数量"""
+    deadline = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+    stale_ids = session.exec(
+        select(WorkflowJob.job_id).where(
+            WorkflowJob.status == JOB_RUNNING,
+            col(WorkflowJob.heartbeat_at) < deadline,
+        )
+    ).all()
+    for job_id in stale_ids:
+        if job_id is None:
+            continue
+        print(f"Requeue stale job {job_id}")
+        release_job(session, job_id, count_attempt=True)
+    return len(stale_ids)
@@ -0,0 +1,187 @@
+# backend/app/core/workflow/mask_store.py
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.workflow.image_io import get_image_executor
+
+# 掩码文件统一保存在项目 data/masks/ 下
+MASK_ROOT = "masks"
+MASK_FORMATS = ("png", "npy")
+
+
+def is_mask_ref(value: Any) -> bool:
+    """判断元数据中的值是否为掩码引用"""
+    return isinstance(value, dict) and "mask_path" in value
+
+
+def write_mask(
+    full_path: str, mask: np.ndarray, mask_format: str = "png"
+) -> Dict[str, Any]:
+    """将掩码写入磁盘并返回引用 (在执行器中运行)
+
+    png: 无损压缩, 适合 uint8/uint16 的类别图或二值掩码;
+    npy: 不压缩但可以 np.load(mmap_mode="r") 直接内存映射读取。
+    """
+    mask = np.ascontiguousarray(mask)
+    Path(full_path).parent.mkdir(parents=True, exist_ok=True)
+    if mask_format == "png":
+        if not cv2.imwrite(full_path, mask):
+            raise OSError(f"Failed to write mask: {full_path}")
+    else:
+        np.save(full_path, mask)
+
+    return {
+        "format": mask_format,
+        "shape": list(mask.shape),
+        "dtype": mask.dtype.str,
+        "file_size": os.path.getsize(full_path),
+    }
+
+
+def read_mask(full_path: str, mask_format: str, mmap: bool = False) -> np.ndarray:
+    """读取掩码文件, npy 格式可以内存映射"""
+    mask: Optional[np.ndarray]
+    if mask_format == "npy":
+        mask = np.load(full_path, mmap_mode="r" if mmap else None)
+        return mask
+
+    mask = cv2.imread(full_path, cv2.IMREAD_UNCHANGED)
+    if mask is None:
+        raise OSError(f"Failed to read mask: {full_path}")
+    return mask
+
+
+def rle_encode(mask: np.ndarray) -> Dict[str, Any]:
+    """对掩码做行优先 (C 顺序) 游程编码, 支持二值和多类别掩码"""
+    flat = np.asarray(mask).ravel()
+    if flat.size == 0:
+        return {"size": list(mask.shape), "values": [], "counts": []}
+
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    counts = np.diff(np.concatenate((starts, [flat.size])))
+    return {
+        "size": list(mask.shape),
+        "values": flat[starts].tolist(),
+        "counts": counts.tolist(),
+    }
+
+
+def rle_decode(rle: Dict[str, Any], dtype: Any = np.uint8) -> np.ndarray:
+    """游程编码解码为掩码"""
+    flat = np.repeat(
+        np.asarray(rle["values"], dtype=dtype),
+        np.asarray(rle["counts"], dtype=np.int64),
+    )
+    return flat.reshape(rle["size"])
+
+
+def find_mask_refs(metadata: Any) -> List[Dict[str, Any]]:
+    """按出现顺序收集元数据中的全部掩码引用"""
+    refs = []
+    if is_mask_ref(metadata):
+        refs.append(metadata)
+    elif isinstance(metadata, dict):
+        for value in metadata.values():
+            refs.extend(find_mask_refs(value))
+    elif isinstance(metadata, list):
+        for value in metadata:
+            refs.extend(find_mask_refs(value))
+    return refs
+
+
+def find_legacy_masks(metadata: Any) -> List[Any]:
+    """收集旧版本直接写在元数据 JSON 中的掩码列表"""
+    masks = []
+    if isinstance(metadata, dict):
+        for key, value in metadata.items():
+            if key == "mask" and isinstance(value, list):
+                masks.append(value)
+            else:
+                masks.extend(find_legacy_masks(value))
+    elif isinstance(metadata, list):
+        for value in metadata:
+            masks.extend(find_legacy_masks(value))
+    return masks
+
+
+class MaskStore:
+    """分割掩码存储
+
+    掩码以 sidecar 文件保存在 data/masks/<stage>/ 下, Data/ProcessedData 的元数据中
+    只保存 {"mask_path", "format", "shape", "dtype"} 引用, 需要时再按需解码。
+    """
+
+    def __init__(self, data_dir: str, mask_format: str = "png"):
+        if mask_format not in MASK_FORMATS:
+            raise ValueError(f"Unsupported mask format: {mask_format}")
+        self.data_root = Path(data_dir) / "data"
+        self.mask_format = mask_format
+
+    def full_path(self, mask_path: str) -> Path:
+        return self.data_root / mask_path
+
+    async def save(self, mask_path: str, mask: np.ndarray) -> Dict[str, Any]:
+        """在共享执行器中写入掩码, 返回引用"""
+        mask_format = self.mask_format
+        if mask_format == "png" and mask.dtype not in (np.uint8, np.uint16):
+            # PNG 只支持 8/16 位, 其他数据类型回退为 npy
+            mask_format = "npy"
+
+        mask_path = f"{mask_path}.{mask_format}"
+        loop = asyncio.get_running_loop()
+        ref = await loop.run_in_executor(
+            get_image_executor(),
+            write_mask,
+            str(self.full_path(mask_path)),
+            mask,
+            mask_format,
+        )
+        return {"mask_path": mask_path, **ref}
+
+    async def store_masks(self, metadata: Any, stage: str, stem: str) -> Any:
+        """把元数据中所有 "mask" 键下的 ndarray 写入文件并替换为引用"""
+
+        async def replace(value: Any, keys: Tuple[Any, ...]) -> Any:
+            if isinstance(value, dict):
+                result = {}
+                for key, item in value.items():
+                    if key == "mask" and isinstance(item, np.ndarray):
+                        name = "_".join(str(k) for k in keys + (key,))
+                        result[key] = await self.save(
+                            f"{MASK_ROOT}/{stage}/{stem}_{name}", item
+                        )
+                    else:
+                        result[key] = await replace(item, keys + (key,))
+                return result
+            if isinstance(value, list):
+                return [
+                    await replace(item, keys + (i,)) for i, item in enumerate(value)
+                ]
+            return value
+
+        return await replace(metadata, ())
+
+    def load(self, ref: Dict[str, Any], mmap: bool = False) -> np.ndarray:
+        """按引用读取掩码"""
+        return read_mask(
+            str(self.full_path(ref["mask_path"])), ref["format"], mmap=mmap
+        )
+
+    def load_from_metadata(
+        self, metadata: Dict[str, Any], index: int = 0
+    ) -> Optional[np.ndarray]:
+        """读取元数据中第 index 个掩码, 兼容旧版本的 JSON 列表掩码"""
+        refs = find_mask_refs(metadata)
+        if refs:
+            return self.load(refs[index]) if index < len(refs) else None
+
+        legacy_masks = find_legacy_masks(metadata)
+        if index < len(legacy_masks):
+            return np.asarray(legacy_masks[index], dtype=np.uint8)
+        return None
@@ -1,15 +1,22 @@
 # backend/app/core/workflow/node_processors/__init__.py
 
+from typing import Dict, Type
+
+from .base_processor import BaseNodeProcessor
 from .image_source_processor import ImageSourceNodeProcessor
 from .preprocess_processor import PreprocessNodeProcessor
 from .object_detection_processor import ObjectDetectionNodeProcessor
 from .instance_segmentation_processor import InstanceSegmentationNodeProcessor
 from .semantic_segmentation_processor import SemanticSegmentationNodeProcessor
+from .classification_processor import ClassificationNodeProcessor
+from .thumbnail_processor import ThumbnailNodeProcessor
 
-NODE_PROCESSORS = {
+NODE_PROCESSORS: Dict[str, Type[BaseNodeProcessor]] = {
     "image_source": ImageSourceNodeProcessor,
     "preprocess": PreprocessNodeProcessor,
     "object_detection": ObjectDetectionNodeProcessor,
     "instance_segmentation": InstanceSegmentationNodeProcessor,
-    "semantic_segmentation": SemanticSegmentationNodeProcessor
+    "semantic_segmentation": SemanticSegmentationNodeProcessor,
+    "classification": ClassificationNodeProcessor,
+    "thumbnail": ThumbnailNodeProcessor,
 }
\ No newline at end of file
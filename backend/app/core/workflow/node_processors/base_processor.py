@@ -1,20 +1,116 @@
 # backend/app/core/workflow/node_processors/base_processor.py
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Tuple, Optional
-import cv2
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Tuple,
+    TypeVar,
+    Optional,
+)
+import asyncio
 from pathlib import Path
-from app.models.workflow import ProcessedData, WorkflowNodeExecution, NodeStatus
+from app.models.annotation import Annotation
+from app.models.workflow import (
+    ProcessedData,
+    WorkflowExecution,
+    WorkflowNodeExecution,
+    NodeStatus,
+)
+from app.core.cache import (
+    bump_data_generation,
+    get_default_task_id,
+    invalidate_paths,
+)
 from app.core.workflow.data_manager import WorkflowDataManager
+from app.core.workflow.frame_ring import FrameRing, create_frame_ring
+from app.core.workflow.image_cache import get_image_cache, submit_cached_decode
+from app.core.workflow.image_io import (
+    DEFAULT_IMAGE_FORMAT,
+    IMAGE_FORMATS,
+    get_encode_options,
+    submit_hash,
+    write_image_async,
+)
+from app.core.workflow.file_gc import schedule_file_cleanup
+from app.core.workflow.mask_store import MaskStore, find_mask_refs
+from app.core.workflow.packed_dataset import (
+    PACKED_DIR,
+    PackedDataset,
+    PackedDatasetWriter,
+    find_packed_refs,
+    is_packed_ref,
+)
+from app.core.workflow.result_writer import (
+    DEFAULT_FLUSH_INTERVAL_MS,
+    DEFAULT_FLUSH_ROWS,
+    ResultWriter,
+)
+from sqlalchemy import delete, update
 from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
 from app.models.data import Data
 from app.models.task import Task
+from app.utils.batch_utils import chunked
 import numpy as np
+import hashlib
+import json
 import os
+import time
 import traceback
 
+T = TypeVar("T")
+
+# 默认批大小, 可通过节点参数 batch_size 覆盖
+DEFAULT_BATCH_SIZE = 16
+
+# 只影响执行方式、不影响输出结果的参数, 不参与增量缓存键的计算
+RUNTIME_PARAMS = {
+    "batch_size",
+    "prefetch",
+    "flush_rows",
+    "flush_interval_ms",
+    "incremental",
+    "save_intermediate",
+    "keep_executions",
+}
+
+
+class InputItem(NamedTuple):
+    """节点的一条输入图像"""
+
+    # 输入记录ID, 来自上游流且上游未写入结果时为 None
+    data_id: Optional[int]
+    img: np.ndarray
+    # 图像路径, 用于生成输出文件名
+    path: str
+    original_data_id: Optional[int] = None
+
+
+def group_by_shape(images: List[np.ndarray]) -> List[Tuple[List[int], np.ndarray]]:
+    """按图像尺寸分组并堆叠为 [N, H, W, C] 批次, 返回 (原始下标列表, 批次数组)"""
+    groups: Dict[Tuple, List[int]] = {}
+    for index, img in enumerate(images):
+        groups.setdefault((img.shape, img.dtype.str), []).append(index)
+    return [
+        (indices, np.stack([images[i] for i in indices]))
+        for indices in groups.values()
+    ]
+
 
 class BaseNodeProcessor(ABC):
+    # 输出文件名前缀和输出目录 (相对于 data/), 由子类覆盖
+    output_prefix: str = "processed"
+    output_dir: str = "results"
+    # 处理逻辑变化时递增, 使增量缓存失效
+    version: str = "1"
+    # 是否可以通过内存队列与上下游节点流水线执行
+    supports_streaming: bool = True
+
     def __init__(
         self,
         node_execution: WorkflowNodeExecution,
@@ -24,6 +120,72 @@ class BaseNodeProcessor(ABC):
         self.node_execution = node_execution
         self.session = session
         self.data_manager = data_manager
+        self._task_id: Optional[int] = None
+        # 增量执行: 旧结果的 cache_key -> data_id, 输入 data_id -> cache_key, 命中缓存的旧结果
+        self._cache_index: Optional[Dict[str, int]] = None
+        self._input_cache_keys: Dict[int, str] = {}
+        self._cache_hits: List[int] = []
+        # 已删除结果的文件 {结果路径: [掩码和打包文件路径]}, 处理完成后回收; 只回收此时间之前写入的文件
+        self._gc_files: Dict[str, List[str]] = {}
+        self._started_at = time.time()
+        # 流水线执行: 输入队列、向输入队列写入的上游数量、下游节点的输入队列
+        self.input_stream: Optional[asyncio.Queue] = None
+        self.input_stream_sources = 0
+        self.output_streams: List[asyncio.Queue] = []
+        # 共享执行器为进程池时, 加载/编码进程通过共享内存帧环传递图像
+        self.frame_ring: Optional[FrameRing] = None
+        # 启用 packed 参数时结果同时追加到打包文件, _packed_rows 为每条结果的行号 (按加入顺序)
+        self.packed_writer: Optional[PackedDatasetWriter] = None
+        self._packed_rows: List[Optional[int]] = []
+        # 读取上游打包文件的内存映射, 节点结束时释放
+        self._packed_readers: Dict[str, PackedDataset] = {}
+        self.mask_store = MaskStore(
+            data_manager.project.data_dir,
+            mask_format=self.get_param("mask_format", "png"),
+        )
+        self.result_writer = ResultWriter(
+            session,
+            flush_rows=int(self.get_param("flush_rows", DEFAULT_FLUSH_ROWS)),
+            flush_interval_ms=int(
+                self.get_param("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS)
+            ),
+        )
+
+    def get_param(self, key: str, default: Any = None) -> Any:
+        """读取节点参数, 兼容 {"params": {...}} 和扁平两种配置格式"""
+        config = self.node_execution.config or {}
+        params = config.get("params")
+        if isinstance(params, dict) and key in params:
+            return params[key]
+        return config.get(key, default)
+
+    async def run_db(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """执行使用 self.session 的同步数据库操作, 启用异步数据库时不阻塞事件循环"""
+        return await self.data_manager.run_db(fn, *args, **kwargs)
+
+    def get_encode_options(self, relative_path: str) -> Tuple[str, List[int]]:
+        """输出图像的编码扩展名和参数 (格式/质量/无损由节点参数 output_format, quality, lossless 指定)
+
+        未指定 output_format 时沿用输入格式, 输入格式不能编码时输出 jpg
+        """
+        image_format = self.get_param("output_format")
+        if not image_format:
+            suffix = Path(relative_path).suffix.lower().lstrip(".")
+            image_format = suffix if suffix in IMAGE_FORMATS else DEFAULT_IMAGE_FORMAT
+        return get_encode_options(
+            image_format,
+            quality=self.get_param("quality"),
+            lossless=bool(self.get_param("lossless")),
+        )
+
+    @property
+    def batch_size(self) -> int:
+        """每批处理的图像数量"""
+        try:
+            batch_size = int(self.get_param("batch_size", DEFAULT_BATCH_SIZE))
+        except (TypeError, ValueError):
+            batch_size = DEFAULT_BATCH_SIZE
+        return max(batch_size, 1)
 
     def get_or_create_task(self) -> Task:
         """获取或创建默认任务"""
@@ -41,136 +203,727 @@ class BaseNodeProcessor(ABC):
 
         return task
 
-    async def clean_old_data(self):
-        """清理旧的数据记录，只保留每个节点ID对应的最新数据"""
+    def get_task_id(self) -> int:
+        """获取默认任务ID, 在一次节点运行内缓存 (跨节点使用进程内缓存)"""
+        if self._task_id is None:
+            self._task_id = get_default_task_id(
+                self.session, self.data_manager.project_id
+            ) or self.get_or_create_task().task_id
+        return self._task_id
+
+    @property
+    def keep_executions(self) -> int:
+        """保留本节点最近几次执行的结果 (包含本次)"""
         try:
-            # 使用节点ID作为processing_stage
-            old_data = self.session.exec(
-                select(Data)
+            keep = int(self.get_param("keep_executions", 1))
+        except (TypeError, ValueError):
+            keep = 1
+        return max(keep, 1)
+
+    def project_execution_ids(self) -> SelectOfScalar[Any]:
+        """本项目工作流执行ID的子查询, 节点执行按它过滤可以使用 ix_workflow_node_execution_lookup"""
+        return select(WorkflowExecution.execution_id).where(
+            WorkflowExecution.project_id == self.data_manager.project_id
+        )
+
+    def get_retained_node_execution_ids(self) -> List[int]:
+        """本次执行和最近 keep_executions - 1 次成功执行的节点执行ID"""
+        previous_ids: List[int] = []
+        if self.keep_executions > 1:
+            previous_ids = self.session.exec(
+                select(WorkflowNodeExecution.id)
                 .where(
-                    Data.project_id == self.data_manager.project_id,
-                    Data.processing_stage
-                    == self.node_execution.node_id,  # 使用node_id而不是node_type
-                    Data.node_execution_id != self.node_execution.id,
+                    WorkflowNodeExecution.execution_id.in_(self.project_execution_ids()),
+                    WorkflowNodeExecution.node_id == self.node_execution.node_id,
+                    WorkflowNodeExecution.status == NodeStatus.COMPLETED,
+                    WorkflowNodeExecution.id != self.node_execution.id,
                 )
-                .order_by(Data.created.desc())
+                .order_by(WorkflowNodeExecution.id.desc())
+                .limit(self.keep_executions - 1)
             ).all()
+        return [self.node_execution.id, *previous_ids]
 
-            if old_data:
-                for data in old_data:
-                    self.session.delete(data)
+    async def clean_old_data(self) -> None:
+        """批量删除本节点超出保留数量的旧结果
 
-                self.session.commit()
-                print(
-                    f"Cleaned {len(old_data)} old data records for node: {self.node_execution.node_id}"
-                )
-            else:
-                print(
-                    f"No old data records found for node: {self.node_execution.node_id}"
+        先显式删除关联的标注和处理记录, 再按 ID 批量删除 Data;
+        对应的结果文件和掩码在节点处理完成后由后台线程回收。
+        """
+        node_id = self.node_execution.node_id
+        old_rows, old_processed = await self.run_db(self.delete_old_data)
+
+        for _, path, metadata in old_rows:
+            self._gc_files.setdefault(path, []).extend(
+                ref["mask_path"] for ref in find_mask_refs(metadata)
+            )
+            self._gc_files[path].extend(find_packed_refs(metadata))
+
+        if old_rows or old_processed:
+            print(
+                f"Cleaned {len(old_rows)} old data records and {old_processed} "
+                f"processed records for node: {node_id}"
+            )
+        else:
+            print(f"No old data records found for node: {node_id}")
+
+    def delete_old_data(self) -> Tuple[List[Tuple[int, str, Dict]], int]:
+        """执行删除并提交, 返回 (被删除数据的 (data_id, path, metadata), 删除的处理记录数)"""
+        node_id = self.node_execution.node_id
+        try:
+            retained_ids = self.get_retained_node_execution_ids()
+            old_rows = self.session.exec(
+                select(Data.data_id, Data.path, Data.metadata_).where(
+                    Data.project_id == self.data_manager.project_id,
+                    Data.processing_stage == node_id,  # 使用node_id而不是node_type
+                    Data.node_execution_id.not_in(retained_ids),
                 )
+            ).all()
+            data_ids = [data_id for data_id, _, _ in old_rows]
 
+            for chunk in chunked(data_ids):
+                self.session.execute(delete(Annotation).where(Annotation.data_id.in_(chunk)))
+                self.session.execute(
+                    delete(ProcessedData).where(ProcessedData.original_data_id.in_(chunk))
+                )
+                self.session.execute(
+                    update(Data)
+                    .where(Data.original_data_id.in_(chunk))
+                    .values(original_data_id=None)
+                )
+                self.session.execute(delete(Data).where(Data.data_id.in_(chunk)))
+
+            # 本节点旧执行的处理记录 (复用的记录已归属到本次执行)
+            old_processed = self.session.execute(
+                delete(ProcessedData).where(
+                    ProcessedData.node_execution_id.in_(
+                        select(WorkflowNodeExecution.id).where(
+                            WorkflowNodeExecution.execution_id.in_(
+                                self.project_execution_ids()
+                            ),
+                            WorkflowNodeExecution.node_id == node_id,
+                            WorkflowNodeExecution.id.not_in(retained_ids),
+                        )
+                    )
+                )
+            ).rowcount
+            if data_ids or old_processed:
+                # 通知其他进程 (如 web 进程) 的路径缓存
+                bump_data_generation(self.session, self.data_manager.project_id)
+            self.session.commit()
+            if data_ids or old_processed:
+                invalidate_paths(self.data_manager.project_id)
         except Exception as e:
             self.session.rollback()
             print(f"Error cleaning old data: {str(e)}")
             raise e
+        return old_rows, old_processed
+
+    def schedule_file_cleanup(self) -> None:
+        """把已删除结果的文件交给后台线程回收 (仍被引用或本次写入的文件不会被删除)"""
+        if self._gc_files:
+            schedule_file_cleanup(
+                self.data_manager.project_id,
+                self.data_manager.project.data_dir,
+                self._gc_files,
+                self._started_at,
+            )
+            self._gc_files = {}
 
-    @abstractmethod
     async def process(self) -> List[int]:
-        """处理节点并返回输出数据ID列表"""
+        """处理节点并返回输出数据ID列表, 输入流式加载并按 batch_size 分批交给 process_batch"""
+        output_data_ids = []
+        self.frame_ring = create_frame_ring(self.prefetch_size + 2 * self.batch_size)
+
         try:
-            # 清理旧数据
-            await self.clean_old_data()
+            if self.incremental:
+                # 增量执行: 先建立旧结果索引, 处理完成后再清理未被复用的旧数据
+                self._cache_index = await self.run_db(self.load_cache_index)
+                print(f"Loaded {len(self._cache_index)} cached results")
+            else:
+                # 清理旧数据
+                await self.clean_old_data()
 
-            # 加载输入数据
-            input_data = await self.load_input_data()
-            print(
-                f"\n=== Processing {len(input_data)} images for {self.node_execution.node_id} ==="
-            )
+            print(f"\n=== Processing images for {self.node_execution.node_id} ===")
             print(f"Node config: {self.node_execution.config}")
+            print(f"Batch size: {self.batch_size}")
 
-            # 具体的处理逻辑由子类实现
-            return []
+            # 流式加载输入数据, 边读边处理
+            async for batch in self.iter_input_batches():
+                output_data_ids.extend(await self.process_input_batch(batch))
+
+            # 写入剩余的结果记录
+            output_data_ids.extend(await self.run_db(self.result_writer.flush))
+            await asyncio.to_thread(self.finish_packed_output, list(output_data_ids))
+
+            if self.incremental:
+                output_data_ids.extend(await self.run_db(self.reuse_cached_results))
+                await self.clean_old_data()
+            self.schedule_file_cleanup()
+
+            print(
+                f"\nNode {self.node_execution.node_id} processed {len(output_data_ids)} items"
+            )
+            await self.close_output_streams()
+            return output_data_ids
 
         except Exception as e:
             print(f"Error in process method: {str(e)}")
-            import traceback
-
             traceback.print_exc()
+            self.abort_output_streams(e)
+            raise
+        except asyncio.CancelledError as e:
+            self.abort_output_streams(e)
             raise
+        finally:
+            # 成功、失败或取消都删除帧环的共享内存
+            if self.frame_ring is not None:
+                self.frame_ring.close()
+                self.frame_ring = None
+            # 失败时打包文件只包含已写入数据库的行
+            self.finish_packed_output(output_data_ids)
+            self._packed_readers.clear()
+
+    @property
+    def incremental(self) -> bool:
+        """是否启用增量执行 (跳过输入和配置都未变化的图像), 默认关闭, 通过参数 incremental 启用
+
+        流水线执行时关闭: 命中缓存的图像不会进入下游队列。
+        """
+        return bool(self.get_param("incremental", False)) and not self.streaming
+
+    def connect_streams(
+        self,
+        input_stream: Optional[asyncio.Queue] = None,
+        input_stream_sources: int = 0,
+        output_streams: Optional[List[asyncio.Queue]] = None,
+    ) -> None:
+        """接入流水线: 从 input_stream 读取输入, 处理结果同时放入 output_streams"""
+        self.input_stream = input_stream
+        self.input_stream_sources = input_stream_sources
+        self.output_streams = list(output_streams or [])
+
+    @property
+    def streaming(self) -> bool:
+        """是否处于流水线执行中"""
+        return self.input_stream is not None or bool(self.output_streams)
+
+    @property
+    def save_outputs(self) -> bool:
+        """是否写入结果文件和数据库记录
+
+        只有存在下游流时才能通过 save_intermediate: false 跳过写入, 末端节点总是保存结果。
+        """
+        return not self.output_streams or bool(self.get_param("save_intermediate", True))
+
+    async def emit_stream_items(self, items: List[InputItem]) -> None:
+        """把处理结果放入所有下游队列, 队列满时等待 (背压)"""
+        for item in items:
+            for stream in self.output_streams:
+                await stream.put(item)
+
+    async def close_output_streams(self) -> None:
+        """通知下游输入结束"""
+        for stream in self.output_streams:
+            await stream.put(None)
+
+    def abort_output_streams(self, error: BaseException) -> None:
+        """尽力通知下游上游已失败, 不阻塞 (下游由调度器取消)"""
+        for stream in self.output_streams:
+            try:
+                stream.put_nowait(error)
+            except asyncio.QueueFull:
+                pass
+
+    def get_config_fingerprint(self) -> str:
+        """节点类型、参数和处理器版本的指纹, 运行时参数不参与计算"""
+        config = self.node_execution.config or {}
+        params = config.get("params") if isinstance(config.get("params"), dict) else config
+        return json.dumps(
+            {
+                "node_type": self.node_execution.node_type,
+                "params": {k: v for k, v in params.items() if k not in RUNTIME_PARAMS},
+                "version": self.version,
+            },
+            sort_keys=True,
+            default=str,
+        )
 
-    @abstractmethod
-    async def train(self, **kwargs):
-        """训练功能"""
-        pass
+    def make_cache_key(self, original_data_id: int, content_hash: str) -> str:
+        """由原始数据ID、输入文件哈希和节点配置指纹生成缓存键
+
+        包含原始数据ID, 复用结果的 original_data_id 总是指向同一个输入;
+        内容相同的不同原始数据各自处理。
+        """
+        fingerprint = self.get_config_fingerprint()
+        return hashlib.sha256(
+            f"{fingerprint}:{original_data_id}:{content_hash}".encode()
+        ).hexdigest()
+
+    def load_cache_index(self) -> Dict[str, int]:
+        """一次查询出本节点旧结果的 cache_key -> data_id 映射"""
+        rows = self.session.exec(
+            select(Data.data_id, Data.metadata_).where(
+                Data.project_id == self.data_manager.project_id,
+                Data.processing_stage == self.node_execution.node_id,
+                Data.node_execution_id != self.node_execution.id,
+            )
+        ).all()
+        return {
+            metadata["cache_key"]: data_id
+            for data_id, metadata in rows
+            if metadata and metadata.get("cache_key")
+        }
+
+    def reuse_cached_results(self) -> List[int]:
+        """把命中缓存的旧结果批量归属到本次节点执行, 返回复用的 Data ID"""
+        if not self._cache_hits:
+            return []
 
-    async def load_input_data(self) -> List[Tuple[int, np.ndarray, str]]:
-        """加载输入数据"""
-        input_data = []
-        print(f"\n=== Loading input data for {self.node_execution.node_id} ===")
-        print(f"Input data IDs: {self.node_execution.input_data_ids}")
+        try:
+            for data_ids in chunked(self._cache_hits):
+                rows = self.session.exec(
+                    select(Data.node_execution_id, Data.path).where(
+                        Data.data_id.in_(data_ids)
+                    )
+                ).all()
+                self.session.execute(
+                    update(Data)
+                    .where(Data.data_id.in_(data_ids))
+                    .values(
+                        workflow_execution_id=self.node_execution.execution_id,
+                        node_execution_id=self.node_execution.id,
+                    )
+                )
+                self.session.execute(
+                    update(ProcessedData)
+                    .where(
+                        ProcessedData.node_execution_id.in_(
+                            {node_execution_id for node_execution_id, _ in rows}
+                        ),
+                        ProcessedData.file_path.in_([path for _, path in rows]),
+                    )
+                    .values(node_execution_id=self.node_execution.id)
+                )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
 
-        # 确保从数据库获取完整的节点执行记录
-        self.node_execution = self.session.get(WorkflowNodeExecution, self.node_execution.id)
+        print(f"Reused {len(self._cache_hits)} cached results")
+        return list(self._cache_hits)
 
-        for data_id in self.node_execution.input_data_ids:
-            try:
-                if self.node_execution.node_type == "preprocess":
-                    # 预处理节点：从 ProcessedData 获取原始数据ID，然后查询原始数据
-                    processed_data = self.session.get(ProcessedData, data_id)
-                    if not processed_data:
-                        print(f"No ProcessedData found for ID: {data_id}")
-                        continue
-                    
-                    data = self.session.get(Data, processed_data.original_data_id)
-                    if not data:
-                        print(f"No original Data found for ID: {processed_data.original_data_id}")
-                        continue
-                else:
-                    # 其他节点：直接使用 Data 表中的记录
-                    data = self.session.get(Data, data_id)
-                    if not data:
-                        print(f"No Data record found for ID: {data_id}")
-                        continue
-
-                print(f"Loading data: {data.path}")
-                img_path = os.path.join(
-                    self.data_manager.project.data_dir, "data", data.path
+    def process_batch(
+        self, images: np.ndarray
+    ) -> List[Tuple[np.ndarray, Dict, Optional[str]]]:
+        """批量处理同尺寸图像
+
+        Args:
+            images: 形状为 [N, H, W, C] 的图像批次
+
+        Returns:
+            与输入一一对应的 (处理后图像, 元数据, 类别) 列表
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not implement process_batch"
+        )
+
+    def resolve_original_data_ids(self, data_ids: List[int]) -> Dict[int, Optional[int]]:
+        """批量查询输入数据对应的原始数据ID, 不存在的输入不会出现在结果中"""
+        if not data_ids:
+            return {}
+
+        if self.node_execution.node_type == "preprocess":
+            # 预处理节点的输入是 ProcessedData 的 ID
+            rows = self.session.exec(
+                select(ProcessedData.id, ProcessedData.original_data_id).where(
+                    ProcessedData.id.in_(data_ids)
                 )
-                print(f"Full image path: {img_path}")
+            ).all()
+        else:
+            rows = self.session.exec(
+                select(Data.data_id, Data.original_data_id).where(
+                    Data.data_id.in_(data_ids)
+                )
+            ).all()
 
-                if not os.path.exists(img_path):
-                    print(f"Image file not found: {img_path}")
-                    continue
+        return dict(rows)
 
-                img = cv2.imread(img_path)
-                if img is None:
-                    print(f"Failed to read image: {img_path}")
-                    continue
+    async def process_input_batch(self, batch: List[InputItem]) -> List[int]:
+        """处理一批输入: 一次查询原始数据ID, 按尺寸堆叠后在线程中调用 process_batch, 再并行保存"""
+        try:
+            return await self._process_input_batch(batch)
+        finally:
+            # 输入图像已复制进批次数组, 释放它们占用的帧环槽位
+            if self.frame_ring is not None:
+                for item in batch:
+                    self.frame_ring.release_array(item.img)
+
+    async def _process_input_batch(self, batch: List[InputItem]) -> List[int]:
+        output_data_ids: List[int] = []
+        original_ids = await self.run_db(
+            self.resolve_original_data_ids,
+            [item.data_id for item in batch if item.data_id is not None],
+        )
 
-                input_data.append((data_id, img, img_path))
-                print(f"Successfully loaded: {img_path}")
+        valid_batch = []
+        for item in batch:
+            if item.data_id is None:
+                # 来自上游流的图像已携带原始数据ID
+                valid_batch.append(item)
+            elif item.data_id in original_ids:
+                valid_batch.append(item._replace(original_data_id=original_ids[item.data_id]))
+            else:
+                print(f"No input record found for ID: {item.data_id}")
 
+        results: List[Optional[Tuple[np.ndarray, Dict, Optional[str]]]] = [None] * len(
+            valid_batch
+        )
+        for indices, images in group_by_shape([item.img for item in valid_batch]):
+            try:
+                # 计算放到线程中执行, 避免阻塞事件循环
+                batch_results = await asyncio.to_thread(self.process_batch, images)
+                for index, batch_result in zip(indices, batch_results, strict=True):
+                    results[index] = batch_result
             except Exception as e:
-                print(f"Error loading data {data_id}: {str(e)}")
-                import traceback
+                print(f"Error processing batch of {len(indices)} images: {str(e)}")
                 traceback.print_exc()
+
+        outputs = []
+        for item, result in zip(valid_batch, results, strict=True):
+            if result is None:
                 continue
+            processed_img, metadata, category = result
+
+            # 生成文件名和元数据
+            input_name = Path(item.path)
+            output_ext, _ = self.get_encode_options(input_name.name)
+            filename = f"{self.output_prefix}_{input_name.stem}{output_ext}"
+            relative_path = f"{self.output_dir}/{filename}"
+            metadata = {
+                **metadata,
+                "original_data_id": item.original_data_id,
+                "filename": filename,
+            }
+            if item.data_id in self._input_cache_keys:
+                metadata["cache_key"] = self._input_cache_keys.pop(item.data_id)
+            outputs.append(
+                (item.original_data_id, processed_img, filename, relative_path, metadata, category)
+            )
+
+        # 先把结果交给下游, 使下游与本节点的写入并行
+        await self.emit_stream_items(
+            [
+                InputItem(None, output[1], output[3], output[0])
+                for output in outputs
+            ]
+        )
+        if not self.save_outputs:
+            return output_data_ids
+
+        # 图像编码和掩码写入在共享执行器中并行进行
+        written = await asyncio.gather(
+            *[
+                self.write_result_image(output[3], output[1], output[4])
+                for output in outputs
+            ],
+            return_exceptions=True,
+        )
 
+        # 按输入顺序加入批量写入器
+        def save_results() -> None:
+            for output, saved in zip(outputs, written, strict=True):
+                original_data_id, processed_img, filename, _, _, category = output
+                if isinstance(saved, BaseException):
+                    print(f"Error saving processed image {filename}: {str(saved)}")
+                    continue
+                relative_path, file_info, metadata = saved
+                if self.packed_output:
+                    metadata = self.pack_result(processed_img, metadata)
+                output_data_ids.extend(
+                    self.save_processed_result(
+                        original_data_id=original_data_id,
+                        filename=filename,
+                        relative_path=relative_path,
+                        metadata=metadata,
+                        category=category,
+                        file_info=file_info,
+                    )
+                )
+                print(f"Successfully processed: {filename}")
+
+        await self.run_db(save_results)
+        return output_data_ids
+
+    @property
+    def packed_output(self) -> bool:
+        """是否把结果图像额外追加到打包文件 (结果尺寸固定时下游可免解码读取)"""
+        return bool(self.get_param("packed", False))
+
+    def pack_result(self, processed_img: np.ndarray, metadata: Dict) -> Dict:
+        """把结果图像追加到本次执行的打包文件, 返回记录了行位置的元数据"""
+        if self.packed_writer is None:
+            pack_path = (
+                f"{self.output_dir}/{PACKED_DIR}/"
+                f"{self.node_execution.id}_{int(self._started_at * 1000)}.npy"
+            )
+            self.packed_writer = PackedDatasetWriter(
+                Path(self.data_manager.project.data_dir) / "data", pack_path
+            )
+        row = self.packed_writer.append(processed_img)
+        self._packed_rows.append(row)
+        if row is None:
+            return metadata
+        return {
+            **metadata,
+            "packed": {"pack_path": self.packed_writer.pack_path, "row": row},
+        }
+
+    def finish_packed_output(self, data_ids: List[int]) -> None:
+        """写入打包文件的行数和 data_id 索引
+
+        Args:
+            data_ids: 已写入的结果 Data ID, 与 pack_result 的调用顺序一致 (写入失败时可能更短)
+        """
+        if self.packed_writer is None:
+            return
+        ids_by_row: List[Optional[int]] = [None] * self.packed_writer.rows
+        for data_id, row in zip(data_ids, self._packed_rows, strict=False):
+            if row is not None:
+                ids_by_row[row] = data_id
+        try:
+            self.packed_writer.close(ids_by_row)
+        except OSError as e:
+            print(f"Error finishing packed output: {str(e)}")
+        self.packed_writer = None
+        self._packed_rows = []
+
+    @abstractmethod
+    async def train(self, **kwargs):
+        """训练功能"""
+        pass
+
+    async def load_input_data(self) -> List[InputItem]:
+        """一次性加载全部输入数据 (内存占用与数据集大小成正比, 大数据集请使用 iter_input_data)"""
+        input_data = [item async for item in self.iter_input_data()]
         print(f"Total loaded data: {len(input_data)}")
         return input_data
 
-    def save_processed_result(
-        self,
-        original_data_id: int,
-        processed_img: np.ndarray,
-        filename: str,
-        relative_path: str,
-        metadata: Dict,
-        category: Optional[str] = None,
-    ) -> Tuple[Data, ProcessedData]:
-        """保存处理结果到 Data 和 ProcessedData 表，并保存图片到本地"""
-        task = self.get_or_create_task()
+    def resolve_input_paths(self, data_ids: List[int]) -> List[Tuple[int, str]]:
+        """批量解析输入数据ID对应的图像完整路径, 保持输入顺序"""
+        if self.node_execution.node_type == "preprocess":
+            # 预处理节点：输入是 ProcessedData 的 ID，图像来自其原始数据
+            rows = self.session.exec(
+                select(ProcessedData.id, Data.path)
+                .join(Data, Data.data_id == ProcessedData.original_data_id)
+                .where(ProcessedData.id.in_(data_ids))
+            ).all()
+        else:
+            # 其他节点：直接使用 Data 表中的记录
+            rows = self.session.exec(
+                select(Data.data_id, Data.path).where(Data.data_id.in_(data_ids))
+            ).all()
+        paths = dict(rows)
+
+        input_paths = []
+        for data_id in data_ids:
+            if data_id not in paths:
+                print(f"No input record found for ID: {data_id}")
+                continue
+            input_paths.append(
+                (
+                    data_id,
+                    os.path.join(
+                        self.data_manager.project.data_dir, "data", paths[data_id]
+                    ),
+                )
+            )
+        return input_paths
+
+    @property
+    def prefetch_size(self) -> int:
+        """流式加载时最多预读的图像数量"""
+        try:
+            prefetch = int(self.get_param("prefetch", self.batch_size * 2))
+        except (TypeError, ValueError):
+            prefetch = self.batch_size * 2
+        return max(prefetch, 1)
+
+    async def _produce_input_data(
+        self, data_ids: List[int], queue: asyncio.Queue
+    ) -> None:
+        """按批解析路径并向共享执行器提交解码任务, 按输入顺序把 future 放入有界队列
+
+        结束时放入 None, 出错时放入异常。
+        """
+        try:
+            for start in range(0, len(data_ids), self.batch_size):
+                chunk = data_ids[start : start + self.batch_size]
+                input_paths = await self.run_db(self.resolve_input_paths, chunk)
+                if self._cache_index is not None:
+                    input_paths = await self.skip_cached_inputs(input_paths)
+                packed_refs = await self.run_db(
+                    self.resolve_packed_inputs, [data_id for data_id, _ in input_paths]
+                )
+                for data_id, img_path in input_paths:
+                    future = self.read_packed_row(packed_refs.get(data_id))
+                    if future is None:
+                        future = self.submit_decode(img_path)
+                    await queue.put((data_id, future, img_path))
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    def resolve_packed_inputs(self, data_ids: List[int]) -> Dict[int, Dict]:
+        """批量查询输入数据在上游打包文件中的位置, 没有打包的输入不会出现在结果中"""
+        if not data_ids or self.node_execution.node_type == "preprocess":
+            return {}
+        rows = self.session.exec(
+            select(Data.data_id, Data.metadata_).where(Data.data_id.in_(data_ids))
+        ).all()
+        return {
+            data_id: metadata["packed"]
+            for data_id, metadata in rows
+            if isinstance(metadata, dict) and is_packed_ref(metadata.get("packed"))
+        }
+
+    def read_packed_row(
+        self, ref: Optional[Dict]
+    ) -> Optional["asyncio.Future[Optional[np.ndarray]]"]:
+        """从打包文件的内存映射中取出一行 (无需解码), 打包文件不可用时返回 None"""
+        if ref is None:
+            return None
+        pack_path = ref["pack_path"]
+        try:
+            reader = self._packed_readers.get(pack_path)
+            if reader is None:
+                reader = PackedDataset(
+                    Path(self.data_manager.project.data_dir) / "data", pack_path
+                )
+                self._packed_readers[pack_path] = reader
+            img = reader[ref["row"]]
+        except (OSError, ValueError, IndexError) as e:
+            print(f"Packed row unavailable, decoding instead: {str(e)}")
+            return None
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(img)
+        return future
+
+    def submit_decode(self, img_path: str) -> "asyncio.Future[Optional[np.ndarray]]":
+        """提交输入解码: 优先使用解码缓存, 缓存禁用时解码到帧环槽位 (如果有)"""
+        if self.frame_ring is not None and get_image_cache() is None:
+            return asyncio.ensure_future(self.frame_ring.decode(img_path))
+        return submit_cached_decode(img_path)
+
+    async def skip_cached_inputs(
+        self, input_paths: List[Tuple[int, str]]
+    ) -> List[Tuple[int, str]]:
+        """并行计算输入文件哈希, 记录命中缓存的旧结果, 只返回需要重新处理的输入"""
+        hashes = await asyncio.gather(*[submit_hash(path) for _, path in input_paths])
+        original_ids = await self.run_db(
+            self.resolve_original_data_ids, [data_id for data_id, _ in input_paths]
+        )
+
+        pending = []
+        for (data_id, img_path), content_hash in zip(input_paths, hashes, strict=True):
+            original_data_id = original_ids.get(data_id)
+            if content_hash is None or original_data_id is None:
+                # 无法计算哈希 (如文件缺失) 时照常处理, 由解码步骤报告错误
+                pending.append((data_id, img_path))
+                continue
+            cache_key = self.make_cache_key(original_data_id, content_hash)
+            cached_data_id = self._cache_index.pop(cache_key, None)
+            if cached_data_id is not None:
+                self._cache_hits.append(cached_data_id)
+                continue
+            self._input_cache_keys[data_id] = cache_key
+            pending.append((data_id, img_path))
+        return pending
+
+    async def iter_stream_input(self) -> AsyncIterator[InputItem]:
+        """从上游队列读取输入, 所有上游都结束后停止"""
+        print(
+            f"\n=== Streaming input for {self.node_execution.node_id} "
+            f"from {self.input_stream_sources} upstream nodes ==="
+        )
+        finished = 0
+        while finished < self.input_stream_sources:
+            item = await self.input_stream.get()
+            if item is None:
+                finished += 1
+            elif isinstance(item, BaseException):
+                raise RuntimeError(f"Upstream node failed: {str(item)}") from item
+            else:
+                yield item
+
+    async def iter_input_data(self) -> AsyncIterator[InputItem]:
+        """流式加载输入数据, 逐个产出 InputItem
+
+        图像在共享执行器中并行解码并按输入顺序产出, 预读数量由 prefetch 参数限制,
+        因此内存峰值与批大小相关而与数据集大小无关。流水线执行时直接读取上游队列。
+        """
+        if self.input_stream is not None:
+            async for item in self.iter_stream_input():
+                yield item
+            return
 
+        print(f"\n=== Loading input data for {self.node_execution.node_id} ===")
+
+        # 确保从数据库获取完整的节点执行记录
+        self.node_execution = await self.run_db(
+            self.session.get, WorkflowNodeExecution, self.node_execution.id
+        )
+        data_ids = list(self.node_execution.input_data_ids or [])
+        print(f"Streaming {len(data_ids)} inputs (prefetch: {self.prefetch_size})")
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch_size)
+        producer = asyncio.create_task(self._produce_input_data(data_ids, queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                data_id, future, img_path = item
+                try:
+                    img = await future
+                except Exception as e:
+                    print(f"Error loading data {data_id}: {str(e)}")
+                    traceback.print_exc()
+                    continue
+                if img is not None:
+                    yield InputItem(data_id, img, img_path)
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+    async def iter_input_batches(
+        self,
+    ) -> AsyncIterator[List[InputItem]]:
+        """流式加载输入数据, 每次产出不超过 batch_size 个元素的批次"""
+        batch = []
+        async for item in self.iter_input_data():
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def write_result_image(
+        self, relative_path: str, processed_img: np.ndarray, metadata: Dict
+    ) -> Tuple[str, Dict, Dict]:
+        """将处理后的图片只编码一次并保存到本地, 元数据中的掩码写入掩码存储
+
+        Returns:
+            (规范化后的相对路径, 文件信息, 掩码替换为引用后的元数据)
+        """
         # 确保路径格式正确，移除多余的 'data/' 前缀
         if relative_path.startswith("data/"):
             relative_path = relative_path[5:]
@@ -182,13 +935,36 @@ class BaseNodeProcessor(ABC):
         # 保存图片到本地
         save_path = save_dir / Path(relative_path).name
         print(f"Saving processed image to: {save_path}")
-        cv2.imwrite(str(save_path), processed_img)
+        ext, params = self.get_encode_options(relative_path)
+        write_image = self.frame_ring.write_image if self.frame_ring else write_image_async
+        file_info, metadata = await asyncio.gather(
+            write_image(str(save_path), processed_img, ext, params),
+            self.mask_store.store_masks(
+                metadata, Path(self.output_dir).name, Path(relative_path).stem
+            ),
+        )
 
-        # 1. 保存到 Data 表
+        return relative_path, file_info, metadata
+
+    def save_processed_result(
+        self,
+        original_data_id: int,
+        filename: str,
+        relative_path: str,
+        metadata: Dict,
+        category: Optional[str] = None,
+        file_info: Optional[Dict] = None,
+    ) -> List[int]:
+        """将 Data 和 ProcessedData 记录加入批量写入器
+
+        Returns:
+            本次触发批量写入的 Data ID 列表 (未触发写入时为空)
+        """
+        # 1. Data 表记录
         data = Data(
             path=relative_path,
             project_id=self.data_manager.project_id,
-            task_id=task.task_id,
+            task_id=self.get_task_id(),
             original_data_id=original_data_id,
             workflow_execution_id=self.node_execution.execution_id,
             node_execution_id=self.node_execution.id,
@@ -196,22 +972,17 @@ class BaseNodeProcessor(ABC):
             category=category,
             metadata_=metadata,
         )
-        self.session.add(data)
-        self.session.commit()
 
-        # 2. 保存到 ProcessedData 表
+        # 2. ProcessedData 表记录
         processed_data = self.data_manager.save_processed_data(
             node_execution_id=self.node_execution.id,
             original_data_id=original_data_id,
-            data=cv2.imencode(".jpg", processed_img)[1].tobytes(),
             filename=filename,
             file_path=relative_path,
             node_type=self.node_execution.node_type,
             node_id=self.node_execution.node_id,
             metadata_=metadata,
+            file_info=file_info,
         )
-        self.session.add(processed_data)
-        self.session.commit()
 
-        print(f"Successfully saved processed data: {relative_path}")
-        return data, processed_data
+        return self.result_writer.add(data, processed_data)
@@ -1,92 +1,239 @@
 # backend/app/core/workflow/node_processors/image_source_processor.py
 
 from datetime import datetime, timezone
-from typing import List
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+from app.core.workflow.image_io import submit_hash
 from app.models.data import Data
 from app.models.workflow import ProcessedData
-import cv2
+from app.utils.batch_utils import chunked
 from pathlib import Path
-from sqlmodel import select
+from sqlalchemy import insert, update
+from sqlmodel import col, select
 from .base_processor import BaseNodeProcessor
 
+# 图像源识别的图片扩展名
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif"}
+
+
+def scan_image_names(source_dir: Path) -> List[str]:
+    """单次遍历目录, 返回排序后的图片文件名"""
+    if not source_dir.is_dir():
+        return []
+    with os.scandir(source_dir) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if entry.is_file() and Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS
+        )
+
+
+def unique_by_content(image_names: List[str], hashes: Dict[str, Optional[str]]) -> List[str]:
+    """按内容去重, 每种内容只保留第一个文件名 (无法计算哈希的文件全部保留)"""
+    seen = set()
+    unique_names = []
+    for name in image_names:
+        content_hash = hashes.get(name)
+        if content_hash is None or content_hash not in seen:
+            unique_names.append(name)
+            if content_hash is not None:
+                seen.add(content_hash)
+    return unique_names
+
 
 class ImageSourceNodeProcessor(BaseNodeProcessor):
+    # 图像源只扫描目录, 下游从数据库读取其输出
+    supports_streaming = False
+
     async def process(self) -> List[int]:
-        output_data_ids = []
         source_path = self.node_execution.config.get("path")
         print(f"Processing images from: {source_path}")
 
         # 获取项目的完整数据目录路径
         project_data_dir = Path(self.data_manager.project.data_dir)
-        task = self.get_or_create_task()
-        
+        source_dir = project_data_dir / "data" / "original"
+
         # 首先清理旧数据
         await self.clean_old_data()
-        
-        # 1. 查询或创建数据记录
-        source_dir = project_data_dir / "data" / "original"
-        if source_dir.exists() and source_dir.is_dir():
-            for ext in [".jpg", ".jpeg", ".png", ".bmp", ".gif"]:
-                for img_path in source_dir.glob(f"*{ext}"):
-                    try:
-                        # 检查是否已存在数据记录
-                        relative_path = f"original/{img_path.name}"
-                        data = self.session.exec(
-                            select(Data).where(
-                                Data.path == relative_path,
-                                Data.project_id == self.data_manager.project_id,
-                                Data.processing_stage == "original"
-                            )
-                        ).first()
-
-                        if not data:
-                            # 如果不存在，创建新的数据记录
-                            data = Data(
-                                path=relative_path,
-                                project_id=self.data_manager.project_id,
-                                task_id=task.task_id,
-                                processing_stage="original",
-                                workflow_execution_id=self.node_execution.execution_id,
-                                node_execution_id=self.node_execution.id,
-                                metadata_={
-                                    "original_filename": img_path.name,
-                                    "source_path": str(source_dir)
-                                }
-                            )
-                        else:
-                            # 如果存在，更新现有记录
-                            data.workflow_execution_id = self.node_execution.execution_id
-                            data.node_execution_id = self.node_execution.id
-                            data.metadata_["last_processed"] = datetime.now(timezone.utc).isoformat()
-                        
-                        self.session.add(data)
-                        self.session.commit()
-
-                        # 2. 创建 ProcessedData 记录
-                        processed_data = ProcessedData(
-                            original_data_id=data.data_id,
-                            node_execution_id=self.node_execution.id,
-                            file_path=relative_path,
-                            file_type="image",
-                            format=img_path.suffix.lstrip("."),
-                            metadata_={
-                                "original_path": str(img_path),
-                                "data_id": data.data_id
-                            },
-                            created_at=datetime.now(timezone.utc),
-                        )
-
-                        self.session.add(processed_data)
-                        self.session.commit()
-                        output_data_ids.append(processed_data.id)
-
-                    except Exception as e:
-                        print(f"Error processing {img_path.name}: {str(e)}")
-                        continue
 
+        # 1. 扫描目录并与数据库比对 (一次查询)
+        image_names = scan_image_names(source_dir)
+        existing = await self.run_db(self.load_existing_data, image_names)
+        hashes = await self.load_content_hashes(image_names, existing, source_dir)
+
+        # 2. 内容相同的图片只输出一次, 下游节点不会重复处理
+        unique_names = unique_by_content(image_names, hashes)
+        if len(unique_names) < len(image_names):
+            print(f"Skipped {len(image_names) - len(unique_names)} duplicate images")
+
+        output_data_ids = await self.run_db(
+            self.save_source_data, image_names, unique_names, existing, hashes, source_dir
+        )
+
+        self.schedule_file_cleanup()
         print(f"Processed {len(output_data_ids)} images")
         return output_data_ids
 
+    def save_source_data(
+        self,
+        image_names: List[str],
+        unique_names: List[str],
+        existing: Dict[str, Tuple[int, Dict, Optional[str]]],
+        hashes: Dict[str, Optional[str]],
+        source_dir: Path,
+    ) -> List[int]:
+        """写入 Data 和 ProcessedData 记录并一次提交, 返回输出的 ProcessedData ID"""
+        try:
+            data_ids = self.upsert_data(image_names, existing, hashes, source_dir)
+            # 3. 批量创建 ProcessedData 记录
+            output_data_ids = self.insert_processed_data(unique_names, data_ids, source_dir)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return output_data_ids
+
+    def load_existing_data(
+        self, image_names: List[str]
+    ) -> Dict[str, Tuple[int, Dict, Optional[str]]]:
+        """按路径分批查询目录中图片已有的原始数据: path -> (data_id, metadata, content_hash)
+
+        查询走 ix_data_path_project_stage 索引, 只读取本次扫描到的路径
+        """
+        existing: Dict[str, Tuple[int, Dict, Optional[str]]] = {}
+        for chunk in chunked([f"original/{name}" for name in image_names]):
+            rows = self.session.exec(
+                select(Data.data_id, Data.path, Data.metadata_, Data.content_hash).where(
+                    Data.path.in_(chunk),
+                    Data.project_id == self.data_manager.project_id,
+                    Data.processing_stage == "original",
+                )
+            ).all()
+            existing.update(
+                (path, (data_id, metadata or {}, content_hash))
+                for data_id, path, metadata, content_hash in rows
+            )
+        return existing
+
+    async def load_content_hashes(
+        self,
+        image_names: List[str],
+        existing: Dict[str, Tuple[int, Dict, Optional[str]]],
+        source_dir: Path,
+    ) -> Dict[str, Optional[str]]:
+        """返回 name -> 内容哈希, 数据库中没有哈希的文件在执行器中并行计算"""
+        hashes: Dict[str, Optional[str]] = {}
+        missing = []
+        for name in image_names:
+            record = existing.get(f"original/{name}")
+            if record and record[2]:
+                hashes[name] = record[2]
+            else:
+                missing.append(name)
+
+        for chunk in chunked(missing):
+            futures = [submit_hash(str(source_dir / name)) for name in chunk]
+            hashes.update(zip(chunk, await asyncio.gather(*futures), strict=True))
+        if missing:
+            print(f"Computed content hash for {len(missing)} images")
+        return hashes
+
+    def upsert_data(
+        self,
+        image_names: List[str],
+        existing: Dict[str, Tuple[int, Dict, Optional[str]]],
+        hashes: Dict[str, Optional[str]],
+        source_dir: Path,
+    ) -> Dict[str, int]:
+        """已有记录批量更新归属, 新文件批量插入, 返回 path -> data_id"""
+        now = datetime.now(timezone.utc)
+        task_id = self.get_task_id()
+        data_ids: Dict[str, int] = {}
+        updates = []
+        new_paths = []
+        for name in image_names:
+            relative_path = f"original/{name}"
+            if relative_path in existing:
+                data_id, metadata, _ = existing[relative_path]
+                data_ids[relative_path] = data_id
+                updates.append(
+                    {
+                        "data_id": data_id,
+                        "workflow_execution_id": self.node_execution.execution_id,
+                        "node_execution_id": self.node_execution.id,
+                        "metadata_": {**metadata, "last_processed": now.isoformat()},
+                        "content_hash": hashes.get(name),
+                        "modified": now,
+                    }
+                )
+            else:
+                new_paths.append(relative_path)
+
+        # 按主键批量更新已存在的记录
+        for update_chunk in chunked(updates):
+            self.session.execute(update(Data), update_chunk)
+
+        # 批量插入新记录, RETURNING 按参数顺序返回 ID
+        for chunk in chunked(new_paths):
+            rows = [
+                Data(
+                    path=relative_path,
+                    project_id=self.data_manager.project_id,
+                    task_id=task_id,
+                    processing_stage="original",
+                    content_hash=hashes.get(Path(relative_path).name),
+                    workflow_execution_id=self.node_execution.execution_id,
+                    node_execution_id=self.node_execution.id,
+                    metadata_={
+                        "original_filename": Path(relative_path).name,
+                        "source_path": str(source_dir),
+                    },
+                ).model_dump(exclude={"data_id"})
+                for relative_path in chunk
+            ]
+            inserted_ids = self.session.scalars(
+                insert(Data).returning(col(Data.data_id), sort_by_parameter_order=True),
+                rows,
+            )
+            data_ids.update(zip(chunk, inserted_ids, strict=True))
+
+        print(f"Source data: {len(new_paths)} new, {len(updates)} existing")
+        return data_ids
+
+    def insert_processed_data(
+        self, image_names: List[str], data_ids: Dict[str, int], source_dir: Path
+    ) -> List[int]:
+        """批量插入 ProcessedData 记录, 返回与 image_names 顺序一致的 ID"""
+        output_data_ids: List[int] = []
+        for chunk in chunked(image_names):
+            rows = []
+            for name in chunk:
+                relative_path = f"original/{name}"
+                rows.append(
+                    ProcessedData(
+                        original_data_id=data_ids[relative_path],
+                        node_execution_id=self.node_execution.id,
+                        file_path=relative_path,
+                        file_type="image",
+                        format=Path(name).suffix.lstrip("."),
+                        metadata_={
+                            "original_path": str(source_dir / name),
+                            "data_id": data_ids[relative_path],
+                        },
+                        created_at=datetime.now(timezone.utc),
+                    ).model_dump(exclude={"id"})
+                )
+            output_data_ids.extend(
+                self.session.scalars(
+                    insert(ProcessedData).returning(
+                        col(ProcessedData.id), sort_by_parameter_order=True
+                    ),
+                    rows,
+                )
+            )
+        return output_data_ids
+
     async def train(self, **kwargs):
         """图像源节点不需要训练"""
         pass
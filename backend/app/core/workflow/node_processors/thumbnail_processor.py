@@ -0,0 +1,97 @@
+# backend/app/core/workflow/node_processors/thumbnail_processor.py
+
+import asyncio
+import os
+from typing import List, Tuple
+
+from sqlmodel import select
+
+from app.core.workflow.thumbnail_store import get_pyramid_level, get_thumbnail_cache
+from app.models.data import Data
+from app.models.workflow import ProcessedData, WorkflowNodeExecution
+
+from .base_processor import BaseNodeProcessor
+
+# 默认预生成的缩略图尺寸
+DEFAULT_THUMBNAIL_SIZES = [256]
+
+
+class ThumbnailNodeProcessor(BaseNodeProcessor):
+    """预生成缩略图缓存, 输出与输入相同的数据ID, 可以插入工作流的任意位置"""
+
+    # 只读取文件路径, 不需要解码后的图像
+    supports_streaming = False
+
+    @property
+    def levels(self) -> List[int]:
+        """参数 sizes 对应的金字塔级别 (去重)"""
+        sizes = self.get_param("sizes", DEFAULT_THUMBNAIL_SIZES)
+        if not isinstance(sizes, list | tuple):
+            sizes = [sizes]
+        return sorted({get_pyramid_level(int(size)) for size in sizes})
+
+    async def process(self) -> List[int]:
+        self.node_execution = await self.run_db(
+            self.session.get, WorkflowNodeExecution, self.node_execution.id
+        )
+        data_ids = list(self.node_execution.input_data_ids or [])
+        levels = self.levels
+        cache = get_thumbnail_cache(self.data_manager.project.data_dir)
+        print(f"Generating thumbnails {levels} for {len(data_ids)} images")
+
+        generated = failed = 0
+        for start in range(0, len(data_ids), self.batch_size):
+            chunk = data_ids[start : start + self.batch_size]
+            input_paths = await self.run_db(self.resolve_input_paths, chunk)
+            results = await asyncio.gather(
+                *[
+                    cache.get(img_path, level)
+                    for _, img_path in input_paths
+                    for level in levels
+                ],
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"Error generating thumbnail: {str(result)}")
+                    failed += 1
+                else:
+                    generated += 1
+
+        print(f"Thumbnails ready: {generated}, failed: {failed}")
+        return data_ids
+
+    def resolve_input_paths(self, data_ids: List[int]) -> List[Tuple[int, str]]:
+        """图像源输出的是 ProcessedData ID, 其他节点输出 Data ID"""
+        rows = self.session.exec(
+            select(ProcessedData.id, ProcessedData.file_path)
+            .join(
+                WorkflowNodeExecution,
+                WorkflowNodeExecution.id == ProcessedData.node_execution_id,
+            )
+            .where(
+                ProcessedData.id.in_(data_ids),
+                WorkflowNodeExecution.execution_id == self.node_execution.execution_id,
+                WorkflowNodeExecution.node_type == "image_source",
+            )
+        ).all()
+        paths = dict(rows)
+
+        remaining = [data_id for data_id in data_ids if data_id not in paths]
+        if remaining:
+            paths.update(
+                self.session.exec(
+                    select(Data.data_id, Data.path).where(Data.data_id.in_(remaining))
+                ).all()
+            )
+
+        data_dir = self.data_manager.project.data_dir
+        return [
+            (data_id, os.path.join(data_dir, "data", paths[data_id]))
+            for data_id in data_ids
+            if data_id in paths
+        ]
+
+    async def train(self, **kwargs):
+        """缩略图节点不需要训练"""
+        pass
@@ -0,0 +1,152 @@
+# backend/app/core/workflow/packed_dataset.py
+
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 打包文件所在的子目录 (位于节点输出目录下, 如 preprocessed/packed/)
+PACKED_DIR = "packed"
+# .npy 文件头固定长度, 写入过程中行数未知, 结束时原地改写行数
+HEADER_BYTES = 128
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def is_packed_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "pack_path" in value and "row" in value
+
+
+def index_path_of(pack_path: str) -> str:
+    """打包文件对应的索引文件路径 ({名称}.index.json)"""
+    return str(Path(pack_path).with_suffix(".index.json").as_posix())
+
+
+def find_packed_refs(metadata: Any) -> List[str]:
+    """元数据引用的打包文件及其索引文件路径 (相对于 data/)"""
+    ref = metadata.get("packed") if isinstance(metadata, dict) else None
+    if ref is None or not is_packed_ref(ref):
+        return []
+    return [ref["pack_path"], index_path_of(ref["pack_path"])]
+
+
+def npy_header(shape: Tuple[int, ...], dtype: np.dtype) -> bytes:
+    """生成固定长度的 .npy (1.0 版) 文件头, 不足部分按格式规定用空格填充"""
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": tuple(shape),
+        }
+    )
+    padding = HEADER_BYTES - len(NPY_MAGIC) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Array header too long: {header}")
+    header = header + " " * padding + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class PackedDatasetWriter:
+    """把同尺寸图像按行追加写入一个 .npy 文件
+
+    下游节点和训练任务通过内存映射按行切片读取, 不需要解码, 也没有逐文件的系统调用。
+    第一张图像决定行的形状和 dtype, 形状不同的图像不会写入 (返回 None)。
+    只在一个线程中使用。
+    """
+
+    def __init__(self, data_root: Path, pack_path: str):
+        self.data_root = Path(data_root)
+        self.pack_path = pack_path
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.dtype: Optional[np.dtype] = None
+        self.rows = 0
+        self.skipped = 0
+        self._file: Optional[BinaryIO] = None
+
+    def append(self, img: np.ndarray) -> Optional[int]:
+        """追加一行并返回行号, 形状与已写入的行不同时返回 None"""
+        if self._file is None:
+            full_path = self.data_root / self.pack_path
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            self.shape, self.dtype = img.shape, img.dtype
+            self._file = open(full_path, "wb")
+            self._file.write(npy_header((0, *self.shape), self.dtype))
+        elif img.shape != self.shape or img.dtype != self.dtype:
+            self.skipped += 1
+            return None
+
+        self._file.write(np.ascontiguousarray(img).data)
+        self.rows += 1
+        return self.rows - 1
+
+    def close(self, data_ids: Sequence[Optional[int]] = ()) -> Optional[str]:
+        """改写文件头中的行数并写入索引, 返回打包文件路径 (没有写入任何行时返回 None)
+
+        Args:
+            data_ids: 每一行对应的 Data ID, 按行号排列
+        """
+        if self._file is None or self.shape is None or self.dtype is None:
+            return None
+        self._file.seek(0)
+        self._file.write(npy_header((self.rows, *self.shape), self.dtype))
+        self._file.close()
+        self._file = None
+
+        index = {
+            "pack_path": self.pack_path,
+            "shape": [self.rows, *self.shape],
+            "dtype": self.dtype.str,
+            "rows": {
+                str(data_id): row
+                for row, data_id in enumerate(data_ids)
+                if data_id is not None
+            },
+        }
+        index_path = self.data_root / index_path_of(self.pack_path)
+        tmp_path = index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, index_path)
+        print(
+            f"Packed {self.rows} rows of {list(self.shape)} into {self.pack_path}"
+            + (
+                f", skipped {self.skipped} images with other shapes"
+                if self.skipped
+                else ""
+            )
+        )
+        return self.pack_path
+
+
+class PackedDataset:
+    """只读打开打包文件, 行数据是内存映射上的视图"""
+
+    def __init__(self, data_root: Path, pack_path: str):
+        self.pack_path = pack_path
+        full_path = Path(data_root) / pack_path
+        self.array: np.ndarray = np.load(full_path, mmap_mode="r")
+        self._index_path = Path(data_root) / index_path_of(pack_path)
+        self._rows: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, rows: Any) -> np.ndarray:
+        result: np.ndarray = self.array[rows]
+        return result
+
+    @property
+    def rows(self) -> Dict[int, int]:
+        """data_id -> 行号, 首次使用时读取索引文件"""
+        if self._rows is None:
+            index = json.loads(self._index_path.read_text())
+            self._rows = {int(data_id): row for data_id, row in index["rows"].items()}
+        return self._rows
+
+    def batch(self, data_ids: Sequence[int]) -> np.ndarray:
+        """按 Data ID 读取一批行, 返回 [N, ...] 数组 (一次切片复制)"""
+        rows = [self.rows[data_id] for data_id in data_ids]
+        if rows and rows == list(range(rows[0], rows[0] + len(rows))):
+            return np.array(self.array[rows[0] : rows[0] + len(rows)])
+        return self.array[rows]
@@ -0,0 +1,83 @@
+# backend/app/core/workflow/result_writer.py
+
+import time
+from typing import Any, Dict, List, cast
+
+from sqlalchemy import insert
+from sqlmodel import Session, col
+
+from app.models.data import Data
+from app.models.workflow import ProcessedData
+
+# 默认每累积多少行或多少毫秒写入一次
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_INTERVAL_MS = 1000
+
+
+class ResultWriter:
+    """节点结果批量写入器
+
+    累积 Data / ProcessedData 行, 达到 flush_rows 行或距上次写入超过
+    flush_interval_ms 毫秒时, 用一条批量 INSERT ... RETURNING 写入并只提交一次。
+
+    写入只在 add() 时检查, 没有后台定时器: 空闲期间累积的行会留到下一次
+    add() 或调用方显式 flush() 时写入, 调用方结束时必须调用 flush()。
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        flush_rows: int = DEFAULT_FLUSH_ROWS,
+        flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+    ):
+        self.session = session
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_interval = max(flush_interval_ms, 0) / 1000
+        self.data_rows: List[Dict[str, Any]] = []
+        self.processed_rows: List[Dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+        self.total_rows = 0
+
+    def __len__(self) -> int:
+        return len(self.data_rows)
+
+    def add(self, data: Data, processed_data: ProcessedData) -> List[int]:
+        """加入一组待写入的记录, 若触发写入则返回本次写入的 Data ID 列表"""
+        self.data_rows.append(data.model_dump(exclude={"data_id"}))
+        self.processed_rows.append(processed_data.model_dump(exclude={"id"}))
+
+        if (
+            len(self.data_rows) >= self.flush_rows
+            or time.monotonic() - self.last_flush >= self.flush_interval
+        ):
+            return self.flush()
+        return []
+
+    def flush(self) -> List[int]:
+        """批量写入所有待写入记录并提交, 返回按加入顺序排列的 Data ID"""
+        self.last_flush = time.monotonic()
+        if not self.data_rows:
+            return []
+
+        try:
+            # 主键由数据库生成, RETURNING 不会返回 NULL
+            data_ids = cast(
+                List[int],
+                self.session.scalars(
+                    insert(Data).returning(
+                        col(Data.data_id), sort_by_parameter_order=True
+                    ),
+                    self.data_rows,
+                ).all(),
+            )
+            self.session.execute(insert(ProcessedData), self.processed_rows)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        self.total_rows += len(data_ids)
+        print(f"Flushed {len(data_ids)} result rows ({self.total_rows} total)")
+        self.data_rows = []
+        self.processed_rows = []
+        return data_ids
@@ -0,0 +1,461 @@
+# backend/app/core/workflow/scheduler.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.workflow.data_manager import WorkflowDataManager
+from app.core.workflow.db_session import open_workflow_session, run_db_uninterrupted
+from app.core.workflow.node_processors import NODE_PROCESSORS
+from app.core.workflow.node_processors.base_processor import DEFAULT_BATCH_SIZE
+from app.models.workflow import NodeStatus, WorkflowExecution, WorkflowNodeExecution
+
+
+def get_node_key(node_config: Dict[str, Any]) -> str:
+    """节点在图中的唯一标识, 优先使用 id, 兼容只有 name 的旧配置"""
+    return str(node_config.get("id") or node_config["name"])
+
+
+def build_graph(
+    config: Dict[str, Any],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """解析工作流配置, 返回 (节点配置, 每个节点的上游节点列表)"""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    aliases: Dict[str, str] = {}
+    for node_config in config.get("nodes", []):
+        key = get_node_key(node_config)
+        nodes[key] = node_config
+        aliases[key] = key
+        if node_config.get("name"):
+            aliases.setdefault(node_config["name"], key)
+
+    upstream: Dict[str, List[str]] = {key: [] for key in nodes}
+    for edge in config.get("edges", []):
+        source = aliases.get(edge["source"])
+        target = aliases.get(edge["target"])
+        if source is None or target is None:
+            raise ValueError(f"Edge references unknown node: {edge}")
+        if source not in upstream[target]:
+            upstream[target].append(source)
+    return nodes, upstream
+
+
+def topological_order(upstream: Dict[str, List[str]]) -> List[str]:
+    """Kahn 拓扑排序, 存在环时抛出 ValueError"""
+    in_degree = {key: len(sources) for key, sources in upstream.items()}
+    downstream: Dict[str, List[str]] = {key: [] for key in upstream}
+    for target, sources in upstream.items():
+        for source in sources:
+            downstream[source].append(target)
+
+    order = []
+    ready = [key for key, degree in in_degree.items() if degree == 0]
+    while ready:
+        key = ready.pop(0)
+        order.append(key)
+        for target in downstream[key]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                ready.append(target)
+
+    if len(order) != len(upstream):
+        cycle = [key for key, degree in in_degree.items() if degree > 0]
+        raise ValueError(f"Workflow graph contains a cycle: {cycle}")
+    return order
+
+
+def compute_critical_path(
+    upstream: Dict[str, List[str]], durations: Dict[str, float]
+) -> Tuple[List[str], float]:
+    """按节点耗时计算关键路径 (耗时最长的依赖链) 及其总耗时"""
+    longest: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for key in topological_order(upstream):
+        best_source = max(
+            (source for source in upstream[key] if source in longest),
+            key=lambda source: longest[source],
+            default=None,
+        )
+        previous[key] = best_source
+        longest[key] = durations.get(key, 0.0) + (
+            longest[best_source] if best_source else 0.0
+        )
+
+    if not longest:
+        return [], 0.0
+
+    end = max(longest, key=lambda key: longest[key])
+    path = [end]
+    source = previous[end]
+    while source:
+        path.append(source)
+        source = previous[source]
+    return list(reversed(path)), longest[end]
+
+
+def get_stream_queue_size(node_config: Dict[str, Any]) -> int:
+    """流水线中节点输入队列的容量, 与节点的 prefetch 参数一致"""
+    params = node_config.get("params") or {}
+    try:
+        size = int(
+            params.get("prefetch")
+            or int(params.get("batch_size") or DEFAULT_BATCH_SIZE) * 2
+        )
+    except (TypeError, ValueError):
+        size = DEFAULT_BATCH_SIZE * 2
+    return max(size, 1)
+
+
+class WorkflowScheduler:
+    """工作流 DAG 调度器
+
+    按拓扑顺序执行节点, 上游全部完成的节点立即启动, 因此互不依赖的分支并发运行;
+    每个节点使用独立的 Session (启用 WORKFLOW_ASYNC_DB 时为 AsyncSession, 数据库等待不阻塞
+    图像 I/O); 多个上游的输出合并为节点输入 (fan-in);
+    运行结束后输出每个节点的耗时和关键路径。
+
+    配置中 streaming 为 true 时启用流水线执行: 所有上游都支持流式的节点与上游同时启动,
+    图像经有界队列逐个传给下游, 各阶段重叠执行; 中间节点可通过 save_intermediate: false
+    跳过结果写入。流水线中任一节点失败时取消其余节点。
+    """
+
+    def __init__(
+        self,
+        execution_id: int,
+        config: Dict[str, Any],
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+        max_concurrency: Optional[int] = None,
+        async_db: Optional[bool] = None,
+    ):
+        self.execution_id = execution_id
+        self.nodes, self.upstream = build_graph(config)
+        self.order = topological_order(self.upstream)
+        self.session_factory = session_factory
+        # 节点处理器是否使用异步会话, 默认由 WORKFLOW_ASYNC_DB 配置
+        self.async_db = settings.WORKFLOW_ASYNC_DB if async_db is None else async_db
+        self.streaming = bool(config.get("streaming"))
+        # 流水线中的节点必须同时运行, 不限制并发
+        self.semaphore = asyncio.Semaphore(
+            (not self.streaming and max_concurrency) or len(self.nodes) or 1
+        )
+        self.outputs: Dict[str, List[int]] = {}
+        self.durations: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+        self.tasks: Dict[str, "asyncio.Task[List[int]]"] = {}
+        self.cancelled: Set[str] = set()
+        self.node_execution_ids: Dict[str, int] = {}
+
+        # 从上游队列读取输入的节点: 启用流式且自身和所有上游都支持流式
+        self.stream_consumers = {
+            key
+            for key, sources in self.upstream.items()
+            if self.streaming
+            and sources
+            and all(self.is_streamable(node) for node in [key, *sources])
+        }
+        self.streams: Dict[str, "asyncio.Queue[Any]"] = {}
+
+    def is_streamable(self, key: str) -> bool:
+        """节点处理器是否支持流水线执行"""
+        processor_class = NODE_PROCESSORS.get(self.nodes[key]["type"])
+        return bool(processor_class and processor_class.supports_streaming)
+
+    def get_output_streams(self, key: str) -> List["asyncio.Queue[Any]"]:
+        """节点需要写入的下游队列"""
+        return [
+            self.streams[target]
+            for target, sources in self.upstream.items()
+            if key in sources and target in self.stream_consumers
+        ]
+
+    def collect_inputs(self, key: str) -> List[int]:
+        """合并所有上游节点的输出 ID, 去重并保持顺序"""
+        input_data_ids: List[int] = []
+        seen = set()
+        for source in self.upstream[key]:
+            for data_id in self.outputs.get(source, []):
+                if data_id not in seen:
+                    seen.add(data_id)
+                    input_data_ids.append(data_id)
+        return input_data_ids
+
+    @asynccontextmanager
+    async def open_node_session(
+        self,
+    ) -> AsyncIterator[Tuple[Session, Optional[AsyncSession]]]:
+        """节点会话: 启用异步数据库时使用异步会话, 否则由 session_factory 创建"""
+        if self.async_db:
+            async with open_workflow_session(async_db=True) as sessions:
+                yield sessions
+        else:
+            with self.session_factory() as session:
+                yield session, None
+
+    async def run_node(self, key: str) -> List[int]:
+        """在独立 Session 中执行单个节点"""
+        node_config = self.nodes[key]
+        processor_class = NODE_PROCESSORS.get(node_config["type"])
+        if not processor_class:
+            raise ValueError(f"No processor found for node type: {node_config['type']}")
+
+        async with self.semaphore:
+            async with self.open_node_session() as (session, async_session):
+
+                def start_node() -> Tuple[int, WorkflowNodeExecution]:
+                    execution = session.get(WorkflowExecution, self.execution_id)
+                    if not execution or execution.project_id is None:
+                        raise ValueError(f"Execution {self.execution_id} not found")
+                    # 沿用提交执行时创建的待执行记录 (单节点执行时已写入输入数据)
+                    node_execution = session.exec(
+                        select(WorkflowNodeExecution).where(
+                            WorkflowNodeExecution.execution_id == self.execution_id,
+                            WorkflowNodeExecution.node_id == key,
+                            WorkflowNodeExecution.status == NodeStatus.PENDING,
+                        )
+                    ).first()
+                    if node_execution is None:
+                        node_execution = WorkflowNodeExecution(
+                            execution_id=self.execution_id,
+                            node_id=key,
+                            node_type=node_config["type"],
+                        )
+                    if node_execution.id is None or self.upstream[key]:
+                        node_execution.input_data_ids = self.collect_inputs(key)
+                    node_execution.config = node_config
+                    node_execution.status = NodeStatus.PROCESSING
+                    node_execution.started_at = datetime.now(timezone.utc)
+                    session.add(node_execution)
+                    session.commit()
+                    if node_execution.id is None:
+                        raise ValueError(f"Failed to create execution record for {key}")
+                    self.node_execution_ids[key] = node_execution.id
+                    return execution.project_id, node_execution
+
+                def finish_node(
+                    node_execution: WorkflowNodeExecution,
+                    status: NodeStatus,
+                    output_data_ids: Optional[List[int]] = None,
+                    error_message: Optional[str] = None,
+                ) -> None:
+                    if status == NodeStatus.FAILED:
+                        session.rollback()
+                    node_execution.status = status
+                    if output_data_ids is not None:
+                        node_execution.output_data_ids = output_data_ids
+                    node_execution.error_message = error_message
+                    node_execution.completed_at = datetime.now(timezone.utc)
+                    session.add(node_execution)
+                    session.commit()
+
+                project_id, node_execution = await run_db_uninterrupted(
+                    async_session, start_node
+                )
+
+                print(f"\n[scheduler] Start node {key} ({node_config['type']})")
+                started = time.monotonic()
+                try:
+                    data_manager = await WorkflowDataManager.create(
+                        project_id, self.execution_id, session, async_session
+                    )
+                    processor = processor_class(node_execution, session, data_manager)
+                    if self.streaming:
+                        processor.connect_streams(
+                            input_stream=self.streams.get(key),
+                            input_stream_sources=len(self.upstream[key]),
+                            output_streams=self.get_output_streams(key),
+                        )
+                    output_data_ids = await processor.process()
+                except (Exception, asyncio.CancelledError) as e:
+                    await run_db_uninterrupted(
+                        async_session,
+                        finish_node,
+                        node_execution,
+                        NodeStatus.FAILED,
+                        error_message=str(e) or type(e).__name__,
+                        redeliver_cancel=False,
+                    )
+                    raise
+                finally:
+                    self.durations[key] = time.monotonic() - started
+
+                await run_db_uninterrupted(
+                    async_session,
+                    finish_node,
+                    node_execution,
+                    NodeStatus.COMPLETED,
+                    output_data_ids=output_data_ids,
+                )
+                print(
+                    f"[scheduler] Node {key} completed in {self.durations[key]:.2f}s "
+                    f"with {len(output_data_ids)} outputs"
+                )
+                return output_data_ids
+
+    def record_stream_inputs(self, key: str) -> None:
+        """流式节点的输入在上游全部完成后才确定, 补写到节点执行记录"""
+        with self.session_factory() as session:
+            node_execution = session.get(
+                WorkflowNodeExecution, self.node_execution_ids[key]
+            )
+            if node_execution is None:
+                return
+            node_execution.input_data_ids = self.collect_inputs(key)
+            session.add(node_execution)
+            session.commit()
+
+    def cancel_running(self, reason: str) -> None:
+        """流水线中有节点失败时取消其余节点, 避免它们在队列上永久等待"""
+        current = asyncio.current_task()
+        for key, task in self.tasks.items():
+            if task is not current and not task.done() and key not in self.cancelled:
+                # 每个节点只取消一次, 避免打断节点记录失败状态的数据库操作
+                self.cancelled.add(key)
+                print(f"[scheduler] Cancel node {key}: {reason}")
+                task.cancel()
+
+    def mark_skipped(self, key: str, reason: str) -> None:
+        """上游失败时记录被跳过的节点"""
+        node_config = self.nodes[key]
+        with self.session_factory() as session:
+            session.add(
+                WorkflowNodeExecution(
+                    execution_id=self.execution_id,
+                    node_id=key,
+                    node_type=node_config["type"],
+                    config=node_config,
+                    status=NodeStatus.SKIPPED,
+                    error_message=reason,
+                )
+            )
+            session.commit()
+
+    async def run(self) -> Dict[str, Any]:
+        """执行整个 DAG, 返回各节点输出、耗时和关键路径"""
+        tasks = self.tasks
+        self.streams = {
+            key: asyncio.Queue(maxsize=get_stream_queue_size(self.nodes[key]))
+            for key in self.stream_consumers
+        }
+
+        async def run_when_ready(key: str) -> List[int]:
+            if key in self.stream_consumers:
+                # 从上游队列读取输入, 与上游同时启动
+                try:
+                    self.outputs[key] = await self.run_node(key)
+                except (Exception, asyncio.CancelledError) as e:
+                    self.failed[key] = str(e) or type(e).__name__
+                    self.cancel_running(f"node {key} failed")
+                    raise
+                await asyncio.gather(
+                    *[tasks[source] for source in self.upstream[key]],
+                    return_exceptions=True,
+                )
+                self.record_stream_inputs(key)
+                return self.outputs[key]
+
+            # 等待所有上游节点完成
+            try:
+                results = await asyncio.gather(
+                    *[tasks[source] for source in self.upstream[key]],
+                    return_exceptions=True,
+                )
+            except asyncio.CancelledError:
+                self.mark_skipped(key, "Cancelled")
+                raise
+            failed_sources = [
+                source
+                for source, result in zip(self.upstream[key], results, strict=True)
+                if isinstance(result, BaseException)
+            ]
+            if failed_sources:
+                reason = f"Upstream node failed: {', '.join(failed_sources)}"
+                self.mark_skipped(key, reason)
+                raise RuntimeError(reason)
+
+            try:
+                self.outputs[key] = await self.run_node(key)
+            except (Exception, asyncio.CancelledError) as e:
+                self.failed[key] = str(e) or type(e).__name__
+                if self.streaming:
+                    self.cancel_running(f"node {key} failed")
+                raise
+            return self.outputs[key]
+
+        started = time.monotonic()
+        for key in self.order:
+            tasks[key] = asyncio.create_task(run_when_ready(key))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        wall_time = time.monotonic() - started
+
+        critical_path, critical_path_time = compute_critical_path(
+            self.upstream, self.durations
+        )
+        report = {
+            "outputs": self.outputs,
+            "timings": self.durations,
+            "failed": self.failed,
+            "wall_time": wall_time,
+            "critical_path": critical_path,
+            "critical_path_time": critical_path_time,
+        }
+        print(
+            f"[scheduler] Execution {self.execution_id} finished in {wall_time:.2f}s, "
+            f"critical path: {' -> '.join(critical_path)} ({critical_path_time:.2f}s)"
+        )
+        return report
+
+
+async def run_workflow_execution(
+    execution_id: int,
+    session_factory: Callable[[], Session] = lambda: Session(engine),
+) -> Dict[str, Any]:
+    """用 DAG 调度器执行一次工作流, 并更新执行记录状态"""
+    with session_factory() as session:
+        execution = session.get(WorkflowExecution, execution_id)
+        if not execution:
+            raise ValueError(f"Execution {execution_id} not found")
+        config = execution.config or {}
+        execution.status = "running"
+        session.add(execution)
+        session.commit()
+
+    report: Dict[str, Any] = {}
+    error_message = None
+    cancelled = False
+    try:
+        scheduler = WorkflowScheduler(execution_id, config, session_factory)
+        report = await scheduler.run()
+        if report["failed"]:
+            error_message = "; ".join(
+                f"{key}: {error}" for key, error in report["failed"].items()
+            )
+    except asyncio.CancelledError:
+        print(f"Workflow execution {execution_id} cancelled")
+        cancelled = True
+        error_message = "Cancelled"
+    except Exception as e:
+        print(f"Workflow execution error: {str(e)}")
+        error_message = str(e)
+
+    with session_factory() as session:
+        execution = session.get(WorkflowExecution, execution_id)
+        if execution:
+            if cancelled:
+                execution.status = "cancelled"
+            else:
+                execution.status = "failed" if error_message else "completed"
+            execution.error_message = error_message
+            execution.completed_at = datetime.now(timezone.utc)
+            session.add(execution)
+            session.commit()
+
+    if cancelled:
+        raise asyncio.CancelledError()
+    return report
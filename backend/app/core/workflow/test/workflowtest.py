@@ -1,7 +1,7 @@
 import sys
 
 sys.path.append("./")
-from app.api.routes.workflows import execute_workflow_async
+from app.core.workflow.scheduler import run_workflow_execution
 from sqlmodel import Session, create_engine, select
 from app.models.workflow import Workflow, WorkflowExecution
 from app.models.project import Project
@@ -85,8 +85,9 @@ async def test_workflow():
         session.commit()
         print(f"Created execution with ID: {execution.execution_id}")
 
-        await execute_workflow_async(execution.execution_id, session)
+        await run_workflow_execution(execution.execution_id, lambda: Session(engine))
 
+        session.expire_all()
         execution = session.get(WorkflowExecution, execution.execution_id)
         print(f"\nExecution status: {execution.status}")
 
@@ -0,0 +1,215 @@
+# backend/app/core/workflow/thumbnail_store.py
+
+import asyncio
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.workflow.image_io import get_image_executor
+
+# 缩略图缓存目录 (相对于项目目录, 不在 data/ 下, 不会被导入或文件回收扫描到)
+THUMBNAIL_CACHE_DIR = os.path.join(".cache", "thumbnails")
+# 金字塔各级的长边像素, 请求的尺寸向上取到最近的一级
+PYRAMID_LEVELS = (64, 128, 256, 512, 1024)
+THUMBNAIL_EXT = ".jpg"
+THUMBNAIL_QUALITY = 85
+# 超出缓存上限时删除到上限的这个比例, 避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+# JPEG 可以在解码时按 1/2, 1/4, 1/8 缩小 (DCT 缩放), 只解码需要的分辨率
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def get_pyramid_level(size: int) -> int:
+    """请求尺寸对应的金字塔级别"""
+    for level in PYRAMID_LEVELS:
+        if size <= level:
+            return level
+    return PYRAMID_LEVELS[-1]
+
+
+def thumbnail_key(source_path: str, stat_result: os.stat_result, level: int) -> str:
+    """缓存键包含源文件的修改时间和大小, 源文件变化后自动失效"""
+    return hashlib.sha1(
+        f"{source_path}:{stat_result.st_mtime_ns}:{stat_result.st_size}:{level}".encode()
+    ).hexdigest()
+
+
+def decode_for_level(source_path: str, level: int) -> Optional[np.ndarray]:
+    """解码足够生成指定级别缩略图的最小分辨率"""
+    if Path(source_path).suffix.lower() not in (".jpg", ".jpeg"):
+        return cv2.imread(source_path, cv2.IMREAD_COLOR)
+
+    img = cv2.imread(source_path, _REDUCED_FLAGS[8])
+    if img is None:
+        return None
+    long_side = max(img.shape[:2]) * 8
+    for factor in (8, 4, 2):
+        if long_side // factor >= level:
+            return (
+                img if factor == 8 else cv2.imread(source_path, _REDUCED_FLAGS[factor])
+            )
+    return cv2.imread(source_path, cv2.IMREAD_COLOR)
+
+
+def render_thumbnail(source_path: str, target_path: str, level: int) -> int:
+    """生成缩略图并原子写入, 返回文件大小 (在执行器中运行)"""
+    img = decode_for_level(source_path, level)
+    if img is None:
+        raise OSError(f"Failed to read image: {source_path}")
+
+    height, width = img.shape[:2]
+    scale = level / max(height, width)
+    if scale < 1:
+        img = cv2.resize(
+            img,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    success, buffer = cv2.imencode(
+        THUMBNAIL_EXT, img, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]
+    )
+    if not success:
+        raise OSError(f"Failed to encode thumbnail: {source_path}")
+
+    Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.tobytes())
+    os.replace(tmp_path, target_path)
+    return len(buffer)
+
+
+class ThumbnailCache:
+    """项目目录下基于磁盘的缩略图 LRU 缓存
+
+    缩略图文件的修改时间记录最近一次访问, 总大小超过 max_bytes 时删除最久未访问的文件。
+    """
+
+    def __init__(self, data_dir: str, max_bytes: int):
+        self.root = Path(data_dir) / THUMBNAIL_CACHE_DIR
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        # 正在生成的缩略图, 同一缩略图的并发请求只生成一次
+        self._pending: Dict[str, "asyncio.Future[int]"] = {}
+
+    def path_for(self, key: str, level: int) -> Path:
+        return self.root / str(level) / key[:2] / f"{key}{THUMBNAIL_EXT}"
+
+    def list_files(self) -> List[Tuple[float, int, Path]]:
+        """缓存中的文件: (最近访问时间, 大小, 路径)"""
+        files = []
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(THUMBNAIL_EXT):
+                    continue
+                path = Path(root, name)
+                try:
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat_result.st_mtime, stat_result.st_size, path))
+        return files
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self.list_files())
+            return self._size
+
+    def touch(self, path: Path) -> None:
+        """记录访问时间"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def add(self, path: Path, file_size: int) -> None:
+        """记录新写入的文件, 超出上限时淘汰最久未访问的文件 (不淘汰刚写入的文件); 阻塞操作"""
+        with self._lock:
+            if self._size is None:
+                # 首次使用时扫描目录, 结果已包含刚写入的文件
+                self._size = sum(size for _, size, _ in self.list_files())
+            else:
+                self._size += file_size
+            if self._size <= self.max_bytes:
+                return
+            self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        files = sorted(self.list_files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        print(f"Thumbnail cache evicted {removed} files ({total} bytes kept)")
+
+    async def get(self, source_path: str, size: int) -> Tuple[Path, str]:
+        """返回 (缩略图路径, 缓存键), 缓存未命中时在共享执行器中生成"""
+        stat_result = os.stat(source_path)
+        level = get_pyramid_level(size)
+        key = thumbnail_key(source_path, stat_result, level)
+        path = self.path_for(key, level)
+        if path.exists():
+            self.touch(path)
+            return path, key
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                get_image_executor(), render_thumbnail, source_path, str(path), level
+            )
+            self._pending[key] = future
+            future.add_done_callback(lambda f: self._finish(key, path, f))
+        await asyncio.shield(future)
+        return path, key
+
+    def _finish(self, key: str, path: Path, future: "asyncio.Future[int]") -> None:
+        """生成完成的回调 (在事件循环中运行)
+
+        大小统计和淘汰会遍历缓存目录 (首次统计和超出上限时), 放到默认线程池中执行,
+        不阻塞事件循环。
+        """
+        self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            asyncio.get_running_loop().run_in_executor(
+                None, self.add, path, future.result()
+            )
+
+
+_caches: Dict[str, ThumbnailCache] = {}
+
+
+def get_thumbnail_cache(data_dir: str) -> ThumbnailCache:
+    """每个项目目录一个缓存实例"""
+    cache = _caches.get(data_dir)
+    if cache is None:
+        cache = _caches.setdefault(
+            data_dir, ThumbnailCache(data_dir, settings.THUMBNAIL_CACHE_MAX_BYTES)
+        )
+    return cache
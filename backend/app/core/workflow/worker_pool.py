@@ -0,0 +1,215 @@
+# backend/app/core/workflow/worker_pool.py
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import traceback
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event
+from typing import List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.workflow.file_gc import shutdown_file_gc
+from app.core.workflow.image_cache import shutdown_image_cache
+from app.core.workflow.image_io import shutdown_image_executor
+from app.core.workflow.job_queue import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    claim_next_job,
+    finish_job,
+    heartbeat,
+    release_job,
+    requeue_stale_jobs,
+)
+from app.core.workflow.scheduler import run_workflow_execution
+from app.models.workflow import WorkflowExecution
+
+
+async def run_job(
+    job_id: int, execution_id: int, stop_event: Event, poll_interval: float
+) -> None:
+    """在当前进程中执行一个任务, 定期更新心跳并响应取消和退出请求"""
+    task = asyncio.create_task(run_workflow_execution(execution_id))
+    released = False
+    while not task.done():
+        done, _ = await asyncio.wait({task}, timeout=poll_interval)
+        if done:
+            break
+        try:
+            with Session(engine) as session:
+                cancel_requested = heartbeat(session, job_id)
+        except Exception as e:
+            print(f"Error updating heartbeat for job {job_id}: {str(e)}")
+            continue
+        if cancel_requested:
+            print(f"Cancelling job {job_id} (execution {execution_id})")
+            task.cancel()
+        elif stop_event.is_set():
+            # worker 退出: 中断执行并退回队列, 由其他 worker 重新执行
+            print(f"Worker stopping, requeue job {job_id}")
+            released = True
+            task.cancel()
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        print(f"Job {job_id} failed: {str(e)}")
+        traceback.print_exc()
+
+    with Session(engine) as session:
+        if released:
+            release_job(session, job_id)
+            return
+        execution = session.get(WorkflowExecution, execution_id)
+        status = execution.status if execution else "failed"
+        if status == "completed":
+            finish_job(session, job_id, JOB_COMPLETED)
+        elif status == "cancelled":
+            finish_job(session, job_id, JOB_CANCELLED)
+        else:
+            finish_job(
+                session,
+                job_id,
+                JOB_FAILED,
+                execution.error_message if execution else "Execution not found",
+            )
+
+
+def worker_main(
+    worker_id: str,
+    stop_event: Event,
+    poll_interval: float,
+    project_concurrency: int,
+    stale_seconds: int,
+) -> None:
+    """worker 进程入口: 循环领取并执行任务, 直到收到退出信号"""
+    # 退出由 stop_event 控制, 忽略终端发给整个进程组的 Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    print(f"[worker {worker_id}] started (pid {os.getpid()})")
+
+    while not stop_event.is_set():
+        job_id: Optional[int] = None
+        execution_id: Optional[int] = None
+        try:
+            with Session(engine) as session:
+                requeue_stale_jobs(session, stale_seconds)
+                job = claim_next_job(session, worker_id, project_concurrency)
+                if job:
+                    job_id, execution_id = job.job_id, job.execution_id
+        except Exception as e:
+            print(f"[worker {worker_id}] Error claiming job: {str(e)}")
+            traceback.print_exc()
+
+        if job_id is None or execution_id is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        print(f"[worker {worker_id}] Running job {job_id} (execution {execution_id})")
+        asyncio.run(run_job(job_id, execution_id, stop_event, poll_interval))
+
+    shutdown_image_executor()
+    shutdown_image_cache()
+    shutdown_file_gc()
+    print(f"[worker {worker_id}] stopped")
+
+
+class WorkerPool:
+    """工作流执行进程池
+
+    每个 worker 是独立进程, 通过数据库中的 workflow_job 表领取任务, 因此不需要外部消息队列,
+    计算任务也不会占用 Web 进程; 同一项目同时运行的任务数不超过 project_concurrency。
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        project_concurrency: Optional[int] = None,
+        stale_seconds: Optional[int] = None,
+    ):
+        self.size = settings.WORKFLOW_WORKERS if size is None else size
+        self.poll_interval = poll_interval or settings.WORKFLOW_JOB_POLL_INTERVAL
+        self.project_concurrency = max(
+            project_concurrency or settings.WORKFLOW_PROJECT_CONCURRENCY, 1
+        )
+        self.stale_seconds = stale_seconds or settings.WORKFLOW_JOB_STALE_SECONDS
+        # spawn: 不继承父进程的事件循环、线程池和数据库连接
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes: List[BaseProcess] = []
+
+    def start(self) -> None:
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for index in range(self.size):
+            process = self._context.Process(
+                target=worker_main,
+                args=(
+                    f"{prefix}-{index}",
+                    self._stop_event,
+                    self.poll_interval,
+                    self.project_concurrency,
+                    self.stale_seconds,
+                ),
+                name=f"workflow-worker-{index}",
+            )
+            process.start()
+            self._processes.append(process)
+        print(f"Started workflow worker pool: {self.size} workers")
+
+    def join(self) -> None:
+        """等待所有 worker 退出"""
+        for process in self._processes:
+            process.join()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """通知 worker 退出, 运行中的任务被中断并退回队列; 超时后强制结束"""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                print(f"Terminating workflow worker {process.name}")
+                process.terminate()
+                process.join()
+        self._processes = []
+        print("Workflow worker pool stopped")
+
+
+_worker_pool: Optional[WorkerPool] = None
+
+
+def start_worker_pool() -> Optional[WorkerPool]:
+    """在 Web 应用中启动进程池 (WORKFLOW_WORKERS 为 0 时不启动)"""
+    global _worker_pool
+    if _worker_pool is None and settings.WORKFLOW_WORKERS > 0:
+        _worker_pool = WorkerPool()
+        _worker_pool.start()
+    return _worker_pool
+
+
+def stop_worker_pool() -> None:
+    """停止进程池"""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.stop()
+        _worker_pool = None
+
+
+if __name__ == "__main__":
+    # 独立运行: python -m app.core.workflow.worker_pool
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    pool = WorkerPool(size=settings.WORKFLOW_WORKERS or 1)
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
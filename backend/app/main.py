@@ -9,6 +9,11 @@ from starlette.middleware.cors import CORSMiddleware
 from app.api.api_main import api_router
 from app.core.config import settings
 from app.core.db import engine, init_db
+from app.core.workflow.file_gc import shutdown_file_gc
+from app.core.workflow.image_cache import shutdown_image_cache
+from app.core.workflow.image_io import shutdown_image_executor
+from app.core.workflow.worker_pool import start_worker_pool, stop_worker_pool
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -24,8 +29,14 @@ async def lifespan(app: FastAPI):
     # Startup
     with Session(engine) as session:
         init_db(session)
+    if settings.WORKFLOW_WORKER_POOL_IN_APP:
+        start_worker_pool()
     yield
     # Shutdown
+    stop_worker_pool()
+    shutdown_image_executor()
+    shutdown_image_cache()
+    shutdown_file_gc()
 
 
 app = FastAPI(
@@ -44,6 +55,7 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
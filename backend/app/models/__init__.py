@@ -5,4 +5,4 @@ from .data import Data
 from .label import Label
 from .project import Project
 from .task import Task
-from .workflow import Workflow, WorkflowExecution
\ No newline at end of file
+from .workflow import Workflow, WorkflowExecution, WorkflowJob
\ No newline at end of file
@@ -4,6 +4,7 @@ from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Optional
 
 from pydantic import field_validator
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -46,7 +47,10 @@ class AnnotationCreate(AnnotationBase):
 
 class Annotation(AnnotationBase, table=True):
     __tablename__ = "annotation"
-    __table_args__ = {"comment": "Stores all annotations"}
+    __table_args__ = (
+        Index("ix_annotation_data_stage", "data_id", "processing_stage"),
+        {"comment": "Stores all annotations"},
+    )
 
     annotation_id: Optional[int] = Field(default=None, primary_key=True)
     created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
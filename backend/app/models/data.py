@@ -3,7 +3,7 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, List, Optional, Dict
 from app.models.workflow import WorkflowExecution, WorkflowNodeExecution
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -21,7 +21,21 @@ class DataBase(SQLModel):
 
 class Data(DataBase, table=True):
     __tablename__ = "data"
-    __table_args__ = {"comment": "Stores all data files"}
+    __table_args__ = (
+        # 按项目/执行的阶段查询, data_id 在末尾以支持游标分页
+        Index("ix_data_project_stage", "project_id", "processing_stage", "data_id"),
+        Index(
+            "ix_data_execution_stage",
+            "workflow_execution_id",
+            "processing_stage",
+            "data_id",
+        ),
+        Index("ix_data_node_execution_id", "node_execution_id"),
+        Index("ix_data_path_project_stage", "path", "project_id", "processing_stage"),
+        # 按内容哈希查找项目中的重复图片
+        Index("ix_data_project_content_hash", "project_id", "content_hash"),
+        {"comment": "Stores all data files"},
+    )
 
     data_id: Optional[int] = Field(default=None, primary_key=True)
     original_data_id: Optional[int] = Field(default=None, foreign_key="data.data_id")
@@ -36,6 +50,8 @@ class Data(DataBase, table=True):
     processing_stage: str = Field(default="original")
     category: Optional[str] = None
     metadata_: Dict = Field(default={}, sa_type=JSON)
+    # 文件内容的 sha256, 上传/导入时计算, 用于去重
+    content_hash: Optional[str] = Field(default=None, max_length=64)
 
     created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     modified: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -40,6 +40,8 @@ class Project(ProjectBase, table=True):
         default={}, sa_type=JSON, nullable=True
     )  # 当前工作流配置
     workflow_version: Optional[int] = Field(default=1, nullable=True)  # 工作流版本
+    # 数据被删除或路径变化时递增, 各进程据此判断路径缓存是否过期
+    data_generation: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     workflow_executions: List["WorkflowExecution"] = Relationship(
         back_populates="project"
     )
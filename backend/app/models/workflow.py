@@ -2,6 +2,7 @@
 
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, List, Optional, Dict
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship, SQLModel, JSON
 from enum import Enum
 
@@ -42,6 +43,10 @@ class ProcessedData(SQLModel, table=True):
     """处理后的数据"""
 
     __tablename__ = "processed_data"
+    __table_args__ = (
+        Index("ix_processed_data_original_data_id", "original_data_id"),
+        Index("ix_processed_data_node_execution_id", "node_execution_id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     original_data_id: Optional[int] = Field(
@@ -66,6 +71,9 @@ class WorkflowNodeExecution(SQLModel, table=True):
     """工作流节点执行记录"""
 
     __tablename__ = "workflow_node_execution"
+    __table_args__ = (
+        Index("ix_workflow_node_execution_lookup", "execution_id", "node_id", "status"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     execution_id: int = Field(foreign_key="workflow_execution.execution_id")
@@ -117,6 +125,42 @@ class WorkflowExecution(SQLModel, table=True):
             "cascade": "all, delete-orphan"
         }
     )
+    jobs: List["WorkflowJob"] = Relationship(
+        back_populates="execution",
+        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+    )
+
+
+class WorkflowJob(SQLModel, table=True):
+    """工作流执行任务 (由 worker 进程从队列中领取执行)"""
+
+    __tablename__ = "workflow_job"
+    __table_args__ = (
+        # 部分索引: 只索引排队中的任务, 领取任务时按 job_id 顺序扫描
+        Index(
+            "ix_workflow_job_queued",
+            "job_id",
+            postgresql_where=text("status = 'queued'"),
+            sqlite_where=text("status = 'queued'"),
+        ),
+    )
+
+    job_id: Optional[int] = Field(default=None, primary_key=True)
+    execution_id: int = Field(foreign_key="workflow_execution.execution_id", index=True)
+    project_id: Optional[int] = Field(
+        default=None, foreign_key="project.project_id", nullable=True, index=True
+    )
+    status: str = Field(default="queued", index=True)
+    worker_id: Optional[str] = None
+    attempts: int = Field(default=0)
+    cancel_requested: bool = Field(default=False)
+    error_message: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    execution: WorkflowExecution = Relationship(back_populates="jobs")
 
 
 class WorkflowNodeConfig(SQLModel):
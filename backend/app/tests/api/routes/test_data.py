@@ -0,0 +1,149 @@
+import os
+from email.utils import formatdate
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models.data import Data
+from app.models.project import Project
+from app.models.task import Task
+from app.tests.utils.images import write_original_images
+
+
+@pytest.fixture
+def data(db: Session, project: Project) -> Data:
+    (path,) = write_original_images(project.data_dir, 1)
+    task = Task(project_id=project.project_id)
+    db.add(task)
+    db.commit()
+    data = Data(path=path, task_id=task.task_id, project_id=project.project_id)
+    db.add(data)
+    db.commit()
+    db.refresh(data)
+    return data
+
+
+@pytest.fixture
+def content(project: Project, data: Data) -> bytes:
+    with open(os.path.join(project.data_dir, "data", data.path), "rb") as f:
+        return f.read()
+
+
+def test_image_etag_and_conditional_requests(
+    client: TestClient, data: Data, content: bytes
+) -> None:
+    url = f"/data/{data.data_id}/image"
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'"other", W/{etag}'},
+        {"If-None-Match": "*"},
+        {"If-Modified-Since": last_modified},
+    ):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 304, headers
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    # If-None-Match 优先于 If-Modified-Since
+    response = client.get(
+        url, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+    response = client.get(
+        url, headers={"If-Modified-Since": formatdate(0, usegmt=True)}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "range_header, start, end",
+    [
+        ("bytes=0-9", 0, 9),
+        ("bytes=10-", 10, None),
+        ("bytes=-16", -16, None),
+        ("bytes=5-100000", 5, None),
+    ],
+)
+def test_image_range(
+    client: TestClient,
+    data: Data,
+    content: bytes,
+    range_header: str,
+    start: int,
+    end: int | None,
+) -> None:
+    response = client.get(
+        f"/data/{data.data_id}/image", headers={"Range": range_header}
+    )
+
+    expected = content[start : None if end is None else end + 1]
+    first = start % len(content)
+    assert response.status_code == 206
+    assert response.content == expected
+    assert response.headers["content-length"] == str(len(expected))
+    assert response.headers["content-range"] == (
+        f"bytes {first}-{first + len(expected) - 1}/{len(content)}"
+    )
+
+
+def test_image_range_not_satisfiable(
+    client: TestClient, data: Data, content: bytes
+) -> None:
+    response = client.get(
+        f"/data/{data.data_id}/image", headers={"Range": f"bytes={len(content)}-"}
+    )
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        # 不支持多个范围, 返回完整文件
+        {"Range": "bytes=0-1,4-5"},
+        # If-Range 与当前 ETag 不一致时忽略 Range
+        {"Range": "bytes=0-9", "If-Range": '"stale"'},
+    ],
+)
+def test_image_range_falls_back_to_full_file(
+    client: TestClient, data: Data, content: bytes, headers: dict[str, str]
+) -> None:
+    response = client.get(f"/data/{data.data_id}/image", headers=headers)
+
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_thumbnail_etag_does_not_touch_cache(
+    client: TestClient, project: Project, data: Data
+) -> None:
+    url = f"/data/{data.data_id}/thumbnail?size=100"
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+
+    # 条件请求只比较源文件计算的 ETag, 缓存被清空也返回 304
+    cache_dir = os.path.join(project.data_dir, ".cache")
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            os.remove(os.path.join(root, name))
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # 不同金字塔级别的 ETag 不同
+    other = client.get(f"/data/{data.data_id}/thumbnail?size=300")
+    assert other.status_code == 200
+    assert other.headers["etag"] != etag
@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from starlette.datastructures import Headers
+
+from app.api.routes.projects import import_dataset
+from app.models.data import Data
+from app.models.project import Project
+from app.models.task import Task
+from app.tests.utils.images import write_original_images
+from app.utils import pagination
+from app.utils import upload as upload_module
+from app.utils.pagination import NEXT_CURSOR_HEADER, resolve_fields
+from app.utils.upload import ChunkedUpload
+
+
+@pytest.fixture
+def data_ids(db: Session, project: Project) -> list[int]:
+    task = Task(project_id=project.project_id)
+    db.add(task)
+    db.commit()
+    datas = [
+        Data(
+            path=f"original/img{i}.jpg",
+            task_id=task.task_id,
+            project_id=project.project_id,
+            processing_stage="original" if i % 3 else "det",
+            metadata_={"index": i},
+        )
+        for i in range(10)
+    ]
+    db.add_all(datas)
+    db.commit()
+    return [data.data_id for data in datas]  # type: ignore[misc]
+
+
+def read_all(client: TestClient, url: str) -> tuple[list[dict[str, Any]], list[str]]:
+    """按响应头中的游标读完所有页, 返回 (全部行, 各页游标)"""
+    items: list[dict[str, Any]] = []
+    cursors: list[str] = []
+    cursor = None
+    while True:
+        params: dict[str, str] = {} if cursor is None else {"cursor": cursor}
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        items.extend(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return items, cursors
+        cursors.append(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 10, 11])
+def test_keyset_pages_cover_all_rows(
+    client: TestClient, project: Project, data_ids: list[int], limit: int
+) -> None:
+    items, cursors = read_all(
+        client, f"/projects/{project.project_id}/data?limit={limit}"
+    )
+
+    assert [item["data_id"] for item in items] == data_ids
+    # 游标是每页最后一行的 data_id, 最后一页没有游标
+    expected_pages = -(-len(data_ids) // limit)
+    assert cursors == [
+        str(data_ids[page * limit - 1]) for page in range(1, expected_pages)
+    ]
+
+
+def test_keyset_page_with_filters_and_fields(
+    client: TestClient, project: Project, data_ids: list[int]
+) -> None:
+    items, cursors = read_all(
+        client,
+        f"/projects/{project.project_id}/data?stage=original&limit=2&fields=path",
+    )
+
+    expected = [data_id for i, data_id in enumerate(data_ids) if i % 3]
+    assert items == [{"path": f"original/img{data_ids.index(d)}.jpg"} for d in expected]
+    assert len(cursors) == 2
+
+
+def test_cursor_past_end_returns_empty_page(
+    client: TestClient, project: Project, data_ids: list[int]
+) -> None:
+    response = client.get(
+        f"/projects/{project.project_id}/data", params={"cursor": data_ids[-1]}
+    )
+
+    assert response.json() == []
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_without_limit_or_cursor_returns_all_rows(
+    client: TestClient,
+    project: Project,
+    data_ids: list[int],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_LIMIT", 3)
+
+    response = client.get(f"/projects/{project.project_id}/data")
+
+    assert [item["data_id"] for item in response.json()] == data_ids
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_cursor_without_limit_uses_default_page_size(
+    client: TestClient,
+    project: Project,
+    data_ids: list[int],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_LIMIT", 3)
+
+    response = client.get(
+        f"/projects/{project.project_id}/data", params={"cursor": data_ids[0]}
+    )
+
+    assert [item["data_id"] for item in response.json()] == data_ids[1:4]
+    assert response.headers[NEXT_CURSOR_HEADER] == str(data_ids[3])
+
+
+def test_resolve_fields() -> None:
+    assert resolve_fields(Data, None, ["data_id", "path"]) == ["data_id", "path"]
+    assert resolve_fields(Data, "path, data_id") == ["path", "data_id"]
+    assert resolve_fields(Data, "-metadata_", ["data_id", "metadata_"]) == ["data_id"]
+    assert "metadata_" not in resolve_fields(Data, "-metadata_,-path")
+
+    with pytest.raises(HTTPException) as exc:
+        resolve_fields(Data, "data_id,nope,-missing")
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Unknown fields: nope, missing"
+
+
+def test_unknown_field_returns_400(client: TestClient, project: Project) -> None:
+    response = client.get(f"/projects/{project.project_id}/data?fields=nope")
+
+    assert response.status_code == 400
+
+
+def create_upload(client: TestClient, project: Project, size: int | None = None) -> str:
+    response = client.post(
+        f"/projects/{project.project_id}/uploads",
+        json={"filename": "big.png", "size": size},
+    )
+    assert response.status_code == 200, response.text
+    upload_id: str = response.json()["upload_id"]
+    return upload_id
+
+
+def put_chunk(
+    client: TestClient, project: Project, upload_id: str, offset: int, body: bytes
+) -> tuple[int, dict[str, Any]]:
+    response = client.put(
+        f"/projects/{project.project_id}/uploads/{upload_id}",
+        params={"offset": offset},
+        content=body,
+    )
+    return response.status_code, response.json()
+
+
+def test_chunked_upload_hashes_incrementally(
+    client: TestClient, project: Project
+) -> None:
+    content = os.urandom(3000)
+    upload_id = create_upload(client, project, size=len(content))
+
+    assert put_chunk(client, project, upload_id, 0, content[:1000])[0] == 200
+    # offset 不等于已接收的字节数
+    status, body = put_chunk(client, project, upload_id, 500, content[1000:2000])
+    assert (status, body["detail"]) == (409, "Offset mismatch, expected 1000")
+    assert put_chunk(client, project, upload_id, 1000, content[1000:2000])[0] == 200
+    # 超出声明的大小时回退本次写入, 摘要也回到写入前
+    status, _ = put_chunk(client, project, upload_id, 2000, content[2000:] + b"x")
+    assert status == 400
+    assert put_chunk(client, project, upload_id, 2000, content[2000:]) == (
+        200,
+        {"upload_id": upload_id, "offset": len(content)},
+    )
+
+    # 完成时直接使用增量计算的摘要, 不再读取整个文件
+    assert upload_module._upload_digests[upload_id][0] == len(content)
+    response = client.post(
+        f"/projects/{project.project_id}/uploads/{upload_id}/complete"
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["content_hashes"] == {
+        "original/big.png": hashlib.sha256(content).hexdigest()
+    }
+    saved = os.path.join(project.data_dir, "data", "original", "big.png")
+    with open(saved, "rb") as f:
+        assert f.read() == content
+    assert upload_id not in upload_module._upload_digests
+
+
+async def slow_chunks(data: bytes, parts: int = 4) -> AsyncIterator[bytes]:
+    step = len(data) // parts
+    for start in range(0, len(data), step):
+        await asyncio.sleep(0.01)
+        yield data[start : start + step]
+
+
+def test_concurrent_appends_are_serialized(project: Project) -> None:
+    upload = ChunkedUpload.create(project.data_dir, "big.png", size=2000)
+    first, second = os.urandom(1000), os.urandom(1000)
+
+    async def race() -> list[int | BaseException]:
+        results = await asyncio.gather(
+            upload.append(slow_chunks(first), 0),
+            upload.append(slow_chunks(second), 0),
+            return_exceptions=True,
+        )
+        return list(results)
+
+    results = asyncio.run(race())
+
+    # 第二个追加等第一个写完后才检查 offset, 不会交错写入或截断对方的数据
+    assert results[0] == 1000
+    assert isinstance(results[1], HTTPException)
+    assert results[1].status_code == 409
+    with open(upload.part_path, "rb") as f:
+        assert f.read() == first
+    upload.discard()
+
+
+def test_digest_catches_up_without_saved_state(project: Project) -> None:
+    upload = ChunkedUpload.create(project.data_dir, "big.png")
+    content = os.urandom(5000)
+    asyncio.run(upload.append(slow_chunks(content[:3000]), 0))
+    # 模拟由其他 worker 进程追加: 本进程没有摘要状态
+    upload_module._upload_digests.pop(upload.upload_id)
+    asyncio.run(upload.append(slow_chunks(content[3000:]), 3000))
+
+    digest = upload.digest(upload.offset)
+
+    assert digest.hexdigest() == hashlib.sha256(content).hexdigest()
+    upload.discard()
+
+
+def test_cleanup_removes_abandoned_uploads(project: Project) -> None:
+    abandoned = ChunkedUpload.create(project.data_dir, "old.png")
+    active = ChunkedUpload.create(project.data_dir, "new.png")
+    asyncio.run(abandoned.append(slow_chunks(b"x" * 400), 0))
+    asyncio.run(active.append(slow_chunks(b"y" * 400), 0))
+    old = time.time() - upload_module.UPLOAD_STALE_SECONDS - 60
+    for path in (abandoned.part_path, abandoned.meta_path):
+        os.utime(path, (old, old))
+
+    assert upload_module.cleanup_stale_uploads(project.data_dir) == 1
+
+    assert not os.path.exists(abandoned.part_path)
+    assert abandoned.upload_id not in upload_module._upload_digests
+    assert active.offset == 400
+    assert active.upload_id in upload_module._upload_digests
+    active.discard()
+
+
+def test_stale_digests_are_evicted(project: Project) -> None:
+    upload = ChunkedUpload.create(project.data_dir, "big.png")
+    asyncio.run(upload.append(slow_chunks(b"x" * 400), 0))
+
+    assert upload_module.evict_stale_digests(max_age=3600) == 0
+    assert upload_module.evict_stale_digests(max_age=-1) == 1
+    assert upload.upload_id not in upload_module._upload_digests
+    # 摘要从临时文件补算
+    assert (
+        upload.digest(upload.offset).hexdigest()
+        == hashlib.sha256(b"x" * 400).hexdigest()
+    )
+    upload.discard()
+
+
+def test_image_upload_without_filename_gets_generated_name(
+    project: Project,
+) -> None:
+    target_dir = os.path.join(project.data_dir, "data", "original")
+    os.makedirs(target_dir)
+    upload = UploadFile(
+        io.BytesIO(b"png-bytes"), headers=Headers({"content-type": "image/png"})
+    )
+
+    saved, others = asyncio.run(upload_module.save_image_uploads([upload], target_dir))
+
+    assert others == []
+    [(filename, content_hash)] = saved
+    assert filename.startswith("upload_") and filename.endswith(".png")
+    assert content_hash == hashlib.sha256(b"png-bytes").hexdigest()
+
+
+def test_directory_import_defers_content_hash(
+    db: Session, project: Project, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    paths = write_original_images(project.data_dir, 3)
+    # 导入请求中不读取文件内容, 哈希由图像源节点补算
+    monkeypatch.setattr(
+        hashlib, "sha256", lambda *args: pytest.fail("hashed during import")
+    )
+
+    assert import_dataset(db, project) == 3
+
+    rows = db.exec(select(Data.path, Data.content_hash)).all()
+    assert sorted(rows) == [(path, None) for path in sorted(paths)]
+
+
+def test_upload_import_keeps_given_hashes(db: Session, project: Project) -> None:
+    paths = write_original_images(project.data_dir, 2)
+    hashes = {path: f"{index:064x}" for index, path in enumerate(paths)}
+
+    assert import_dataset(db, project, paths, hashes) == 2
+    assert import_dataset(db, project, paths, hashes) == 0
+
+    rows = db.exec(select(Data.path, Data.content_hash)).all()
+    assert dict(rows) == hashes
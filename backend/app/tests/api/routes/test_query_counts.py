@@ -0,0 +1,106 @@
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app.core.db import engine
+from app.models.annotation import Annotation
+from app.models.data import Data
+from app.models.label import Label
+from app.models.project import Project
+from app.models.task import Task
+from app.models.workflow import (
+    ProcessedData,
+    WorkflowExecution,
+    WorkflowNodeExecution,
+)
+from app.tests.utils.queries import count_queries
+
+N = 5
+
+
+@pytest.fixture
+def seed(db: Session, project: Project) -> Callable[[int], tuple[int, int]]:
+    """清空并写入 count 条数据, 每条带一个处理记录和一个标注"""
+    task = Task(project_id=project.project_id)
+    label = Label(project_id=project.project_id, name="cat")
+    execution = WorkflowExecution(project_id=project.project_id, status="completed")
+    db.add_all([task, label, execution])
+    db.commit()
+    node_execution = WorkflowNodeExecution(
+        execution_id=execution.execution_id,
+        node_id="det",
+        node_type="object_detection",
+        status="completed",
+    )
+    db.add(node_execution)
+    db.commit()
+
+    def reseed(count: int) -> tuple[int, int]:
+        for model in (Annotation, ProcessedData, Data):
+            db.exec(delete(model))  # type: ignore[call-overload]
+        datas = [
+            Data(
+                path=f"det/img{i}.jpg",
+                task_id=task.task_id,
+                project_id=project.project_id,
+                processing_stage="det",
+                workflow_execution_id=execution.execution_id,
+                node_execution_id=node_execution.id,
+            )
+            for i in range(count)
+        ]
+        db.add_all(datas)
+        db.flush()
+        for data in datas:
+            db.add(
+                ProcessedData(
+                    original_data_id=data.data_id,
+                    node_execution_id=node_execution.id,
+                    file_path=data.path,
+                )
+            )
+            db.add(
+                Annotation(
+                    type="rectangle",
+                    label_id=label.label_id,
+                    data_id=data.data_id,
+                    project_id=project.project_id,
+                    processing_stage="det",
+                )
+            )
+        db.commit()
+        return execution.execution_id, project.project_id  # type: ignore[return-value]
+
+    return reseed
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/data/workflow/{execution_id}/det",
+        "/data/workflow/{execution_id}/det?node_id=det",
+        "/annotations/workflow/{execution_id}/det",
+        "/annotations/project/{project_id}/stage/det",
+    ],
+)
+def test_query_count_independent_of_rows(
+    client: TestClient, seed: Callable[[int], tuple[int, int]], url: str
+) -> None:
+    counts = []
+    for rows in (N, 10 * N):
+        execution_id, project_id = seed(rows)
+        path = url.format(execution_id=execution_id, project_id=project_id)
+        with count_queries(engine) as statements:
+            response = client.get(path)
+        assert response.status_code == 200, response.text
+        items = response.json()
+        assert len(items) == rows
+        assert all(
+            len(item.get("processed_data", item.get("annotations"))) == 1
+            for item in items
+        )
+        counts.append(len(statements))
+
+    assert 0 < counts[0] == counts[1]
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.workflow.job_queue import JOB_QUEUED
+from app.core.workflow.scheduler import run_workflow_execution
+from app.models.project import Project
+from app.models.workflow import (
+    NodeStatus,
+    Workflow,
+    WorkflowExecution,
+    WorkflowJob,
+    WorkflowNodeExecution,
+)
+from app.tests.utils.images import write_original_images
+
+
+def execute_node(
+    client: TestClient, db: Session, workflow_id: int | None, node_id: str
+) -> dict[str, Any]:
+    """提交单节点执行, 并像 worker 一样在当前进程中执行排队的任务"""
+    response = client.post(
+        f"/workflows/{workflow_id}/execute_node", params={"node_id": node_id}
+    )
+    assert response.status_code == 200
+    body: dict[str, Any] = response.json()
+    job = db.get(WorkflowJob, body["job_id"])
+    assert job is not None
+    assert job.status == JOB_QUEUED
+    assert job.execution_id == body["execution_id"]
+
+    asyncio.run(run_workflow_execution(body["execution_id"]))
+    return body
+
+
+def test_execute_single_node_runs_through_job_queue(
+    client: TestClient, db: Session, project: Project
+) -> None:
+    write_original_images(project.data_dir, 3)
+    workflow = Workflow(
+        name="wf",
+        project_id=project.project_id,
+        config={
+            "nodes": [
+                {"id": "src", "type": "image_source", "params": {}},
+                {"id": "pre", "type": "preprocess", "params": {"resize": [16, 16]}},
+            ],
+            "edges": [{"source": "src", "target": "pre"}],
+        },
+    )
+    db.add(workflow)
+    db.commit()
+
+    execute_node(client, db, workflow.workflow_id, "src")
+    body = execute_node(client, db, workflow.workflow_id, "pre")
+
+    db.expire_all()
+    execution = db.get(WorkflowExecution, body["execution_id"])
+    assert execution is not None
+    assert execution.status == "completed"
+    # 调度器沿用请求中创建的节点记录和输入, 不会再创建一条
+    node_executions = db.exec(
+        select(WorkflowNodeExecution).where(
+            WorkflowNodeExecution.execution_id == body["execution_id"]
+        )
+    ).all()
+    assert [node.id for node in node_executions] == [body["node_execution_id"]]
+    assert node_executions[0].status == NodeStatus.COMPLETED
+    assert len(node_executions[0].input_data_ids) == 3
+    assert len(node_executions[0].output_data_ids) == 3
+
+
+def test_execute_single_node_unknown_node(
+    client: TestClient, db: Session, project: Project
+) -> None:
+    workflow = Workflow(
+        name="wf", project_id=project.project_id, config={"nodes": [], "edges": []}
+    )
+    db.add(workflow)
+    db.commit()
+
+    response = client.post(
+        f"/workflows/{workflow.workflow_id}/execute_node", params={"node_id": "x"}
+    )
+
+    assert response.status_code == 404
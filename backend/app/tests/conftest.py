@@ -0,0 +1,76 @@
+import os
+import tempfile
+from collections.abc import Callable, Generator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+
+# 测试使用临时 SQLite 数据库, 必须在导入 app.core.db 之前设置
+os.environ["DATABASE_TYPE"] = "sqlite"
+os.environ["SQLITE_DB"] = os.path.join(tempfile.mkdtemp(prefix="app-tests-"), "test.db")
+
+import app.models  # noqa: E402, F401
+import app.models.user  # noqa: E402, F401
+from app.api.api_main import api_router  # noqa: E402
+from app.core.db import engine  # noqa: E402
+from app.core.workflow.node_processors import base_processor  # noqa: E402
+from app.models.project import Project  # noqa: E402
+from app.models.workflow import WorkflowNodeExecution  # noqa: E402
+
+
+@pytest.fixture
+def db() -> Generator[Session, None, None]:
+    """每个测试使用重新建表的空数据库"""
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client(db: Session) -> Generator[TestClient, None, None]:
+    """只挂载 API 路由的测试客户端 (不运行 app.main 的 lifespan, 不启动 worker 进程)"""
+    app = FastAPI()
+    app.include_router(api_router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def project(db: Session, tmp_path: Path) -> Project:
+    """数据目录位于 tmp_path 的项目"""
+    project = Project(name="test", data_dir=str(tmp_path))
+    db.add(project)
+    db.commit()
+    db.refresh(project)
+    return project
+
+
+@pytest.fixture
+def make_processor(
+    tmp_path: Path,
+) -> Callable[..., base_processor.BaseNodeProcessor]:
+    """创建不连接数据库的节点处理器, 只用于测试 process_batch 等纯计算方法"""
+
+    def make(
+        processor_class: type[base_processor.BaseNodeProcessor],
+        params: dict[str, Any] | None = None,
+    ) -> base_processor.BaseNodeProcessor:
+        node_execution = WorkflowNodeExecution(
+            id=1,
+            execution_id=1,
+            node_id="node",
+            node_type="test",
+            config={"params": params or {}},
+        )
+        data_manager = SimpleNamespace(
+            project=SimpleNamespace(data_dir=str(tmp_path)), project_id=1
+        )
+        return processor_class(node_execution, None, data_manager)  # type: ignore[arg-type]
+
+    return make
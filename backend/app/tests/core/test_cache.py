@@ -0,0 +1,94 @@
+import time
+
+import pytest
+from sqlmodel import Session, delete
+
+from app.core import cache
+from app.core.db import engine
+from app.models.data import Data
+from app.models.project import Project
+from app.models.task import Task
+from app.tests.utils.queries import count_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_caches() -> None:
+    for entity_cache in cache.CACHES:
+        entity_cache.clear()
+
+
+@pytest.fixture
+def data(db: Session, project: Project) -> Data:
+    task = Task(project_id=project.project_id)
+    db.add(task)
+    db.commit()
+    data = Data(
+        path="original/a.jpg", task_id=task.task_id, project_id=project.project_id
+    )
+    db.add(data)
+    db.commit()
+    db.refresh(data)
+    return data
+
+
+def delete_in_other_process(data_id: int, project_id: int) -> None:
+    """模拟 worker 进程删除数据: 递增数据代数, 但不清除本进程的缓存"""
+    with Session(engine) as session:
+        session.exec(delete(Data).where(Data.data_id == data_id))  # type: ignore[call-overload, arg-type]
+        cache.bump_data_generation(session, project_id)
+        session.commit()
+
+
+def test_location_hit_skips_queries(db: Session, project: Project, data: Data) -> None:
+    assert project.project_id is not None
+    location = cache.get_data_location(db, data.data_id)  # type: ignore[arg-type]
+    assert location == cache.FileLocation(
+        project.project_id, project.data_dir, "original/a.jpg"
+    )
+
+    with count_queries(engine) as statements:
+        assert cache.get_data_location(db, data.data_id) == location  # type: ignore[arg-type]
+    assert statements == []
+
+
+def test_deletion_in_other_process_invalidates_hit(
+    db: Session, project: Project, data: Data
+) -> None:
+    assert cache.get_data_location(db, data.data_id) is not None  # type: ignore[arg-type]
+    delete_in_other_process(data.data_id, project.project_id)  # type: ignore[arg-type]
+
+    # 数据代数缓存未过期时仍可能返回旧路径 (最长 DATA_GENERATION_TTL 秒)
+    assert cache.get_data_location(db, data.data_id) is not None  # type: ignore[arg-type]
+
+    cache.generation_cache.clear()
+    with count_queries(engine) as statements:
+        assert cache.get_data_location(db, data.data_id) is None  # type: ignore[arg-type]
+    # 一次查询数据代数, 一次重新查询路径
+    assert len(statements) == 2
+
+
+def test_local_invalidation_is_immediate(
+    db: Session, project: Project, data: Data
+) -> None:
+    assert cache.get_data_location(db, data.data_id) is not None  # type: ignore[arg-type]
+    delete_in_other_process(data.data_id, project.project_id)  # type: ignore[arg-type]
+
+    cache.invalidate_paths(project.project_id)  # type: ignore[arg-type]
+
+    assert cache.get_data_location(db, data.data_id) is None  # type: ignore[arg-type]
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    lru = cache.TTLCache("test", maxsize=2, ttl=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+
+    # b 最久未使用, 被淘汰
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    now[0] += 10
+    assert lru.get("a") is None
+    assert lru.stats()["evictions"] == 1
@@ -0,0 +1,109 @@
+import asyncio
+from collections.abc import Generator
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.workflow.frame_ring import FrameRing
+
+SLOT_BYTES = 64 * 64 * 3
+
+
+@pytest.fixture
+def ring() -> Generator[FrameRing, None, None]:
+    ring = FrameRing(slots=2, slot_bytes=SLOT_BYTES)
+    yield ring
+    ring.close()
+
+
+def image(value: int, shape: tuple[int, ...] = (32, 48, 3)) -> np.ndarray:
+    return np.full(shape, value, np.uint8)
+
+
+def test_slots_recycle_when_refcount_drops_to_zero(ring: FrameRing) -> None:
+    first, second = ring.acquire(), ring.acquire()
+    assert first is not None
+    assert (first, second) == (0, 1)
+    # 没有空闲槽位时退回普通方式
+    assert ring.acquire() is None
+    assert (ring.hits, ring.fallbacks) == (2, 1)
+
+    # 引用计数归零后才回到空闲队列
+    ring.retain(first)
+    ring.release(first)
+    assert ring.acquire() is None
+    ring.release(first)
+    assert ring.acquire() == first
+
+
+def test_put_copies_into_slot(ring: FrameRing) -> None:
+    img = image(7)
+    ref = ring.put(img)
+
+    assert ref is not None
+    view = ring.view(ref)
+    assert view.shape == img.shape and view.dtype == img.dtype
+    np.testing.assert_array_equal(view, img)
+    assert ring.slot_of(view) == ref.offset // SLOT_BYTES
+    # 槽位上的切片也能找到所在槽位, 环外的数组不能
+    assert ring.slot_of(view[10:, 5:]) == ring.slot_of(view)
+    assert ring.slot_of(img) is None
+
+
+def test_release_array_returns_slot(ring: FrameRing) -> None:
+    views = [ring.view(ring.put(image(value))) for value in (1, 2)]  # type: ignore[arg-type]
+    assert ring.put(image(3)) is None
+
+    ring.release_array(views[0])
+    ring.release_array(image(4))  # 不在环中, 忽略
+    ref = ring.put(image(5))
+
+    assert ref is not None and ref.offset == 0
+    assert int(views[0][0, 0, 0]) == 5
+
+
+def test_oversized_image_falls_back(ring: FrameRing) -> None:
+    assert ring.put(image(1, (64, 65, 3))) is None
+    assert ring.fallbacks == 1
+    assert ring.put(image(1, (64, 64, 3))) is not None
+
+
+def test_closed_ring_hands_out_no_slots(ring: FrameRing) -> None:
+    view = ring.view(ring.put(image(9)))  # type: ignore[arg-type]
+    ring.close()
+
+    assert ring.acquire() is None
+    assert ring.slot_of(view) is None
+    # 仍在使用的视图在关闭后可以继续读取
+    assert int(view[0, 0, 0]) == 9
+
+
+def test_decode_and_write_through_slots(ring: FrameRing, tmp_path: Path) -> None:
+    small = np.random.default_rng(0).integers(0, 255, (40, 50, 3), dtype=np.uint8)
+    large = np.zeros((80, 80, 3), np.uint8)
+    cv2.imwrite(str(tmp_path / "small.png"), small)
+    cv2.imwrite(str(tmp_path / "large.png"), large)
+
+    async def run() -> None:
+        decoded = await ring.decode(str(tmp_path / "small.png"))
+        assert decoded is not None
+        np.testing.assert_array_equal(decoded, small)
+        slot = ring.slot_of(decoded)
+        assert slot is not None
+
+        # 超过槽位大小: 返回普通数组, 槽位立即释放
+        oversized = await ring.decode(str(tmp_path / "large.png"))
+        assert oversized is not None and ring.slot_of(oversized) is None
+        assert await ring.decode(str(tmp_path / "missing.png")) is None
+
+        result = await ring.write_image(str(tmp_path / "out.png"), decoded)
+        assert result["file_size"] > 0
+        ring.release_array(decoded)
+
+    asyncio.run(run())
+
+    # 所有槽位都已释放
+    assert sorted([ring.acquire(), ring.acquire()]) == [0, 1]  # type: ignore[type-var]
+    np.testing.assert_array_equal(cv2.imread(str(tmp_path / "out.png")), small)
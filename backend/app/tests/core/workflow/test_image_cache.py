@@ -0,0 +1,41 @@
+import asyncio
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.workflow import image_io
+from app.core.workflow.image_cache import DecodedImageCache
+
+
+def test_concurrent_decodes_of_the_same_image_are_coalesced(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = str(tmp_path / "img.png")
+    cv2.imwrite(path, np.full((4, 4, 3), 7, np.uint8))
+    decoded: list[str] = []
+
+    def counting_decode(img_path: str) -> np.ndarray | None:
+        decoded.append(img_path)
+        return image_io.decode_image(img_path)
+
+    monkeypatch.setattr("app.core.workflow.image_cache.decode_image", counting_decode)
+    cache = DecodedImageCache(max_bytes=1 << 20)
+
+    async def decode_concurrently() -> list[np.ndarray | None]:
+        # 三个节点在第一次解码完成前请求同一图像
+        futures = [cache.submit(path) for _ in range(3)]
+        images = list(await asyncio.gather(*futures))
+        # 解码完成后再请求直接命中缓存
+        images.append(await cache.submit(path))
+        return images
+
+    images = asyncio.run(decode_concurrently())
+
+    assert decoded == [path]
+    assert cache.coalesced == 2
+    assert cache.hits == 1
+    for img in images:
+        assert img is not None and img[0, 0, 0] == 7
+    assert images[0] is images[3]
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.workflow import image_io
+
+
+def test_submit_decode_results_follow_submission_order(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    paths = []
+    for index in range(4):
+        path = tmp_path / f"img{index}.png"
+        cv2.imwrite(str(path), np.full((4, 4, 3), index * 10, np.uint8))
+        paths.append(str(path))
+    done = {path: threading.Event() for path in paths}
+    finished: list[str] = []
+    decode_image = image_io.decode_image
+
+    def reversed_decode(img_path: str) -> np.ndarray | None:
+        # 每张图像等后提交的图像解码完成后才完成, 完成顺序与提交顺序相反
+        index = paths.index(img_path)
+        if index + 1 < len(paths):
+            assert done[paths[index + 1]].wait(timeout=5)
+        img = decode_image(img_path)
+        finished.append(img_path)
+        done[img_path].set()
+        return img
+
+    executor = ThreadPoolExecutor(max_workers=len(paths))
+    monkeypatch.setattr(image_io, "_executor", executor)
+    monkeypatch.setattr(image_io, "decode_image", reversed_decode)
+
+    async def decode_all() -> list[np.ndarray | None]:
+        futures = [image_io.submit_decode(path) for path in paths]
+        return [await future for future in futures]
+
+    try:
+        images = asyncio.run(decode_all())
+    finally:
+        executor.shutdown()
+
+    assert finished == paths[::-1]
+    for index, img in enumerate(images):
+        assert img is not None
+        assert img[0, 0, 0] == index * 10
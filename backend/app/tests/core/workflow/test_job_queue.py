@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app.core.workflow.job_queue import (
+    JOB_CANCELLED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    claim_next_job,
+    enqueue_execution,
+    get_active_job,
+    heartbeat,
+    release_job,
+    request_cancel,
+    requeue_stale_jobs,
+)
+from app.models.project import Project
+from app.models.workflow import WorkflowExecution, WorkflowJob
+
+
+def enqueue(session: Session, project_id: int) -> WorkflowJob:
+    execution = WorkflowExecution(project_id=project_id, config={})
+    session.add(execution)
+    session.commit()
+    job = enqueue_execution(session, execution)
+    assert job.job_id is not None
+    return job
+
+
+def claim(session: Session, worker_id: str, project_concurrency: int) -> WorkflowJob:
+    job = claim_next_job(session, worker_id, project_concurrency=project_concurrency)
+    assert job is not None
+    return job
+
+
+def get_job(session: Session, job_id: int | None) -> WorkflowJob:
+    job = session.get(WorkflowJob, job_id)
+    assert job is not None
+    return job
+
+
+def get_execution_status(session: Session, execution_id: int) -> str:
+    execution = session.get(WorkflowExecution, execution_id)
+    assert execution is not None
+    return execution.status
+
+
+def make_project(session: Session, name: str) -> int:
+    project = Project(name=name, data_dir=f"/tmp/{name}")
+    session.add(project)
+    session.commit()
+    assert project.project_id is not None
+    return project.project_id
+
+
+def test_claim_is_fifo_and_exclusive(db: Session) -> None:
+    project_id = make_project(db, "a")
+    first = enqueue(db, project_id)
+    second = enqueue(db, project_id)
+
+    claimed = claim(db, "worker-1", project_concurrency=2)
+    assert claimed.job_id == first.job_id
+    assert claimed.status == JOB_RUNNING
+    assert claimed.worker_id == "worker-1"
+    assert claimed.attempts == 1
+
+    assert claim(db, "worker-2", project_concurrency=2).job_id == second.job_id
+    assert claim_next_job(db, "worker-3", project_concurrency=2) is None
+
+
+def test_claim_skips_projects_at_concurrency_limit(db: Session) -> None:
+    busy = make_project(db, "busy")
+    idle = make_project(db, "idle")
+    enqueue(db, busy)
+    blocked = enqueue(db, busy)
+    other = enqueue(db, idle)
+
+    claim_next_job(db, "worker-1", project_concurrency=1)
+
+    assert claim(db, "worker-2", project_concurrency=1).job_id == other.job_id
+    assert claim_next_job(db, "worker-3", project_concurrency=1) is None
+    db.refresh(blocked)
+    assert blocked.status == JOB_QUEUED
+
+
+def test_cancel_queued_job_finishes_it_immediately(db: Session) -> None:
+    job = enqueue(db, make_project(db, "a"))
+
+    cancelled = request_cancel(db, job.execution_id)
+
+    assert cancelled is not None
+    assert cancelled.status == JOB_CANCELLED
+    assert get_execution_status(db, job.execution_id) == "cancelled"
+    assert get_active_job(db, job.execution_id) is None
+    assert request_cancel(db, job.execution_id) is None
+
+
+def test_cancel_running_job_is_reported_by_heartbeat(db: Session) -> None:
+    job = enqueue(db, make_project(db, "a"))
+    claim_next_job(db, "worker-1", project_concurrency=1)
+    assert job.job_id is not None
+    assert heartbeat(db, job.job_id) is False
+
+    cancelled = request_cancel(db, job.execution_id)
+
+    assert cancelled is not None
+    assert cancelled.status == JOB_RUNNING
+    assert heartbeat(db, job.job_id) is True
+
+
+def test_requeue_stale_jobs(db: Session) -> None:
+    stale = enqueue(db, make_project(db, "a"))
+    fresh = enqueue(db, make_project(db, "b"))
+    claim_next_job(db, "worker-1", project_concurrency=1)
+    claim_next_job(db, "worker-2", project_concurrency=1)
+    job = get_job(db, stale.job_id)
+    job.heartbeat_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+    db.add(job)
+    db.commit()
+
+    assert requeue_stale_jobs(db, stale_seconds=60) == 1
+
+    db.expire_all()
+    job = get_job(db, stale.job_id)
+    assert job.status == JOB_QUEUED
+    assert job.worker_id is None
+    assert get_execution_status(db, stale.execution_id) == "pending"
+    assert get_job(db, fresh.job_id).status == JOB_RUNNING
+    # 心跳超时的执行计入尝试次数
+    assert job.attempts == 1
+
+
+def test_release_job_does_not_count_the_attempt(db: Session) -> None:
+    job = enqueue(db, make_project(db, "a"))
+    assert job.job_id is not None
+    claim(db, "worker-1", project_concurrency=1)
+
+    release_job(db, job.job_id)
+
+    db.expire_all()
+    released = get_job(db, job.job_id)
+    assert released.status == JOB_QUEUED
+    assert released.attempts == 0
+    assert claim(db, "worker-2", project_concurrency=1).attempts == 1
+
+
+def test_release_missing_job_is_ignored(db: Session) -> None:
+    release_job(db, 12345)
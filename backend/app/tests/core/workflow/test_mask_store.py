@@ -0,0 +1,68 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.workflow.mask_store import (
+    MaskStore,
+    find_mask_refs,
+    rle_decode,
+    rle_encode,
+)
+
+
+@pytest.mark.parametrize(
+    "mask",
+    [
+        np.zeros((0, 4), np.uint8),
+        np.zeros((5, 7), np.uint8),
+        np.eye(6, dtype=np.uint8),
+        np.random.default_rng(0).integers(0, 4, (32, 48), dtype=np.uint8),
+        np.random.default_rng(1).integers(0, 300, (3, 10, 10), dtype=np.uint16),
+    ],
+)
+def test_rle_round_trip(mask: np.ndarray) -> None:
+    rle = rle_encode(mask)
+
+    decoded = rle_decode(rle, dtype=mask.dtype)
+
+    assert decoded.dtype == mask.dtype
+    np.testing.assert_array_equal(decoded, mask)
+    assert sum(rle["counts"]) == mask.size
+
+
+def test_rle_encode_row_major_runs() -> None:
+    mask = np.array([[0, 0, 1], [1, 1, 0]], np.uint8)
+
+    assert rle_encode(mask) == {
+        "size": [2, 3],
+        "values": [0, 1, 0],
+        "counts": [2, 3, 1],
+    }
+
+
+@pytest.mark.parametrize("mask_format", ["png", "npy"])
+def test_store_masks_replaces_arrays_with_refs(
+    tmp_path: Path, mask_format: str
+) -> None:
+    store = MaskStore(str(tmp_path), mask_format=mask_format)
+    mask = np.random.default_rng(0).integers(0, 2, (16, 16), dtype=np.uint8)
+    metadata = {"instances": [{"class": "a", "mask": mask}], "score": 1.0}
+
+    stored = asyncio.run(store.store_masks(metadata, "seg", "img0"))
+
+    refs = find_mask_refs(stored)
+    assert len(refs) == 1
+    assert refs[0]["format"] == mask_format
+    assert stored["score"] == 1.0
+    np.testing.assert_array_equal(store.load_from_metadata(stored, 0), mask)
+    assert store.load_from_metadata(stored, 1) is None
+
+
+def test_load_from_metadata_reads_legacy_json_masks(tmp_path: Path) -> None:
+    store = MaskStore(str(tmp_path))
+
+    mask = store.load_from_metadata({"mask": [[0, 1], [1, 0]]})
+
+    np.testing.assert_array_equal(mask, np.array([[0, 1], [1, 0]], np.uint8))
@@ -0,0 +1,111 @@
+import asyncio
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.workflow.node_processors.base_processor import group_by_shape
+from app.core.workflow.node_processors.object_detection_processor import (
+    ObjectDetectionNodeProcessor,
+)
+from app.core.workflow.node_processors.preprocess_processor import (
+    PreprocessNodeProcessor,
+)
+
+
+def test_group_by_shape_keeps_original_indices() -> None:
+    images = [
+        np.zeros((4, 5, 3), np.uint8),
+        np.ones((6, 5, 3), np.uint8),
+        np.full((4, 5, 3), 2, np.uint8),
+    ]
+    groups = group_by_shape(images)
+
+    assert [indices for indices, _ in groups] == [[0, 2], [1]]
+    assert groups[0][1].shape == (2, 4, 5, 3)
+    assert groups[0][1][1, 0, 0, 0] == 2
+
+
+@pytest.mark.parametrize("thickness", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("bbox", [[50, 50, 80, 80], [0, 0, 30, 20], [10, 5, 119, 99]])
+def test_draw_box_batch_matches_cv2_rectangle(
+    make_processor: Callable[..., Any], bbox: list[int], thickness: int
+) -> None:
+    processor = make_processor(ObjectDetectionNodeProcessor)
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 255, (3, 100, 120, 3), dtype=np.uint8)
+    expected = images.copy()
+
+    processor.draw_box_batch(images, bbox, (0, 255, 0), thickness)
+
+    for index, img in enumerate(expected):
+        cv2.rectangle(img, tuple(bbox[:2]), tuple(bbox[2:]), (0, 255, 0), thickness)
+        np.testing.assert_array_equal(images[index], img)
+
+
+def test_preprocess_batch_matches_per_image_resize(
+    make_processor: Callable[..., Any],
+) -> None:
+    processor = make_processor(PreprocessNodeProcessor, {"resize": [32, 24]})
+    images = np.random.default_rng(0).integers(0, 255, (4, 60, 50, 3), dtype=np.uint8)
+
+    results = processor.process_batch(images)
+
+    assert len(results) == 4
+    for img, (processed, metadata, category) in zip(images, results, strict=True):
+        np.testing.assert_array_equal(processed, cv2.resize(img, (32, 24)))
+        assert metadata["processed_shape"] == (24, 32, 3)
+        assert category is None
+
+
+def test_input_read_ahead_is_bounded_by_prefetch(
+    make_processor: Callable[..., Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    processor = make_processor(
+        PreprocessNodeProcessor, {"batch_size": 1, "prefetch": 2}
+    )
+    data_ids = list(range(1, 11))
+    node_execution = processor.node_execution.model_copy(
+        update={"input_data_ids": data_ids}
+    )
+
+    async def run_db(fn: Callable[..., Any], *args: Any) -> Any:
+        return fn(*args)
+
+    submitted: list[str] = []
+
+    def submit_decode(img_path: str) -> "asyncio.Future[np.ndarray]":
+        submitted.append(img_path)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(np.zeros((2, 2, 3), np.uint8))
+        return future
+
+    processor.session = SimpleNamespace(get=lambda *args: node_execution)
+    processor.data_manager.run_db = run_db
+    monkeypatch.setattr(
+        processor, "resolve_input_paths", lambda ids: [(i, f"img{i}.jpg") for i in ids]
+    )
+    monkeypatch.setattr(processor, "resolve_packed_inputs", lambda ids: {})
+    monkeypatch.setattr(processor, "submit_decode", submit_decode)
+
+    async def consume() -> tuple[int, list[int]]:
+        batches = processor.iter_input_batches()
+        first = await anext(batches)
+        # 让预读任务尽可能向前运行
+        for _ in range(20):
+            await asyncio.sleep(0)
+        read_ahead = len(submitted) - len(first)
+        rest = [item.data_id for item in first]
+        async for batch in batches:
+            rest.extend(item.data_id for item in batch)
+        return read_ahead, rest
+
+    read_ahead, received = asyncio.run(consume())
+
+    # 队列中最多 prefetch 个, 另有一个已提交解码、等待放入队列
+    assert read_ahead <= 2 + 1
+    assert received == data_ids
+    assert submitted == [f"img{i}.jpg" for i in data_ids]
@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.workflow.packed_dataset import (
+    HEADER_BYTES,
+    PackedDataset,
+    PackedDatasetWriter,
+    find_packed_refs,
+    index_path_of,
+    npy_header,
+)
+
+PACK_PATH = "preprocessed/packed/node.npy"
+
+
+def rows(count: int, shape: tuple[int, ...] = (4, 5, 3)) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, shape, dtype=np.uint8) for _ in range(count)]
+
+
+@pytest.mark.parametrize(
+    "shape, dtype", [((0, 4, 5, 3), np.uint8), ((123456, 640, 640, 3), np.float32)]
+)
+def test_header_has_fixed_length(shape: tuple[int, ...], dtype: type) -> None:
+    header = npy_header(shape, np.dtype(dtype))
+
+    assert len(header) == HEADER_BYTES
+    assert header.endswith(b"\n")
+
+
+def test_header_too_long() -> None:
+    with pytest.raises(ValueError):
+        npy_header(tuple(range(1, 40)), np.dtype(np.uint8))
+
+
+def test_close_rewrites_row_count_and_writes_index(tmp_path: Path) -> None:
+    images = rows(3)
+    writer = PackedDatasetWriter(tmp_path, PACK_PATH)
+    assert [writer.append(img) for img in images] == [0, 1, 2]
+    # 形状不同的图像不写入
+    assert writer.append(np.zeros((4, 6, 3), np.uint8)) is None
+    assert writer.append(images[0].astype(np.float32)) is None
+
+    assert writer.close([10, None, 12]) == PACK_PATH
+
+    # 文件头中的行数已改写, np.load 可以直接读取
+    loaded = np.load(tmp_path / PACK_PATH)
+    np.testing.assert_array_equal(loaded, np.stack(images))
+    assert (tmp_path / PACK_PATH).stat().st_size == HEADER_BYTES + loaded.nbytes
+
+    index = json.loads((tmp_path / index_path_of(PACK_PATH)).read_text())
+    assert index == {
+        "pack_path": PACK_PATH,
+        "shape": [3, 4, 5, 3],
+        "dtype": "|u1",
+        "rows": {"10": 0, "12": 2},
+    }
+    assert writer.skipped == 2
+
+
+def test_close_without_rows(tmp_path: Path) -> None:
+    writer = PackedDatasetWriter(tmp_path, PACK_PATH)
+
+    assert writer.close() is None
+    assert not (tmp_path / PACK_PATH).exists()
+
+
+def test_packed_dataset_reads_rows_by_data_id(tmp_path: Path) -> None:
+    images = rows(4)
+    writer = PackedDatasetWriter(tmp_path, PACK_PATH)
+    for img in images:
+        writer.append(img)
+    writer.close([100, 101, 102, 103])
+
+    dataset = PackedDataset(tmp_path, PACK_PATH)
+
+    assert len(dataset) == 4
+    np.testing.assert_array_equal(dataset[2], images[2])
+    assert dataset.rows == {100: 0, 101: 1, 102: 2, 103: 3}
+    # 连续的行一次切片, 不连续的行按索引读取
+    np.testing.assert_array_equal(dataset.batch([101, 102]), np.stack(images[1:3]))
+    np.testing.assert_array_equal(
+        dataset.batch([103, 100]), np.stack([images[3], images[0]])
+    )
+
+
+def test_find_packed_refs() -> None:
+    metadata = {"packed": {"pack_path": PACK_PATH, "row": 3}}
+
+    assert find_packed_refs(metadata) == [PACK_PATH, index_path_of(PACK_PATH)]
+    assert index_path_of(PACK_PATH) == "preprocessed/packed/node.index.json"
+    assert find_packed_refs({"packed": {"pack_path": PACK_PATH}}) == []
+    assert find_packed_refs(None) == []
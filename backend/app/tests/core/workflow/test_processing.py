@@ -0,0 +1,263 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import get_async_engine
+from app.core.workflow.node_processors import NODE_PROCESSORS
+from app.core.workflow.scheduler import WorkflowScheduler
+from app.models.data import Data
+from app.models.project import Project
+from app.models.workflow import NodeStatus, WorkflowExecution, WorkflowNodeExecution
+from app.tests.utils.images import write_original_images
+
+PIPELINE = [
+    {"id": "src", "type": "image_source", "params": {}},
+    {"id": "pre", "type": "preprocess", "params": {"resize": [16, 16]}},
+]
+EDGES = [{"source": "src", "target": "pre"}]
+
+
+def run_workflow(
+    db: Session,
+    project: Project,
+    nodes: list[dict[str, Any]] = PIPELINE,
+    edges: list[dict[str, str]] = EDGES,
+    async_db: bool = False,
+    **options: Any,
+) -> dict[str, Any]:
+    """创建一次执行并用调度器在当前进程中运行, 返回调度报告"""
+    config = {"nodes": nodes, "edges": edges, **options}
+    execution = WorkflowExecution(project_id=project.project_id, config=config)
+    db.add(execution)
+    db.commit()
+    assert execution.execution_id is not None
+    scheduler = WorkflowScheduler(execution.execution_id, config, async_db=async_db)
+
+    async def run() -> dict[str, Any]:
+        try:
+            return await scheduler.run()
+        finally:
+            # 异步引擎的连接绑定在本次事件循环上
+            async_engine = get_async_engine()
+            if async_db and async_engine is not None:
+                await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def stage_paths(db: Session, project: Project, stage: str) -> list[str]:
+    db.expire_all()
+    return sorted(
+        db.exec(
+            select(Data.path).where(
+                Data.project_id == project.project_id,
+                Data.processing_stage == stage,
+            )
+        ).all()
+    )
+
+
+def test_bmp_input_is_processed(db: Session, project: Project) -> None:
+    write_original_images(project.data_dir, 1)
+    bmp = np.full((20, 24, 3), 100, np.uint8)
+    cv2.imwrite(str(Path(project.data_dir) / "data" / "original" / "b.bmp"), bmp)
+
+    report = run_workflow(db, project)
+
+    assert report["failed"] == {}
+    assert len(report["outputs"]["pre"]) == 2
+    paths = stage_paths(db, project, "pre")
+    assert [Path(path).suffix for path in paths] == [".bmp", ".jpg"]
+    saved = cv2.imread(str(Path(project.data_dir) / "data" / paths[0]))
+    assert saved is not None and saved.shape == (16, 16, 3)
+
+
+def incremental_pipeline(resize: list[int]) -> list[dict[str, Any]]:
+    return [
+        PIPELINE[0],
+        {
+            "id": "pre",
+            "type": "preprocess",
+            "params": {"resize": resize, "incremental": True},
+        },
+    ]
+
+
+def stage_rows(db: Session, project: Project, stage: str) -> dict[str, Data]:
+    """返回该阶段 文件名 -> Data
+
+    SQLite 会复用删除后的主键, 测试用 created 区分复用和重新生成的结果
+    """
+    db.expire_all()
+    rows = db.exec(
+        select(Data).where(
+            Data.project_id == project.project_id,
+            Data.processing_stage == stage,
+        )
+    ).all()
+    return {Path(row.path).name: row for row in rows}
+
+
+def created_times(rows: dict[str, Data]) -> dict[str, datetime]:
+    return {name: row.created for name, row in rows.items()}
+
+
+def test_incremental_rerun_reuses_unchanged_results(
+    db: Session, project: Project
+) -> None:
+    write_original_images(project.data_dir, 3)
+    nodes = incremental_pipeline([16, 16])
+
+    report = run_workflow(db, project, nodes=nodes)
+    assert report["failed"] == {}
+    first = created_times(stage_rows(db, project, "pre"))
+    assert len(first) == 3
+
+    # 输入和配置都未变化: 全部复用旧结果
+    report = run_workflow(db, project, nodes=nodes)
+    assert report["failed"] == {}
+    assert len(report["outputs"]["pre"]) == 3
+    rows = stage_rows(db, project, "pre")
+    assert created_times(rows) == first
+    # 复用的结果归属到本次执行, 并仍指向各自的原始数据
+    sources = stage_rows(db, project, "original")
+    for name, row in rows.items():
+        source = sources[name.removeprefix("preprocessed_")]
+        assert row.original_data_id == source.data_id
+        assert row.workflow_execution_id == source.workflow_execution_id
+
+    # 修改一张输入: 只重新处理这一张, 旧结果被清理
+    changed = np.full((40, 48, 3), 7, np.uint8)
+    cv2.imwrite(str(Path(project.data_dir) / "data" / "original" / "img0.jpg"), changed)
+    report = run_workflow(db, project, nodes=nodes)
+    assert report["failed"] == {}
+    second = created_times(stage_rows(db, project, "pre"))
+    assert second.keys() == first.keys()
+    assert [name for name in second if second[name] != first[name]] == [
+        "preprocessed_img0.jpg"
+    ]
+
+    # 修改配置: 全部重新处理
+    report = run_workflow(db, project, nodes=incremental_pipeline([8, 8]))
+    assert report["failed"] == {}
+    third = created_times(stage_rows(db, project, "pre"))
+    assert third.keys() == first.keys()
+    assert all(third[name] != second[name] for name in third)
+
+
+def test_incremental_is_opt_in(db: Session, project: Project) -> None:
+    write_original_images(project.data_dir, 2)
+
+    run_workflow(db, project)
+    first = created_times(stage_rows(db, project, "pre"))
+    run_workflow(db, project)
+    rows = stage_rows(db, project, "pre")
+
+    assert created_times(rows).keys() == first.keys()
+    assert all(rows[name].created != first[name] for name in first)
+    assert not any("cache_key" in row.metadata_ for row in rows.values())
+
+
+def streaming_pipeline(pre_batch_size: int) -> list[dict[str, Any]]:
+    """src -> pre -> post, pre 和 post 之间流水线执行"""
+    return [
+        PIPELINE[0],
+        {
+            "id": "pre",
+            "type": "preprocess",
+            "params": {"resize": [16, 16], "batch_size": pre_batch_size},
+        },
+        {
+            "id": "post",
+            "type": "preprocess",
+            "params": {"resize": [8, 8], "batch_size": 2},
+        },
+    ]
+
+
+STREAMING_EDGES = [*EDGES, {"source": "pre", "target": "post"}]
+
+
+def node_statuses(db: Session) -> dict[str, NodeStatus]:
+    db.expire_all()
+    return {
+        node.node_id: node.status for node in db.exec(select(WorkflowNodeExecution))
+    }
+
+
+def test_streaming_downstream_receives_every_item(
+    db: Session, project: Project
+) -> None:
+    write_original_images(project.data_dir, 5)
+
+    report = run_workflow(
+        db, project, streaming_pipeline(2), STREAMING_EDGES, streaming=True
+    )
+
+    assert report["failed"] == {}
+    assert len(report["outputs"]["pre"]) == 5
+    assert len(report["outputs"]["post"]) == 5
+    assert [Path(path).name for path in stage_paths(db, project, "post")] == [
+        f"preprocessed_preprocessed_img{i}.jpg" for i in range(5)
+    ]
+
+
+def test_streaming_upstream_failure_propagates(
+    db: Session, project: Project, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_original_images(project.data_dir, 5)
+    processor_class = NODE_PROCESSORS["preprocess"]
+    process_input_batch = processor_class.process_input_batch
+    batches: list[str] = []
+
+    async def failing_batch(self: Any, batch: list[Any]) -> list[int]:
+        if self.node_execution.node_id == "pre":
+            batches.append("pre")
+            if len(batches) == 3:
+                raise RuntimeError("boom")
+        return await process_input_batch(self, batch)
+
+    monkeypatch.setattr(processor_class, "process_input_batch", failing_batch)
+
+    report = run_workflow(
+        db, project, streaming_pipeline(1), STREAMING_EDGES, streaming=True
+    )
+
+    # 下游收到上游的失败信号或被调度器取消, 不会等待永远不会到来的输入
+    assert report["failed"]["pre"] == "boom"
+    assert "post" in report["failed"]
+    assert "post" not in report["outputs"]
+    assert node_statuses(db) == {
+        "src": NodeStatus.COMPLETED,
+        "pre": NodeStatus.FAILED,
+        "post": NodeStatus.FAILED,
+    }
+
+
+def test_process_with_async_session(
+    db: Session, project: Project, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_original_images(project.data_dir, 3)
+    run_sync = AsyncSession.run_sync
+    calls: list[str] = []
+
+    async def counting_run_sync(self: AsyncSession, fn: Any, *args: Any) -> Any:
+        calls.append(getattr(fn, "__name__", ""))
+        return await run_sync(self, fn, *args)
+
+    monkeypatch.setattr(AsyncSession, "run_sync", counting_run_sync)
+
+    report = run_workflow(db, project, async_db=True)
+
+    assert report["failed"] == {}
+    assert len(report["outputs"]["pre"]) == 3
+    assert len(stage_paths(db, project, "pre")) == 3
+    # 节点的数据库操作都经由异步会话执行
+    assert calls
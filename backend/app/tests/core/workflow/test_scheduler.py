@@ -0,0 +1,91 @@
+from typing import Any
+
+import pytest
+
+from app.core.workflow.scheduler import (
+    build_graph,
+    compute_critical_path,
+    get_stream_queue_size,
+    topological_order,
+)
+
+DIAMOND = {
+    "nodes": [
+        {"id": "src", "type": "image_source"},
+        {"id": "pre", "type": "preprocess"},
+        {"id": "det", "type": "object_detection"},
+        {"id": "seg", "type": "semantic_segmentation"},
+        {"id": "cls", "type": "classification"},
+    ],
+    "edges": [
+        {"source": "src", "target": "pre"},
+        {"source": "pre", "target": "det"},
+        {"source": "pre", "target": "seg"},
+        {"source": "det", "target": "cls"},
+        {"source": "seg", "target": "cls"},
+    ],
+}
+
+
+def test_build_graph_collects_upstream_and_name_aliases() -> None:
+    config = {
+        "nodes": [{"id": "a", "name": "Source"}, {"name": "b"}],
+        "edges": [
+            {"source": "Source", "target": "b"},
+            {"source": "a", "target": "b"},
+        ],
+    }
+
+    nodes, upstream = build_graph(config)
+
+    assert list(nodes) == ["a", "b"]
+    assert upstream == {"a": [], "b": ["a"]}
+
+
+def test_build_graph_rejects_unknown_nodes() -> None:
+    with pytest.raises(ValueError, match="unknown node"):
+        build_graph({"nodes": [{"id": "a"}], "edges": [{"source": "a", "target": "x"}]})
+
+
+def test_topological_order_respects_dependencies() -> None:
+    _, upstream = build_graph(DIAMOND)
+
+    order = topological_order(upstream)
+
+    assert order == ["src", "pre", "det", "seg", "cls"]
+    for target, sources in upstream.items():
+        for source in sources:
+            assert order.index(source) < order.index(target)
+
+
+def test_topological_order_detects_cycles() -> None:
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order({"a": ["c"], "b": ["a"], "c": ["b"], "d": []})
+
+
+def test_critical_path_follows_slowest_branch() -> None:
+    _, upstream = build_graph(DIAMOND)
+    durations = {"src": 1.0, "pre": 2.0, "det": 5.0, "seg": 3.0, "cls": 1.0}
+
+    path, total = compute_critical_path(upstream, durations)
+
+    assert path == ["src", "pre", "det", "cls"]
+    assert total == pytest.approx(9.0)
+
+
+def test_critical_path_of_empty_graph() -> None:
+    assert compute_critical_path({}, {}) == ([], 0.0)
+
+
+@pytest.mark.parametrize(
+    ("params", "expected"),
+    [
+        ({}, 32),
+        ({"batch_size": 4}, 8),
+        ({"prefetch": 3, "batch_size": 4}, 3),
+        ({"batch_size": "bad"}, 32),
+        ({"prefetch": -1}, 1),
+    ],
+)
+def test_stream_queue_size(params: dict[str, Any], expected: int) -> None:
+    assert get_stream_queue_size({"params": params}) == expected
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.workflow import thumbnail_store
+from app.core.workflow.thumbnail_store import ThumbnailCache, get_pyramid_level
+
+
+def write_image(path: Path, shape: tuple[int, int] = (300, 400)) -> str:
+    img = np.random.default_rng(0).integers(0, 255, (*shape, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def get(cache: ThumbnailCache, source: str, size: int) -> Path:
+    """在新的事件循环中取缩略图, asyncio.run 退出前会等待默认线程池中的大小统计完成"""
+    path, _ = asyncio.run(cache.get(source, size))
+    return path
+
+
+@pytest.mark.parametrize(
+    "size, level", [(1, 64), (64, 64), (65, 128), (256, 256), (5000, 1024)]
+)
+def test_pyramid_level(size: int, level: int) -> None:
+    assert get_pyramid_level(size) == level
+
+
+def test_thumbnail_rendered_once_and_sized(tmp_path: Path) -> None:
+    source = write_image(tmp_path / "a.jpg")
+    cache = ThumbnailCache(str(tmp_path), max_bytes=10**9)
+
+    async def run() -> list[tuple[Path, str]]:
+        return await asyncio.gather(*(cache.get(source, 200) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len({path for path, _ in results}) == 1
+    path = results[0][0]
+    thumbnail = cv2.imread(str(path))
+    assert thumbnail is not None
+    assert max(thumbnail.shape[:2]) == 256
+    assert cache.size == os.path.getsize(path)
+
+
+def test_accounting_runs_off_the_event_loop(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source = write_image(tmp_path / "a.jpg")
+    cache = ThumbnailCache(str(tmp_path), max_bytes=10**9)
+    threads = []
+    add = ThumbnailCache.add
+
+    def record_add(self: ThumbnailCache, path: Path, file_size: int) -> None:
+        threads.append(threading.current_thread())
+        add(self, path, file_size)
+
+    monkeypatch.setattr(ThumbnailCache, "add", record_add)
+    get(cache, source, 64)
+
+    assert threads and threading.main_thread() not in threads
+
+
+def test_eviction_removes_least_recently_used(tmp_path: Path) -> None:
+    sources = [write_image(tmp_path / f"{i}.png", (64, 64 + i)) for i in range(4)]
+    cache = ThumbnailCache(str(tmp_path), max_bytes=10**9)
+
+    paths = []
+    for index, source in enumerate(sources):
+        path = get(cache, source, 64)
+        # 按写入顺序设置访问时间
+        os.utime(path, (1000 + index, 1000 + index))
+        paths.append(path)
+    sizes = [os.path.getsize(path) for path in paths]
+    # 上限只够保留最新的两个文件
+    cache.max_bytes = (
+        int((sizes[2] + sizes[3]) / thumbnail_store.EVICT_TARGET_RATIO) + 1
+    )
+    cache.evict()
+
+    assert [path.exists() for path in paths] == [False, False, True, True]
+    assert cache.size == sizes[2] + sizes[3]
+
+
+def test_size_scanned_lazily_from_existing_files(tmp_path: Path) -> None:
+    source = write_image(tmp_path / "a.jpg")
+    first = ThumbnailCache(str(tmp_path), max_bytes=10**9)
+    path = get(first, source, 128)
+
+    # 新实例 (如进程重启) 首次统计时扫描已有文件
+    second = ThumbnailCache(str(tmp_path), max_bytes=10**9)
+    assert second._size is None
+    assert second.size == os.path.getsize(path)
@@ -0,0 +1,215 @@
+import asyncio
+import importlib.util
+import os
+from collections.abc import Generator
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Connection, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import ClauseElement
+from sqlmodel import Session, SQLModel
+
+from app.api.routes.workflows import handle_normal_node_input
+from app.core.db import engine
+from app.core.workflow.node_processors.image_source_processor import (
+    ImageSourceNodeProcessor,
+)
+from app.models.data import Data
+from app.models.project import Project
+from app.models.task import Task
+from app.models.workflow import (
+    NodeStatus,
+    Workflow,
+    WorkflowExecution,
+    WorkflowNodeExecution,
+)
+from app.tests.utils.queries import capture_statements
+
+alembic = pytest.importorskip("alembic")
+from alembic.migration import MigrationContext  # noqa: E402
+from alembic.operations import Operations  # noqa: E402
+
+MIGRATION = (
+    Path(__file__).parents[1]
+    / "alembic"
+    / "versions"
+    / "e7b2d54a1c90_add_data_query_indexes.py"
+)
+
+
+def load_migration() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("index_migration", MIGRATION)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def migrate(target: Engine) -> None:
+    """建表后先回滚再执行索引迁移, 使索引由迁移脚本而不是模型定义创建"""
+    migration = load_migration()
+    SQLModel.metadata.create_all(target)
+    with target.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.downgrade()
+            migration.upgrade()
+
+
+def explain(conn: Connection, statement: ClauseElement) -> str:
+    """返回语句在当前数据库上的查询计划文本"""
+    sql = str(
+        statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    )
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN {sql}").all()
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def plan_conn(request: pytest.FixtureRequest, db: Session) -> Generator[Connection]:
+    """已执行索引迁移的数据库连接; Postgres 通过 TEST_DATABASE_URL 提供, 未设置时跳过"""
+    if request.param == "sqlite":
+        target = engine
+    else:
+        url = os.environ.get("TEST_DATABASE_URL")
+        if not url:
+            pytest.skip("TEST_DATABASE_URL is not set")
+        target = create_engine(url)
+        SQLModel.metadata.drop_all(target)
+    migrate(target)
+    with target.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # 空表上代价估算总会选择顺序扫描, 关闭后计划反映索引是否可用
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        yield conn
+    if target is not engine:
+        SQLModel.metadata.drop_all(target)
+        target.dispose()
+
+
+@pytest.fixture
+def node_execution(db: Session, project: Project) -> WorkflowNodeExecution:
+    workflow = Workflow(project_id=project.project_id, name="wf", config={})
+    db.add(workflow)
+    db.commit()
+    execution = WorkflowExecution(
+        workflow_id=workflow.workflow_id, project_id=project.project_id
+    )
+    db.add(execution)
+    db.commit()
+    node_execution = WorkflowNodeExecution(
+        execution_id=execution.execution_id,
+        node_id="det",
+        node_type="object_detection",
+        status=NodeStatus.PROCESSING,
+        config={"params": {"keep_executions": 2}},
+    )
+    db.add(node_execution)
+    db.commit()
+    return node_execution
+
+
+def make_image_source(
+    db: Session, project: Project, node_execution: WorkflowNodeExecution
+) -> ImageSourceNodeProcessor:
+    data_manager = SimpleNamespace(project=project, project_id=project.project_id)
+    return ImageSourceNodeProcessor(node_execution, db, data_manager)  # type: ignore[arg-type]
+
+
+def plans_of(conn: Connection, statements: list[ClauseElement]) -> list[str]:
+    return [explain(conn, statement) for statement in statements]
+
+
+def assert_uses_index(plans: list[str], index: str) -> None:
+    """至少一条计划按条件查找该索引 (SQLite 中 SCAN ... USING INDEX 仍是全索引扫描)"""
+    lines = [line for plan in plans for line in plan.splitlines() if index in line]
+    assert any(not line.strip().startswith("SCAN") for line in lines), "\n\n".join(
+        plans
+    )
+
+
+def test_clean_old_data_uses_indexes(
+    plan_conn: Connection,
+    db: Session,
+    project: Project,
+    node_execution: WorkflowNodeExecution,
+) -> None:
+    # 上一次执行的结果超出保留数量, 会被删除
+    old_execution = WorkflowNodeExecution(
+        execution_id=node_execution.execution_id,
+        node_id="det",
+        node_type="object_detection",
+        status=NodeStatus.FAILED,
+    )
+    task = Task(project_id=project.project_id)
+    db.add_all([old_execution, task])
+    db.commit()
+    db.add(
+        Data(
+            path="det/img.jpg",
+            task_id=task.task_id,
+            project_id=project.project_id,
+            processing_stage="det",
+            node_execution_id=old_execution.id,
+        )
+    )
+    db.commit()
+
+    processor = make_image_source(db, project, node_execution)
+    with capture_statements(engine) as statements:
+        old_rows, _ = processor.delete_old_data()
+    assert len(old_rows) == 1
+
+    plans = plans_of(plan_conn, statements)
+    assert_uses_index(plans, "ix_data_project_stage")
+    assert_uses_index(plans, "ix_workflow_node_execution_lookup")
+    assert_uses_index(plans, "ix_processed_data_original_data_id")
+
+
+def test_normal_node_input_uses_project_stage_index(
+    plan_conn: Connection,
+    db: Session,
+    node_execution: WorkflowNodeExecution,
+) -> None:
+    execution = db.get(WorkflowExecution, node_execution.execution_id)
+    assert execution
+    workflow = db.get(Workflow, execution.workflow_id)
+    assert workflow
+    with capture_statements(engine) as statements:
+        asyncio.run(
+            handle_normal_node_input(
+                {"id": "src", "type": "image_source"}, workflow, node_execution, db
+            )
+        )
+
+    assert_uses_index(plans_of(plan_conn, statements), "ix_data_project_stage")
+
+
+def test_image_source_path_lookup_uses_path_index(
+    plan_conn: Connection,
+    db: Session,
+    project: Project,
+    node_execution: WorkflowNodeExecution,
+) -> None:
+    processor = make_image_source(db, project, node_execution)
+    with capture_statements(engine) as statements:
+        processor.load_existing_data(["a.jpg", "b.jpg"])
+
+    assert_uses_index(plans_of(plan_conn, statements), "ix_data_path_project_stage")
+
+
+def test_stage_listing_uses_project_stage_index(
+    plan_conn: Connection, client: TestClient, project: Project
+) -> None:
+    with capture_statements(engine) as statements:
+        response = client.get(
+            f"/data/project/{project.project_id}/stage/det", params={"cursor": 10}
+        )
+    assert response.status_code == 200, response.text
+
+    assert_uses_index(plans_of(plan_conn, statements), "ix_data_project_stage")
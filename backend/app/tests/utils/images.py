@@ -0,0 +1,17 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+def write_original_images(data_dir: str, count: int) -> list[str]:
+    """在项目 data/original/ 下写入 count 张随机图像, 返回相对路径"""
+    original_dir = Path(data_dir) / "data" / "original"
+    original_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    paths = []
+    for index in range(count):
+        img = rng.integers(0, 255, (40 + index % 2, 48, 3), dtype=np.uint8)
+        cv2.imwrite(str(original_dir / f"img{index}.jpg"), img)
+        paths.append(f"original/img{index}.jpg")
+    return paths
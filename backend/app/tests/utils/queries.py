@@ -0,0 +1,38 @@
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Delete, Select, Update, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import ClauseElement
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Generator[list[str], None, None]:
+    """统计代码块中执行的 SQL 语句, 返回语句列表"""
+    statements: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def capture_statements(engine: Engine) -> Generator[list[ClauseElement], None, None]:
+    """收集代码块中执行的 SELECT/UPDATE/DELETE 语句对象, 用于在其他数据库上重新编译"""
+    statements: list[ClauseElement] = []
+
+    def before_execute(conn: Any, clauseelement: Any, *args: Any) -> None:
+        if isinstance(clauseelement, Select | Update | Delete):
+            statements.append(clauseelement)
+
+    event.listen(engine, "before_execute", before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_execute", before_execute)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# 单条 SQL 中 IN (...) 参数的最大数量, 兼容 SQLite 的参数个数限制
+SQL_IN_CHUNK_SIZE = 500
+
+
+def chunked(items: Sequence[T], size: int = SQL_IN_CHUNK_SIZE) -> Iterator[List[T]]:
+    """按固定大小切分序列"""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def group_by_key(
+    items: Iterable[T], key: Callable[[T], Hashable]
+) -> Dict[Hashable, List[T]]:
+    """按键分组, 保持组内原有顺序"""
+    groups: Dict[Hashable, List[T]] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import json
+from typing import Any, Dict, Iterator, List, Sequence
+
+import sqlalchemy as sa
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.core.db import engine
+
+try:
+    import pyarrow as pa  # type: ignore[import-untyped]
+except ImportError:  # 可选依赖: poetry install -E arrow
+    pa = None
+
+# 服务端游标每次取回的行数
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def iter_row_batches(
+    query: Any, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """用服务端游标 (yield_per) 分批读取查询结果
+
+    在生成器内部创建独立的 Session, 请求结束后流式响应仍在读取时不依赖请求作用域的 Session。
+    """
+    with Session(engine) as session:
+        result = session.execute(
+            query.execution_options(yield_per=batch_size)
+        ).mappings()
+        for rows in result.partitions():
+            yield [dict(row) for row in rows]
+
+
+def iter_ndjson(query: Any, field_names: Sequence[str]) -> Iterator[bytes]:
+    """逐行输出 JSON (NDJSON)"""
+    for rows in iter_row_batches(query):
+        yield "".join(
+            json.dumps(
+                {name: row[name] for name in field_names},
+                ensure_ascii=False,
+                default=str,
+            )
+            + "\n"
+            for row in rows
+        ).encode()
+
+
+def get_arrow_schema(query: Any) -> "pa.Schema":
+    """按查询列的 SQL 类型生成 Arrow schema, JSON 列编码为字符串"""
+    fields = []
+    for column in query.selected_columns:
+        if isinstance(column.type, sa.JSON):
+            arrow_type = pa.string()
+        elif isinstance(column.type, sa.Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, sa.Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, sa.Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, sa.DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+class _ChunkSink:
+    """收集 Arrow writer 写出的字节, 每写完一批取出一次"""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def write(self, data: Any) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_arrow(query: Any, field_names: Sequence[str]) -> Iterator[bytes]:
+    """输出 Arrow IPC 流, 每批结果一个 RecordBatch"""
+    schema = get_arrow_schema(query)
+    json_fields = {
+        field.name
+        for field, column in zip(schema, query.selected_columns, strict=True)
+        if isinstance(column.type, sa.JSON)
+    }
+    schema = pa.schema([schema.field(name) for name in field_names])
+
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    for rows in iter_row_batches(query):
+        columns = {}
+        for name in field_names:
+            values = [row[name] for row in rows]
+            if name in json_fields:
+                values = [
+                    None if value is None else json.dumps(value, ensure_ascii=False)
+                    for value in values
+                ]
+            columns[name] = values
+        writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_query(
+    query: Any, field_names: Sequence[str], export_format: str, filename: str
+) -> StreamingResponse:
+    """把查询结果以 NDJSON 或 Arrow IPC 流式返回, 内存占用与结果总量无关"""
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported export format: {export_format}"
+        )
+    if export_format == "arrow":
+        if pa is None:
+            raise HTTPException(
+                status_code=400, detail="Arrow export requires pyarrow to be installed"
+            )
+        content = iter_arrow(query, field_names)
+    else:
+        content = iter_ndjson(query, field_names)
+
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
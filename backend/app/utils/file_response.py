@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+# Range 响应每次读取的字节数
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """由文件修改时间和大小生成 ETag"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """If-None-Match 优先, 其次 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单个字节范围, 返回闭区间 (start, end)
+
+    不支持的格式 (如多个范围) 返回 None, 按完整文件响应; 范围不可满足时返回 416。
+    """
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text:
+        # bytes=-N: 最后 N 个字节
+        length = int(end_text)
+        start, end = max(size - length, 0), size - 1
+        if length == 0:
+            start = size
+    else:
+        start = int(start_text)
+        end = min(int(end_text), size - 1) if end_text else size - 1
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """分块读取文件的 [start, end] 区间"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+    cache_control: Optional[str] = None,
+) -> Response:
+    """返回文件, 支持条件请求 (ETag / Last-Modified 命中时返回 304) 和单个 Range (206)
+
+    派生文件 (如缩略图) 可以传入由源文件计算的 etag 和 last_modified。
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    media_type = (
+        media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    )
+    etag = etag or make_etag(stat_result)
+    last_modified = stat_result.st_mtime if last_modified is None else last_modified
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = parse_range(range_header, stat_result.st_size)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=stat_result,
+    )
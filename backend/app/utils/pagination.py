@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from typing import Annotated, Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Depends, HTTPException, Query, Response
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel import Session, SQLModel, select
+
+# 只传游标时的每页默认条数和服务端允许的最大条数
+# limit 和 cursor 都不传时返回全部行, 兼容不读取游标的旧客户端
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 10000
+
+# 下一页游标通过响应头返回, 响应体保持为列表
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """游标分页和字段投影参数"""
+
+    def __init__(
+        self,
+        cursor: Optional[int] = Query(
+            None, description="上一页响应头 X-Next-Cursor 的值, 不传时从头开始"
+        ),
+        limit: Optional[int] = Query(
+            None,
+            ge=1,
+            le=MAX_PAGE_LIMIT,
+            description="每页条数, 与 cursor 都不传时返回全部行",
+        ),
+        fields: Optional[str] = Query(
+            None,
+            description="逗号分隔的返回字段, 如 data_id,path; 以 - 开头表示排除, 如 -metadata_",
+        ),
+    ):
+        self.cursor = cursor
+        self.limit: Optional[int] = limit
+        if limit is None and cursor is not None:
+            self.limit = DEFAULT_PAGE_LIMIT
+        self.fields = fields
+
+
+PageDep = Annotated[PageParams, Depends()]
+
+
+def resolve_fields(
+    model: type[SQLModel],
+    fields: Optional[str],
+    default_fields: Optional[Sequence[str]] = None,
+) -> List[str]:
+    """解析 fields 参数为模型字段列表, 未知字段返回 400"""
+    available = list(default_fields or model.model_fields.keys())
+    if not fields:
+        return available
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [
+        name.lstrip("-") for name in names if name.lstrip("-") not in model.model_fields
+    ]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    excluded = {name[1:] for name in names if name.startswith("-")}
+    included = [name for name in names if not name.startswith("-")]
+    return [name for name in included or available if name not in excluded]
+
+
+def fetch_page(
+    session: Session,
+    model: type[SQLModel],
+    key: InstrumentedAttribute[Any],
+    filters: Sequence[Any],
+    page: PageParams,
+    response: Response,
+    default_fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """按主键游标分页查询, 只选择需要的列, 下一页游标写入响应头"""
+    field_names = resolve_fields(model, page.fields, default_fields)
+    if key.key not in field_names:
+        # 游标依赖主键, 查询时总是带上
+        query_fields = [key.key, *field_names]
+    else:
+        query_fields = field_names
+
+    rows, next_cursor = keyset_page(
+        session,
+        select(*[getattr(model, name) for name in query_fields]).where(*filters),
+        key,
+        page.cursor,
+        page.limit,
+    )
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return [{name: row[name] for name in field_names} for row in rows]
+
+
+def keyset_page(
+    session: Session,
+    query: Any,
+    key: InstrumentedAttribute[Any],
+    cursor: Optional[int],
+    limit: Optional[int],
+) -> Tuple[List[Any], Optional[int]]:
+    """在查询上应用 key > cursor 的游标条件, 返回 (本页行, 下一页游标)
+
+    limit 为 None 时不分页, 返回全部行
+    """
+    if cursor is not None:
+        query = query.where(key > cursor)
+    if limit is None:
+        return list(session.execute(query.order_by(key)).mappings()), None
+    rows = list(session.execute(query.order_by(key).limit(limit + 1)).mappings())
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][key.key]
+    return rows, None
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import time
+import uuid
+import zipfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple
+from weakref import WeakValueDictionary
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl, 只在进程内串行化
+    fcntl = None  # type: ignore[assignment]
+
+# 流式读写的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 同时写入磁盘的文件数
+UPLOAD_CONCURRENCY = 4
+# 分块上传的临时目录 (相对于项目目录, 不在 data/ 下, 不会被导入或文件回收扫描到)
+UPLOAD_TMP_DIR = ".uploads"
+# 超过该时间 (秒) 没有写入的分块上传视为已放弃, 临时文件和摘要状态被清理
+UPLOAD_STALE_SECONDS = 24 * 3600
+
+# 进程内每个分块上传的追加锁
+_append_locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+# 每个分块上传已接收数据的 sha256 状态: upload_id -> (已计算的字节数, hashlib 对象, 最后使用时间)
+_upload_digests: Dict[str, Tuple[int, Any, float]] = {}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def is_image_file(filename: str) -> bool:
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def is_archive_file(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def reserve_filename(target_dir: str, filename: str) -> str:
+    """在目标目录中原子地占用一个不重名的文件名 (重名时添加数字后缀), 返回文件名
+
+    用 O_EXCL 创建空文件占位, 并行写入多个同名文件时不会互相覆盖。
+    """
+    name, ext = os.path.splitext(os.path.basename(filename))
+    candidate = f"{name}{ext}"
+    counter = 1
+    while True:
+        try:
+            fd = os.open(
+                os.path.join(target_dir, candidate),
+                os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+            )
+            os.close(fd)
+            return candidate
+        except FileExistsError:
+            candidate = f"{name}_{counter}{ext}"
+            counter += 1
+
+
+def generated_filename(upload: UploadFile) -> str:
+    """为没有文件名的上传生成文件名, 扩展名由内容类型推断"""
+    subtype = (upload.content_type or "").partition("/")[2].lower()
+    ext = f".{subtype}" if f".{subtype}" in IMAGE_EXTENSIONS else ".jpg"
+    return f"upload_{uuid.uuid4().hex[:8]}{ext}"
+
+
+def _save_digest(upload_id: str, offset: int, digest: Any) -> None:
+    _upload_digests[upload_id] = (offset, digest, time.monotonic())
+
+
+def evict_stale_digests(max_age: float = UPLOAD_STALE_SECONDS) -> int:
+    """丢弃长时间未使用的摘要状态 (上传已放弃, 或临时文件已被其他进程清理), 返回丢弃数量
+
+    摘要只是缓存, 上传恢复时会从临时文件补算。
+    """
+    deadline = time.monotonic() - max_age
+    stale = [
+        upload_id
+        for upload_id, (_, _, used) in list(_upload_digests.items())
+        if used < deadline
+    ]
+    for upload_id in stale:
+        _upload_digests.pop(upload_id, None)
+    return len(stale)
+
+
+async def iter_upload_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    """按块读取上传文件, 不把整个文件读入内存"""
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def write_chunks(
+    chunks: AsyncIterator[bytes],
+    file_path: str,
+    mode: str = "wb",
+    digest: Optional[Any] = None,
+) -> Tuple[int, str]:
+    """把数据块异步写入文件, 同时计算 sha256, 返回 (写入字节数, 十六进制摘要)
+
+    Args:
+        digest: 继续更新的 hashlib 对象 (追加写入时传入已有内容的摘要状态)
+    """
+    digest = digest or hashlib.sha256()
+    size = 0
+    async with aiofiles.open(file_path, mode) as f:
+        async for chunk in chunks:
+            digest.update(chunk)
+            await f.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+async def save_image_uploads(
+    files: List[UploadFile], target_dir: str
+) -> Tuple[List[Tuple[str, str]], List[UploadFile]]:
+    """并行把上传的图片流式写入目标目录
+
+    Returns:
+        ([(文件名, sha256)], 未处理的非图片文件)
+    """
+    images, others = [], []
+    for file in files:
+        if is_image_file(file.filename or "") or (file.content_type or "").startswith(
+            "image/"
+        ):
+            images.append(file)
+        else:
+            others.append(file)
+
+    # 先按顺序占用文件名, 再并行写入; 没有文件名时按内容类型生成
+    names = [
+        reserve_filename(target_dir, file.filename or generated_filename(file))
+        for file in images
+    ]
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def save(file: UploadFile, filename: str) -> Tuple[str, str]:
+        async with semaphore:
+            file_path = os.path.join(target_dir, filename)
+            try:
+                _, content_hash = await write_chunks(
+                    iter_upload_chunks(file), file_path
+                )
+            except Exception:
+                os.remove(file_path)
+                raise
+            return filename, content_hash
+
+    saved = await asyncio.gather(
+        *(save(file, name) for file, name in zip(images, names, strict=True))
+    )
+    return list(saved), others
+
+
+async def save_upload_to_temp(upload: UploadFile, tmp_dir: str) -> str:
+    """把上传文件 (压缩包) 流式写入临时目录, 返回临时文件路径"""
+    os.makedirs(tmp_dir, exist_ok=True)
+    suffix = "".join(Path(upload.filename or "").suffixes[-2:])
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}{suffix}")
+    await write_chunks(iter_upload_chunks(upload), tmp_path)
+    return tmp_path
+
+
+def _copy_member(
+    source: IO[bytes], target_dir: str, member_name: str
+) -> Tuple[str, str]:
+    """把压缩包中的一个图片复制到目标目录 (平铺), 同时计算 sha256"""
+    filename = reserve_filename(target_dir, member_name)
+    digest = hashlib.sha256()
+    try:
+        with open(os.path.join(target_dir, filename), "wb") as f:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(os.path.join(target_dir, filename))
+        raise
+    return filename, digest.hexdigest()
+
+
+def extract_archive(archive_path: str, target_dir: str) -> List[Tuple[str, str]]:
+    """解压 zip/tar 压缩包中的图片到目标目录, 返回 [(文件名, sha256)]
+
+    只提取图片文件, 目录结构被平铺 (图像源只扫描 original 目录的第一层),
+    不会按压缩包中的路径写文件, 因此不受 ../ 之类的路径穿越影响。
+    阻塞操作, 需要在线程池中调用。
+    """
+    extracted = []
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not is_image_file(info.filename):
+                    continue
+                with archive.open(info) as source:
+                    extracted.append(
+                        _copy_member(
+                            source, target_dir, os.path.basename(info.filename)
+                        )
+                    )
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as archive:
+            for member in archive:
+                if not member.isfile() or not is_image_file(member.name):
+                    continue
+                member_file = archive.extractfile(member)
+                if member_file is None:
+                    continue
+                with member_file:
+                    extracted.append(
+                        _copy_member(
+                            member_file, target_dir, os.path.basename(member.name)
+                        )
+                    )
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported archive format")
+    return extracted
+
+
+def link_duplicate(canonical_path: str, duplicate_path: str) -> bool:
+    """用指向已有文件的硬链接替换内容相同的文件, 文件系统不支持时保留原文件"""
+    link_path = f"{duplicate_path}.link"
+    try:
+        os.link(canonical_path, link_path)
+        os.replace(link_path, duplicate_path)
+        return True
+    except OSError as e:
+        print(f"Failed to link {duplicate_path} to {canonical_path}: {str(e)}")
+        if os.path.exists(link_path):
+            os.remove(link_path)
+        return False
+
+
+class ChunkedUpload:
+    """可续传的分块上传
+
+    数据追加写入 {project_dir}/.uploads/{upload_id}.part, 元数据保存在同名 .json 中;
+    客户端按 offset 顺序上传分块, 中断后可查询当前 offset 继续上传。
+    """
+
+    def __init__(self, project_dir: str, upload_id: str):
+        try:
+            uuid.UUID(hex=upload_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        self.upload_id = upload_id
+        self.tmp_dir = os.path.join(project_dir, UPLOAD_TMP_DIR)
+        self.part_path = os.path.join(self.tmp_dir, f"{upload_id}.part")
+        self.meta_path = os.path.join(self.tmp_dir, f"{upload_id}.json")
+
+    @classmethod
+    def create(
+        cls, project_dir: str, filename: str, size: Optional[int] = None
+    ) -> "ChunkedUpload":
+        upload = cls(project_dir, uuid.uuid4().hex)
+        os.makedirs(upload.tmp_dir, exist_ok=True)
+        open(upload.part_path, "wb").close()
+        with open(upload.meta_path, "w") as f:
+            json.dump({"filename": os.path.basename(filename), "size": size}, f)
+        return upload
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path) as f:
+                meta: Dict[str, Any] = json.load(f)
+                return meta
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+    @property
+    def offset(self) -> int:
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    def status(self) -> Dict[str, Any]:
+        meta = self.meta
+        return {
+            "upload_id": self.upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "offset": self.offset,
+        }
+
+    @asynccontextmanager
+    async def lock(self) -> AsyncIterator[None]:
+        """串行化同一上传的追加和完成
+
+        进程内用 asyncio.Lock 排队; 有 fcntl 时再对 .part 文件加非阻塞的 flock,
+        其他 worker 进程正在写入同一上传时返回 409, 客户端查询 offset 后重试。
+        """
+        lock = _append_locks.setdefault(self.upload_id, asyncio.Lock())
+        async with lock:
+            if fcntl is None:
+                yield
+                return
+            try:
+                f = open(self.part_path, "rb")
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise HTTPException(status_code=409, detail="Upload is busy")
+                yield
+
+    def digest(self, offset: int) -> Any:
+        """返回前 offset 字节的 sha256 状态
+
+        通常直接沿用追加时保存的状态; 进程重启或由其他 worker 进程追加过时,
+        只补算缺少的部分 (没有状态时从头计算)。阻塞操作。
+        """
+        done, digest, _ = _upload_digests.get(self.upload_id, (0, None, 0.0))
+        if digest is None or done > offset:
+            done, digest = 0, hashlib.sha256()
+        if done < offset:
+            with open(self.part_path, "rb") as f:
+                f.seek(done)
+                remaining = offset - done
+                while remaining > 0:
+                    chunk = f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+        _save_digest(self.upload_id, offset, digest)
+        return digest
+
+    async def append(self, chunks: AsyncIterator[bytes], offset: int) -> int:
+        """在 offset 处追加一个分块, offset 必须等于已接收的字节数, 返回新的 offset
+
+        检查 offset、写入和超出大小时的回退都在锁内完成, 同时增量更新内容摘要。
+        """
+        meta = self.meta
+        async with self.lock():
+            current = self.offset
+            if offset != current:
+                raise HTTPException(
+                    status_code=409, detail=f"Offset mismatch, expected {current}"
+                )
+            digest = await run_in_threadpool(self.digest, current)
+            before = digest.copy()
+            try:
+                size, _ = await write_chunks(
+                    chunks, self.part_path, mode="ab", digest=digest
+                )
+            except BaseException:
+                # 中断时保留已写入的部分以便续传, 摘要下次从写入前的状态补算
+                _save_digest(self.upload_id, current, before)
+                raise
+            new_offset = current + size
+            if meta["size"] is not None and new_offset > meta["size"]:
+                # 超出声明的大小, 回退本次写入
+                with open(self.part_path, "ab") as f:
+                    f.truncate(current)
+                _save_digest(self.upload_id, current, before)
+                raise HTTPException(
+                    status_code=400, detail="Upload exceeds declared size"
+                )
+            _save_digest(self.upload_id, new_offset, digest)
+            return new_offset
+
+    def check_complete(self) -> None:
+        meta = self.meta
+        if meta["size"] is not None and self.offset != meta["size"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload incomplete: {self.offset}/{meta['size']} bytes",
+            )
+
+    def move_to(self, target_dir: str) -> Tuple[str, str]:
+        """把完成的上传移动到目标目录, 返回 (文件名, sha256); 阻塞操作
+
+        sha256 在追加分块时已增量计算, 这里不再重新读取整个文件。
+        """
+        content_hash = self.digest(self.offset).hexdigest()
+        filename = reserve_filename(target_dir, self.meta["filename"])
+        shutil.move(self.part_path, os.path.join(target_dir, filename))
+        self.discard()
+        return filename, content_hash
+
+    def discard(self) -> None:
+        _upload_digests.pop(self.upload_id, None)
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def cleanup_stale_uploads(
+    project_dir: str, max_age: float = UPLOAD_STALE_SECONDS
+) -> int:
+    """删除项目中超过 max_age 秒没有写入的分块上传, 同时丢弃其摘要状态, 返回删除数量"""
+    tmp_dir = os.path.join(project_dir, UPLOAD_TMP_DIR)
+    deadline = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(tmp_dir)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json":
+            continue
+        try:
+            upload = ChunkedUpload(project_dir, upload_id)
+        except HTTPException:
+            continue
+        try:
+            modified = max(
+                os.path.getmtime(path)
+                for path in (upload.meta_path, upload.part_path)
+                if os.path.exists(path)
+            )
+        except (OSError, ValueError):
+            continue
+        if modified < deadline:
+            upload.discard()
+            removed += 1
+    evict_stale_digests(max_age)
+    if removed:
+        print(f"Removed {removed} abandoned uploads from {tmp_dir}")
+    return removed